@@ -355,6 +355,7 @@ There are key interaction points where structured choices are appropriate:
 - Include event type and specific occasion details
 - Specify exact guest count and any VIP requirements
 - Detail location preferences (neighborhood, accessibility, landmarks)
+- When the user gives a travel distance ("within 20 km of downtown Boston"), also pass `near` and `radius_km`
 - Mention date, day of week, and seasonal considerations
 - List venue style and atmosphere preferences
 - Specify catering requirements and dietary restrictions
@@ -50,3 +50,8 @@ async def heartbeat():
     logger.info("Heartbeat request received")
     return JSONResponse({"status": "ok", "version": "1.0.0"})
 
+
+@app.get("/metrics")
+async def metrics(request: Request):
+    """Return connection pool metrics for the shared search clients"""
+    return JSONResponse(request.app.state.clients.metrics())
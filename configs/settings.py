@@ -7,6 +7,23 @@ logger = logging.getLogger(__name__)
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+# Index and embedding dimension; text-embedding-3 models return shortened vectors below their native size
+EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", "1536"))
+
+# Embedding Backend Configuration ("openai" or "local" sentence-transformers)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai").lower()
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+LOCAL_EMBEDDING_DEVICE = os.getenv("LOCAL_EMBEDDING_DEVICE", "cpu")
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "64"))
+LOCAL_EMBEDDING_THREADS = int(os.getenv("LOCAL_EMBEDDING_THREADS", "0"))
+LOCAL_EMBEDDING_QUANTIZE = os.getenv("LOCAL_EMBEDDING_QUANTIZE", "false").lower() == "true"
+
+# On-disk Embedding Store Configuration (vectors are kept so re-indexing never re-embeds)
+EMBEDDING_STORE_ENABLED = os.getenv("EMBEDDING_STORE_ENABLED", "true").lower() == "true"
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", "embedding_store")
+EMBEDDING_STORE_DTYPE = os.getenv("EMBEDDING_STORE_DTYPE", "float32")
+
 FIRECRAWL_API_KEY = os.getenv("FIRECRAWL_API_KEY")
 MONGO_DB_URI = os.getenv("MONGO_DB_URI")
 
@@ -15,6 +32,28 @@ REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", "6378"))
 REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", "test@123")
 REDIS_DB = int(os.getenv("REDIS_DB", "0"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.25"))
+
+# Query Embedding Cache Configuration
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_REDIS_ENABLED = os.getenv("EMBEDDING_CACHE_REDIS_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "10000"))
+EMBEDDING_CACHE_TTL_SECONDS = int(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Search Result Cache Configuration
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+SEARCH_CACHE_REDIS_ENABLED = os.getenv("SEARCH_CACHE_REDIS_ENABLED", "true").lower() == "true"
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "2000"))
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", "3600"))
+
+# Rate Limit Configuration (budgets are shared by every worker process through Redis)
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_REDIS_ENABLED = os.getenv("RATE_LIMIT_REDIS_ENABLED", "true").lower() == "true"
+RATE_LIMIT_INTERACTIVE_RESERVE = float(os.getenv("RATE_LIMIT_INTERACTIVE_RESERVE", "0.2"))
+OPENAI_EMBEDDING_RPM = int(os.getenv("OPENAI_EMBEDDING_RPM", "3000"))
+OPENAI_EMBEDDING_TPM = int(os.getenv("OPENAI_EMBEDDING_TPM", "1000000"))
+PINECONE_UPSERT_RPM = int(os.getenv("PINECONE_UPSERT_RPM", "6000"))
+PINECONE_UPSERT_MB_PER_MINUTE = float(os.getenv("PINECONE_UPSERT_MB_PER_MINUTE", "3000"))
 
 # Pinecone Configuration
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
@@ -22,9 +61,66 @@ PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "venue-embeddings")
 PINECONE_ENVIRONMENT = os.getenv("PINECONE_ENVIRONMENT", "us-east-1")
 PINECONE_CLOUD = os.getenv("PINECONE_CLOUD", "aws")
 
+# Pinecone Metadata Profile ("full", "filter-only" or "self-contained")
+PINECONE_METADATA_PROFILE = os.getenv("PINECONE_METADATA_PROFILE", "full").lower()
+PINECONE_METADATA_DESCRIPTION_CHARS = int(os.getenv("PINECONE_METADATA_DESCRIPTION_CHARS", "400"))
+
+# Search Backend Configuration ("pinecone" or "local" exact search over the embedding store)
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "pinecone").lower()
+
+# Hybrid (dense + BM25 sparse) Search Configuration
+HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH_ENABLED", "false").lower() == "true"
+PINECONE_SPARSE_INDEX_NAME = os.getenv("PINECONE_SPARSE_INDEX_NAME", "venue-sparse")
+PINECONE_SPARSE_INDEX_HOST = os.getenv("PINECONE_SPARSE_INDEX_HOST")
+HYBRID_FUSION_METHOD = os.getenv("HYBRID_FUSION_METHOD", "rrf").lower()
+HYBRID_DENSE_WEIGHT = float(os.getenv("HYBRID_DENSE_WEIGHT", "0.5"))
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+HYBRID_CANDIDATE_MULTIPLIER = int(os.getenv("HYBRID_CANDIDATE_MULTIPLIER", "2"))
+BM25_PARAMS_PATH = os.getenv("BM25_PARAMS_PATH", "bm25_params.json")
+
+# Multi-vector Configuration (description/FAQ/testimonial chunk vectors aggregated per venue)
+MULTI_VECTOR_ENABLED = os.getenv("MULTI_VECTOR_ENABLED", "false").lower() == "true"
+PINECONE_CHUNK_INDEX_NAME = os.getenv("PINECONE_CHUNK_INDEX_NAME", "venue-chunks")
+CHUNK_MAX_CHARS = int(os.getenv("CHUNK_MAX_CHARS", "600"))
+MAX_CHUNKS_PER_VENUE = int(os.getenv("MAX_CHUNKS_PER_VENUE", "24"))
+CHUNK_AGGREGATION = os.getenv("CHUNK_AGGREGATION", "max").lower()
+CHUNK_OVERFETCH_MULTIPLIER = int(os.getenv("CHUNK_OVERFETCH_MULTIPLIER", "4"))
+
+# Query Understanding Configuration (budget/location/event filters compiled from the query text)
+QUERY_FILTERS_ENABLED = os.getenv("QUERY_FILTERS_ENABLED", "true").lower() == "true"
+QUERY_BUDGET_TOLERANCE = float(os.getenv("QUERY_BUDGET_TOLERANCE", "0.2"))
+
+# Geo Search Configuration (geohash cells in metadata, haversine post-filter)
+GEOHASH_PRECISIONS = [int(p) for p in os.getenv("GEOHASH_PRECISIONS", "3,4,5").split(",") if p.strip()]
+GEO_MAX_COVERING_CELLS = int(os.getenv("GEO_MAX_COVERING_CELLS", "64"))
+GEO_DEFAULT_RADIUS_KM = float(os.getenv("GEO_DEFAULT_RADIUS_KM", "25"))
+GEO_OVERFETCH_MULTIPLIER = int(os.getenv("GEO_OVERFETCH_MULTIPLIER", "2"))
+
+# Rerank Configuration (local sentence-transformers cross-encoder after retrieval)
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_DEVICE = os.getenv("RERANK_DEVICE", "cpu")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "50"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "64"))
+RERANK_MAX_LENGTH = int(os.getenv("RERANK_MAX_LENGTH", "256"))
+# Embedded context (or best chunk) kept with cached matches and scored by the cross-encoder
+RERANK_CONTEXT_CHARS = int(os.getenv("RERANK_CONTEXT_CHARS", "1000"))
+
+# Search Tool Output Configuration
+SEARCH_TOOL_MAX_TOKENS = int(os.getenv("SEARCH_TOOL_MAX_TOKENS", "2000"))
+SEARCH_TOOL_DESCRIPTION_CHARS = int(os.getenv("SEARCH_TOOL_DESCRIPTION_CHARS", "240"))
+
+# Connection Pool Configuration
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "50"))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+PINECONE_POOL_THREADS = int(os.getenv("PINECONE_POOL_THREADS", "4"))
+
 # MongoDB Collection Configuration
 MONGO_DATABASE_NAME = os.getenv("MONGO_DATABASE_NAME", "telo")
 MONGO_COLLECTION_NAME = os.getenv("MONGO_COLLECTION_NAME", "venues")
+PINECONE_SYNC_STATE_COLLECTION = os.getenv("PINECONE_SYNC_STATE_COLLECTION", "pinecone_sync_state")
 
 logger.info(f"MONGO_DB_URI: {MONGO_DB_URI}")
 logger.info(f"Redis configured at {REDIS_HOST}:{REDIS_PORT}")
@@ -1,12 +1,37 @@
+import logging
+
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from agent.main import initialize
+from search.clients import init_client_registry, aclose_client_registry
+from search.rerank import get_cross_encoder
+from configs.settings import RERANK_ENABLED
 # from shared.database import connect_database, disconnect_database
 
+logger = logging.getLogger(__name__)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    clients = init_client_registry()
+    if clients.search_backend == "local":
+        # Load the embedding matrix and metadata before the first search
+        clients.local_index()
+    else:
+        try:
+            # Resolve the index host once so the first search does not pay for it
+            clients.index()
+        except Exception as e:
+            logger.warning(f"Could not warm Pinecone index handle: {e}")
+    if RERANK_ENABLED:
+        # Load and warm the cross-encoder before the first search
+        get_cross_encoder()
+    app.state.clients = clients
+
     agent = await initialize()
     app.state.agent = agent
 
-    yield
+    try:
+        yield
+    finally:
+        await aclose_client_registry()
@@ -0,0 +1,157 @@
+"""
+Recall@k benchmark of shortened text-embedding-3 vectors against the full-size baseline.
+
+text-embedding-3 embeddings shortened with the ``dimensions`` parameter are the
+leading components of the full vector, L2-normalized again. The corpus and the
+queries are therefore embedded once at full size and truncated locally for every
+candidate dimension, so the benchmark costs one embedding pass however many
+dimensions are compared. Search is exact cosine top-k, which isolates the effect
+of the dimension from any ANN approximation.
+
+The labelled query set is a JSON list of
+    {"query": "rustic barn wedding for 150 guests", "relevant": ["<venue id>", ...]}
+Queries without "relevant" only count towards the overlap with the baseline.
+
+Usage:
+    python scripts/benchmark_dimensions.py --queries labelled_queries.json --dimensions 256,512,768,1024 --k 10
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from configs.settings import OPENAI_API_KEY, OPENAI_EMBEDDING_MODEL
+from utils.batch_processing import create_embeddings, OPENAI_NATIVE_DIMENSIONS
+from utils.embedding_store import EmbeddingStore
+from search.embeddings import initialize_mongo_client, iter_venue_documents, extract_single_venue_fields
+from openai import OpenAI
+
+
+def load_corpus(openai_client, embedding_model: str, full_dimension: int, limit: int = None):
+    """Return (venue IDs, full-size matrix), from the embedding store when it holds full-size vectors."""
+    store_path = EmbeddingStore.store_path(embedding_model, full_dimension)
+    if os.path.exists(os.path.join(store_path, "rows.jsonl")):
+        store = EmbeddingStore(embedding_model, full_dimension, read_only=True)
+        live = store.live_rows()[:limit]
+        if live:
+            print(f"Loaded {len(live)} full-size vectors from {store.path}")
+            matrix = np.asarray(store.matrix()[[row for _, row, _ in live]], dtype=np.float32)
+            return [venue_id for venue_id, _, _ in live], matrix
+
+    print("No full-size embedding store found, embedding venue contexts from MongoDB")
+    mongo_client, _, collection = initialize_mongo_client()
+    ids, contexts = [], []
+    try:
+        for doc in iter_venue_documents(collection):
+            venue = extract_single_venue_fields(doc)
+            if venue and venue['context'].strip():
+                ids.append(venue['_id'])
+                contexts.append(venue['context'])
+            if limit and len(ids) >= limit:
+                break
+    finally:
+        mongo_client.close()
+
+    embeddings = create_embeddings(openai_client, embedding_model, contexts, dimensions=full_dimension)
+    kept = [i for i, embedding in enumerate(embeddings) if embedding]
+    return [ids[i] for i in kept], np.asarray([embeddings[i] for i in kept], dtype=np.float32)
+
+
+def truncate(matrix: np.ndarray, dimension: int) -> np.ndarray:
+    """Shorten vectors to their first ``dimension`` components and renormalize them."""
+    shortened = matrix[:, :dimension]
+    return shortened / np.maximum(np.linalg.norm(shortened, axis=1, keepdims=True), 1e-12)
+
+
+def top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k most similar corpus rows for every query, best first."""
+    scores = queries @ corpus.T
+    k = min(k, corpus.shape[0])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+def run_benchmark(ids, corpus: np.ndarray, queries: list, query_vectors: np.ndarray, dimensions: list, k: int) -> list:
+    full_dimension = corpus.shape[1]
+    baseline = top_k(truncate(corpus, full_dimension), truncate(query_vectors, full_dimension), k)
+    labelled = [(i, set(query["relevant"])) for i, query in enumerate(queries) if query.get("relevant")]
+
+    rows = []
+    for dimension in sorted(set(dimensions) | {full_dimension}):
+        shortened_corpus = truncate(corpus, dimension)
+        shortened_queries = truncate(query_vectors, dimension)
+        start = time.perf_counter()
+        results = top_k(shortened_corpus, shortened_queries, k)
+        search_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        overlap = np.mean([len(set(results[i]) & set(baseline[i])) / baseline.shape[1] for i in range(len(queries))])
+        recall = None
+        if labelled:
+            recall = float(np.mean([
+                len({ids[j] for j in results[i]} & relevant) / min(len(relevant), k) for i, relevant in labelled
+            ]))
+        rows.append({
+            "dimension": dimension,
+            "recall_at_k": round(recall, 4) if recall is not None else None,
+            "baseline_overlap_at_k": round(float(overlap), 4),
+            "bytes_per_vector": dimension * 4,
+            "index_mb": round(dimension * 4 * len(ids) / 1e6, 2),
+            "search_ms_per_query": round(search_ms, 3),
+        })
+    return rows
+
+
+def print_table(rows: list, k: int, full_dimension: int):
+    print(f"\n{'dim':>6} {'recall@' + str(k):>10} {'overlap@' + str(k):>11} {'bytes/vec':>10} {'index MB':>9} {'ms/query':>9}")
+    for row in rows:
+        recall = f"{row['recall_at_k']:.4f}" if row['recall_at_k'] is not None else "n/a"
+        marker = "  (baseline)" if row['dimension'] == full_dimension else ""
+        print(f"{row['dimension']:>6} {recall:>10} {row['baseline_overlap_at_k']:>11.4f} {row['bytes_per_vector']:>10} "
+              f"{row['index_mb']:>9} {row['search_ms_per_query']:>9}{marker}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare recall@k of shortened embeddings against full-size ones")
+    parser.add_argument("--queries", required=True, help="JSON list of {query, relevant} objects")
+    parser.add_argument("--dimensions", default="256,512,768,1024", help="Comma separated dimensions to compare")
+    parser.add_argument("--k", type=int, default=10, help="Cut-off for recall and overlap")
+    parser.add_argument("--model", default=OPENAI_EMBEDDING_MODEL, help="text-embedding-3 model")
+    parser.add_argument("--limit", type=int, default=None, help="Only use the first N venues")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    if not args.model.startswith("text-embedding-3"):
+        parser.error(f"{args.model} does not support shortened embeddings")
+    full_dimension = OPENAI_NATIVE_DIMENSIONS.get(args.model, 1536)
+    dimensions = [int(d) for d in args.dimensions.split(",") if d.strip()]
+    if any(d <= 0 or d > full_dimension for d in dimensions):
+        parser.error(f"Dimensions must be between 1 and {full_dimension}")
+
+    with open(args.queries, "r", encoding="utf-8") as f:
+        queries = json.load(f)
+
+    openai_client = OpenAI(api_key=OPENAI_API_KEY)
+    ids, corpus = load_corpus(openai_client, args.model, full_dimension, args.limit)
+    query_embeddings = create_embeddings(openai_client, args.model, [query["query"] for query in queries],
+                                         dimensions=full_dimension)
+    queries = [query for query, embedding in zip(queries, query_embeddings) if embedding]
+    query_vectors = np.asarray([embedding for embedding in query_embeddings if embedding], dtype=np.float32)
+    print(f"Benchmarking {len(queries)} queries against {len(ids)} venues")
+
+    rows = run_benchmark(ids, corpus, queries, query_vectors, dimensions, args.k)
+    print_table(rows, args.k, full_dimension)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"model": args.model, "k": args.k, "venues": len(ids), "queries": len(queries), "results": rows}, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
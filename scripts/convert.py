@@ -1,7 +1,28 @@
+"""
+Convert scraped venue dumps into the MongoDB venue structure.
+
+The input JSON array is parsed incrementally and venues are converted in batches
+on a process pool, so memory stays constant however large the dump is. Converted
+venues are written as a JSON array, as newline-delimited JSON, or straight into
+MongoDB with unordered bulk upserts keyed on the venue slug.
+
+Usage:
+    python scripts/convert.py --input scripts/input.json --output mongo_venues.json
+    python scripts/convert.py --input dump.json --output venues.ndjson --workers 8
+    python scripts/convert.py --input dump.json --mongo
+"""
+import os
+import sys
 import json
+import time
 import random
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 def extract_coordinates(coordinates_array):
     """Extract lat/lng from coordinates array"""
     if coordinates_array and len(coordinates_array) > 0 and len(coordinates_array[0]) == 2:
@@ -80,7 +101,7 @@ def convert_venue_to_mongo(venue_data):
         "businessName": venue_data.get('name', ''),
         "slug": slug,
         "businessStartYear": business_start_year,
-        "businessDescription": venue_data.get('description', '').replace('\n', ' ')[:500],  # Limit description
+        "businessDescription": (venue_data.get('description') or '').replace('\n', ' ')[:500],  # Limit description
         "businessEmail": f"info@{slug.replace('-', '')}.com",  # Generate email
         "businessPhone": venue_data.get('phoneNumber', ''),
         "businessWebsite": f"https://www.{slug.replace('-', '')}.com",  # Generate website
@@ -105,11 +126,245 @@ def convert_venue_to_mongo(venue_data):
         "rating": rating,
         "reviewCount": max(review_count, random.randint(50, 200)),  # Ensure minimum reviews
         "budgetMin": f"${budget_min:,}",
-        "budgetMax": f"${budget_max:,}"
+        "budgetMax": f"${budget_max:,}",
+        # Untruncated text kept for multi-vector (chunk) indexing
+        "fullDescription": (venue_data.get('description') or '').replace('\n', ' '),
+        "faqs": [
+            {"question": faq.get('question', ''), "answer": faq.get('answer', '')}
+            for faq in venue_data.get('faqs') or []
+            if faq and faq.get('question') and faq.get('answer')
+        ],
+        "testimonials": [
+            testimonial.get('description', '')
+            for testimonial in venue_data.get('clientTestimonials') or []
+            if testimonial and testimonial.get('description')
+        ]
     }
     
     return mongo_structure
 
+def iter_json_array(json_file_path, read_size=1 << 20):
+    """
+    Yield the elements of a top-level JSON array (or a single top-level object) one at a time.
+
+    The file is read in ``read_size`` blocks and each element is decoded with
+    ``JSONDecoder.raw_decode`` as soon as it is complete, so only the current
+    block and one element are held in memory.
+    """
+    decoder = json.JSONDecoder()
+    with open(json_file_path, 'r', encoding='utf-8') as file:
+        buffer = file.read(read_size)
+        position = 0
+        eof = not buffer
+        in_array = None
+
+        while True:
+            while position < len(buffer) and (buffer[position].isspace() or (in_array and buffer[position] == ',')):
+                position += 1
+            if position == len(buffer):
+                if eof:
+                    return
+                buffer, position = file.read(read_size), 0
+                eof = not buffer
+                continue
+
+            if in_array is None:
+                in_array = buffer[position] == '['
+                if in_array:
+                    position += 1
+                    continue
+            elif in_array and buffer[position] == ']':
+                return
+
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                end = None
+            if end is None or (end == len(buffer) and not eof):
+                # The element continues in the next block
+                chunk = file.read(read_size)
+                eof = not chunk
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+
+            yield value
+            position = end
+            if not in_array:
+                return
+
+
+def iter_batches(items, batch_size):
+    """Group an iterable into lists of ``batch_size`` items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def convert_batch(venues):
+    """
+    Convert a batch of venues in a worker process.
+
+    Returns:
+        tuple: (converted documents, number of venues that failed to convert)
+    """
+    documents = []
+    failed = 0
+    for venue in venues:
+        try:
+            documents.append(convert_venue_to_mongo(venue))
+        except Exception as e:
+            print(f"Error processing venue {venue.get('name', 'Unknown') if isinstance(venue, dict) else venue}: {str(e)}")
+            failed += 1
+    return documents, failed
+
+
+def _seed_worker():
+    # Forked workers inherit the parent's random state; reseed so they do not generate identical values
+    random.seed()
+
+
+def convert_stream(venues, workers=os.cpu_count(), batch_size=200):
+    """
+    Convert venues in batches on a process pool, yielding (documents, failed) per batch in input order.
+
+    At most ``2 * workers`` batches are in flight, so a slow writer holds back the parser
+    instead of letting converted batches pile up in memory.
+    """
+    batches = iter_batches(venues, batch_size)
+    if not workers or workers <= 1:
+        for batch in batches:
+            yield convert_batch(batch)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_seed_worker) as executor:
+        pending = deque()
+        for batch in batches:
+            pending.append(executor.submit(convert_batch, batch))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class JsonArrayWriter:
+    """Write documents to a pretty-printed JSON array, one document at a time."""
+
+    def __init__(self, output_file_path):
+        self.file = open(output_file_path, 'w', encoding='utf-8')
+        self.file.write('[')
+        self.count = 0
+
+    def write(self, documents):
+        for document in documents:
+            self.file.write(',\n' if self.count else '\n')
+            self.file.write(json.dumps(document, indent=2, ensure_ascii=False))
+            self.count += 1
+
+    def close(self):
+        self.file.write('\n]\n')
+        self.file.close()
+
+
+class NdjsonWriter:
+    """Write documents as newline-delimited JSON."""
+
+    def __init__(self, output_file_path):
+        self.file = open(output_file_path, 'w', encoding='utf-8')
+        self.count = 0
+
+    def write(self, documents):
+        self.file.writelines(json.dumps(document, ensure_ascii=False) + '\n' for document in documents)
+        self.count += len(documents)
+
+    def close(self):
+        self.file.close()
+
+
+# Fields the converter generates (or that scripts/update.py refreshes) rather than
+# copies from the scrape: set when a venue is first inserted, never overwritten
+INSERT_ONLY_FIELDS = (
+    "profileImage", "coverImages", "isApproved", "businessStartYear", "businessEmail", "businessWebsite",
+    "contactPerson", "serviceRadius", "leadTime", "responseTime", "lic", "bl", "rating", "reviewCount",
+    "budgetMin", "budgetMax",
+)
+
+
+class MongoWriter:
+    """
+    Upsert documents into MongoDB with one unordered ``bulk_write`` per batch.
+
+    Venues are keyed on their slug (indexed on first use), so re-running a conversion
+    updates the venues in place instead of duplicating them. Scraped fields are
+    ``$set``; generated fields and images are only written on insert (``$setOnInsert``),
+    so a re-run keeps existing ratings, budgets, licenses and refreshed images.
+    Documents without a slug are skipped, as they would all match one another.
+    """
+
+    def __init__(self, uri=None, database_name=None, collection_name=None):
+        from pymongo import MongoClient
+        from configs.settings import MONGO_DB_URI, MONGO_DATABASE_NAME, MONGO_COLLECTION_NAME
+
+        self.client = MongoClient(uri or MONGO_DB_URI)
+        self.collection = self.client[database_name or MONGO_DATABASE_NAME][collection_name or MONGO_COLLECTION_NAME]
+        self.collection.create_index('slug')
+        self.count = 0
+        self.inserted = 0
+        self.matched = 0
+        self.skipped = 0
+        self.failed = 0
+
+    @staticmethod
+    def build_upsert(document):
+        from pymongo import UpdateOne
+
+        update = {
+            '$set': {field: value for field, value in document.items() if field not in INSERT_ONLY_FIELDS},
+            '$setOnInsert': {field: document[field] for field in INSERT_ONLY_FIELDS if field in document},
+        }
+        return UpdateOne({'slug': document['slug']}, update, upsert=True)
+
+    def write(self, documents):
+        from pymongo.errors import BulkWriteError
+
+        operations = []
+        for document in documents:
+            if not document.get('slug'):
+                self.skipped += 1
+                print(f"Skipping venue without a slug: {document.get('businessName') or '<unnamed>'}")
+                continue
+            operations.append(self.build_upsert(document))
+        if not operations:
+            return
+        try:
+            result = self.collection.bulk_write(operations, ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            # Unordered: the rest of the batch is still applied
+            details = e.details
+            print(f"Error writing {len(details.get('writeErrors', []))} venues to MongoDB: {details['writeErrors'][0].get('errmsg')}")
+        self.inserted += details.get('nUpserted', 0)
+        self.matched += details.get('nMatched', 0)
+        self.failed += len(details.get('writeErrors', []))
+        self.count = self.inserted + self.matched
+
+    def close(self):
+        self.client.close()
+
+
+def open_writer(args):
+    if args.mongo:
+        return MongoWriter(args.mongo_uri, args.database, args.collection)
+    output_format = args.format or ('ndjson' if args.output.endswith(('.ndjson', '.jsonl')) else 'json')
+    return NdjsonWriter(args.output) if output_format == 'ndjson' else JsonArrayWriter(args.output)
+
+
 def process_venues(json_file_path, num_venues):
     """
     Process venues from JSON file and convert to MongoDB structure
@@ -121,69 +376,51 @@ def process_venues(json_file_path, num_venues):
     Returns:
         list: List of MongoDB documents
     """
+    documents = []
+    for batch_documents, _ in convert_stream(iter_json_array(json_file_path), workers=1):
+        documents.extend(batch_documents)
+        if len(documents) >= num_venues:
+            break
+    return documents[:num_venues]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert scraped venues into MongoDB venue documents")
+    parser.add_argument("--input", default="scripts/input.json", help="JSON array (or object) of scraped venues")
+    parser.add_argument("--output", default="mongo_venues.json", help="Output file (.ndjson/.jsonl writes newline-delimited JSON)")
+    parser.add_argument("--format", choices=["json", "ndjson"], help="Output format (default: from the output extension)")
+    parser.add_argument("--mongo", action="store_true", help="Upsert straight into MongoDB instead of writing a file")
+    parser.add_argument("--mongo-uri", help="MongoDB URI (default: MONGO_DB_URI)")
+    parser.add_argument("--database", help="MongoDB database (default: MONGO_DATABASE_NAME)")
+    parser.add_argument("--collection", help="MongoDB collection (default: MONGO_COLLECTION_NAME)")
+    parser.add_argument("--limit", type=int, default=None, help="Only convert the first N venues")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Conversion processes (1 converts inline)")
+    parser.add_argument("--batch-size", type=int, default=200, help="Venues per conversion batch and bulk write")
+    args = parser.parse_args()
+
+    venues = iter_json_array(args.input)
+    if args.limit:
+        venues = (venue for _, venue in zip(range(args.limit), venues))
+
+    start = time.monotonic()
+    converted = 0
+    failed = 0
+    writer = open_writer(args)
     try:
-        with open(json_file_path, 'r', encoding='utf-8') as file:
-            venues_data = json.load(file)
-        
-        # Handle both single venue and array of venues
-        if isinstance(venues_data, dict):
-            venues_data = [venues_data]
-        
-        processed_venues = []
-        
-        for i, venue in enumerate(venues_data):
-            if i >= num_venues:
-                break
-                
-            try:
-                mongo_doc = convert_venue_to_mongo(venue)
-                processed_venues.append(mongo_doc)
-                print(f"Processed venue {i+1}: {venue.get('name', 'Unknown')}")
-            except Exception as e:
-                print(f"Error processing venue {i+1}: {str(e)}")
-                continue
-        
-        return processed_venues
-        
-    except FileNotFoundError:
-        print(f"Error: File {json_file_path} not found")
-        return []
-    except json.JSONDecodeError as e:
-        print(f"Error: Invalid JSON in file {json_file_path}: {str(e)}")
-        return []
-    except Exception as e:
-        print(f"Error: {str(e)}")
-        return []
-
-def save_to_file(mongo_documents, output_file_path):
-    """Save MongoDB documents to JSON file"""
-    try:
-        with open(output_file_path, 'w', encoding='utf-8') as file:
-            json.dump(mongo_documents, file, indent=2, ensure_ascii=False)
-        print(f"Successfully saved {len(mongo_documents)} documents to {output_file_path}")
-    except Exception as e:
-        print(f"Error saving to file: {str(e)}")
+        for documents, batch_failed in convert_stream(venues, args.workers, args.batch_size):
+            writer.write(documents)
+            converted += len(documents)
+            failed += batch_failed
+            print(f"Converted {converted} venues ({failed} failed, {converted / (time.monotonic() - start):.0f} venues/s)")
+    finally:
+        writer.close()
+
+    if args.mongo:
+        print(f"MongoDB: {writer.inserted} inserted, {writer.matched} updated, "
+              f"{writer.skipped} skipped without a slug, {writer.failed} failed.")
+    target = "MongoDB" if args.mongo else args.output
+    print(f"\nConversion completed! {converted} venues written to {target} in {time.monotonic() - start:.1f}s, {failed} failed.")
+
 
-# Example usage
 if __name__ == "__main__":
-    # Configuration
-    INPUT_FILE = "scripts/input.json"  # Path to your input JSON file
-    OUTPUT_FILE = "mongo_venues.json"  # Output file path
-    NUM_VENUES = 700  # Number of venues to process
-    
-    print(f"Processing {NUM_VENUES} venues from {INPUT_FILE}...")
-    
-    # Process venues
-    mongo_docs = process_venues(INPUT_FILE, NUM_VENUES)
-    
-    if mongo_docs:
-        # Save to file
-        save_to_file(mongo_docs, OUTPUT_FILE)
-        
-        # Display first document as example
-        print("\nExample of converted document:")
-        print(json.dumps(mongo_docs[0], indent=2))
-        
-        print(f"\nConversion completed! {len(mongo_docs)} venues processed.")
-    else:
-        print("No venues were processed successfully.")
\ No newline at end of file
+    main()
@@ -1,37 +1,118 @@
+"""
+Refresh fields (by default the images) of existing venues from a converted venue file.
+
+Venues are matched on ``businessName``, which is indexed before the first write so
+every lookup is an index hit, and the updates are sent as unordered ``bulk_write``
+batches of ``UpdateOne`` operations.
+
+Usage:
+    python scripts/update.py --input mongo_venues.json
+    python scripts/update.py --input venues.ndjson --fields profileImage,coverImages --batch-size 1000
+"""
+import os
+import sys
 import json
-from pymongo import MongoClient
-
-# Mongo connection
-client = MongoClient("")  # change if needed
-db = client[""]
-collection = db[""]
-
-# Load input.json
-with open("mongo_venues.json", "r") as f:
-    venues = json.load(f)
-
-# Iterate and update
-for venue in venues:
-    business_name = venue.get("businessName")
-    profile_image = venue.get("profileImage")
-    cover_images = venue.get("coverImages")
-
-    if not business_name:
-        print("Skipping entry without businessName:", venue)
-        continue
-
-    update_fields = {}
-    if profile_image:
-        update_fields["profileImage"] = profile_image
-    if cover_images:
-        update_fields["coverImages"] = cover_images
-
-    if update_fields:
-        result = collection.update_one(
-            {"businessName": business_name},
-            {"$set": update_fields}
-        )
-        if result.matched_count > 0:
-            print(f"✅ Updated: {business_name}")
-        else:
-            print(f"⚠️ No match found for: {business_name}")
+import time
+import argparse
+
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from configs.settings import MONGO_DB_URI, MONGO_DATABASE_NAME, MONGO_COLLECTION_NAME
+from scripts.convert import iter_json_array, iter_batches
+
+DEFAULT_FIELDS = ("profileImage", "coverImages")
+
+
+def iter_documents(file_path):
+    """Yield venues from a JSON array or a newline-delimited JSON (.ndjson/.jsonl) file."""
+    if not file_path.endswith(('.ndjson', '.jsonl')):
+        yield from iter_json_array(file_path)
+        return
+    with open(file_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def build_update(venue, key, fields):
+    """Return the UpdateOne setting the non-empty ``fields`` of a venue, or None when there is nothing to set."""
+    key_value = venue.get(key)
+    if not key_value:
+        print(f"Skipping entry without {key}: {venue.get('slug') or venue}")
+        return None
+    update_fields = {field: venue[field] for field in fields if venue.get(field)}
+    if not update_fields:
+        return None
+    return UpdateOne({key: key_value}, {"$set": update_fields})
+
+
+def bulk_update_venues(collection, venues, key="businessName", fields=DEFAULT_FIELDS, batch_size=500):
+    """
+    Update existing venues in unordered ``bulk_write`` batches.
+
+    The lookup index on ``key`` is created first (a no-op when it exists). A write
+    error only fails its own operation; the rest of the batch is still applied.
+
+    Args:
+        collection: MongoDB venues collection
+        venues: Iterable of venue documents
+        key: Field identifying a venue in both the input and the collection
+        fields: Fields copied from the input venue when non-empty
+        batch_size: Operations per bulk_write
+
+    Returns:
+        Dict with the total number of operations, matched, modified and failed venues
+    """
+    collection.create_index(key)
+    totals = {"operations": 0, "matched": 0, "modified": 0, "failed": 0}
+    operations = (build_update(venue, key, fields) for venue in venues)
+
+    for batch_number, batch in enumerate(iter_batches((op for op in operations if op is not None), batch_size), start=1):
+        try:
+            result = collection.bulk_write(batch, ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+            print(f"Batch {batch_number}: {len(details['writeErrors'])} failed, first error: {details['writeErrors'][0].get('errmsg')}")
+        failed = len(details.get('writeErrors', []))
+        totals["operations"] += len(batch)
+        totals["matched"] += details.get('nMatched', 0)
+        totals["modified"] += details.get('nModified', 0)
+        totals["failed"] += failed
+        print(f"Batch {batch_number}: {len(batch)} updates, {details.get('nMatched', 0)} matched, "
+              f"{details.get('nModified', 0)} modified, {len(batch) - details.get('nMatched', 0) - failed} not found")
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk update existing venues from a converted venue file")
+    parser.add_argument("--input", default="mongo_venues.json", help="JSON array or .ndjson/.jsonl file of venues")
+    parser.add_argument("--mongo-uri", default=MONGO_DB_URI, help="MongoDB URI (default: MONGO_DB_URI)")
+    parser.add_argument("--database", default=MONGO_DATABASE_NAME, help="MongoDB database (default: MONGO_DATABASE_NAME)")
+    parser.add_argument("--collection", default=MONGO_COLLECTION_NAME, help="MongoDB collection (default: MONGO_COLLECTION_NAME)")
+    parser.add_argument("--key", default="businessName", help="Field venues are matched on")
+    parser.add_argument("--fields", default=",".join(DEFAULT_FIELDS), help="Comma separated fields to update")
+    parser.add_argument("--batch-size", type=int, default=500, help="Updates per bulk_write")
+    args = parser.parse_args()
+
+    if not args.mongo_uri:
+        parser.error("Set MONGO_DB_URI or pass --mongo-uri")
+    fields = [field.strip() for field in args.fields.split(",") if field.strip()]
+
+    client = MongoClient(args.mongo_uri)
+    start = time.monotonic()
+    try:
+        totals = bulk_update_venues(client[args.database][args.collection], iter_documents(args.input),
+                                    key=args.key, fields=fields, batch_size=args.batch_size)
+    finally:
+        client.close()
+
+    print(f"\nUpdate completed in {time.monotonic() - start:.1f}s: {totals['operations']} updates, "
+          f"{totals['matched']} matched, {totals['modified']} modified, {totals['failed']} failed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+import re
+import time
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from configs.settings import CHUNK_MAX_CHARS, MAX_CHUNKS_PER_VENUE
+from search.results import VenueMatch, VenueQueryResult
+from utils.safe_get import safe_get, safe_str, safe_list
+from utils.metadata_profile import pinecone_metadata, FULL, SELF_CONTAINED
+from utils.batch_processing import create_embeddings, update_metadata_in_pinecone, upsert_chunk_to_pinecone
+from utils.content_hash import hash_content
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def chunk_id(venue_id: str, number: int) -> str:
+    return f"{venue_id}#{number}"
+
+
+def venue_chunk_ids(venue_id: str, max_chunks: int = MAX_CHUNKS_PER_VENUE) -> List[str]:
+    """Every chunk ID a venue can use, for deleting all of its chunks."""
+    return [chunk_id(venue_id, number) for number in range(max_chunks)]
+
+
+def stale_chunk_ids(venue_id: str, chunk_count: int, max_chunks: int = MAX_CHUNKS_PER_VENUE) -> List[str]:
+    """IDs a venue's chunks may have used beyond its current ``chunk_count`` (left over from a longer version)."""
+    return [chunk_id(venue_id, number) for number in range(chunk_count, max_chunks)]
+
+
+def chunk_metadata(venue: dict) -> dict:
+    """Venue metadata shared by all of its chunks: what filters and rendering read, without the venue context."""
+    return pinecone_metadata(venue.get('metadata', {}), SELF_CONTAINED)
+
+
+def split_text(text: str, max_chars: int = CHUNK_MAX_CHARS) -> List[str]:
+    """Split text into windows of whole sentences of at most ``max_chars`` (longer sentences are cut)."""
+    windows = []
+    current = ""
+    for sentence in _SENTENCE_END.split(" ".join(text.split())):
+        while len(sentence) > max_chars:
+            cut = sentence[:max_chars].rsplit(" ", 1)[0] or sentence[:max_chars]
+            if current:
+                windows.append(current)
+                current = ""
+            windows.append(cut)
+            sentence = sentence[len(cut):].strip()
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            windows.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}".strip()
+    if current:
+        windows.append(current)
+    return windows
+
+
+def build_venue_chunks(doc: dict, venue_info: dict, max_chars: int = CHUNK_MAX_CHARS,
+                       max_chunks: int = MAX_CHUNKS_PER_VENUE) -> List[Dict[str, str]]:
+    """
+    Split a venue's description, FAQs and testimonials into chunks of at most ``max_chars``.
+
+    Every chunk starts with the venue name and city so it still says which venue it
+    is about when matched on its own. Description windows come first, then one chunk
+    per FAQ and per testimonial, up to ``max_chunks`` in total.
+
+    Returns:
+        list: {"type": "description" | "faq" | "testimonial", "text": ...} dicts
+    """
+    prefix = f"{venue_info['businessName']} ({venue_info['city']}, {venue_info['state']}): "
+    body_chars = max(max_chars - len(prefix), 100)
+
+    description = safe_str(safe_get(doc, 'fullDescription')) or venue_info.get('businessDescription', '')
+    chunks = [{"type": "description", "text": prefix + window} for window in split_text(description, body_chars)]
+
+    for faq in safe_list(safe_get(doc, 'faqs')):
+        question = safe_str(safe_get(faq, 'question'))
+        answer = safe_str(safe_get(faq, 'answer'))
+        if question and answer:
+            chunks.append({"type": "faq", "text": prefix + f"Q: {question} A: {answer}"[:body_chars]})
+
+    for testimonial in safe_list(safe_get(doc, 'testimonials')):
+        text = " ".join(safe_str(testimonial).split())
+        if text:
+            chunks.append({"type": "testimonial", "text": prefix + text[:body_chars]})
+
+    return chunks[:max_chunks]
+
+
+def build_chunk_vectors(venue_id: str, venue: dict, embeddings: List[Optional[List[float]]]) -> List[dict]:
+    """
+    Pinecone records for a venue's embedded chunks.
+
+    Chunks carry the venue's self-contained metadata, so the same filters apply as
+    on the venue index and results render without the venue context, plus
+    ``parentId``, ``chunkType`` and the chunk text as ``context``.
+    """
+    venue_metadata = chunk_metadata(venue)
+    return [
+        {
+            "id": chunk_id(venue_id, number),
+            "values": embedding,
+            "metadata": {**venue_metadata, "parentId": venue_id, "chunkType": chunk["type"], "context": chunk["text"]},
+        }
+        for number, (chunk, embedding) in enumerate(zip(venue.get('chunks', []), embeddings))
+        if embedding
+    ]
+
+
+def compute_chunk_hashes(venue: dict) -> Tuple[str, str]:
+    """Return (chunk text hash, chunk metadata hash) for an extracted venue."""
+    return hash_content([chunk["text"] for chunk in venue.get('chunks', [])]), hash_content(chunk_metadata(venue))
+
+
+def classify_chunk_items(items: List[tuple], stored: Dict[str, dict]):
+    """
+    Split (venue ID, venue, ...) items against the stored chunk hashes.
+
+    The chunk state is compared on its own, so chunks are (re-)embedded when their
+    texts changed or were never written, whether or not the venue vector changed.
+
+    Returns:
+        tuple: (items whose chunks need embedding, items needing only a chunk metadata update),
+        both as (venue ID, venue, chunk hash, chunk metadata hash)
+    """
+    to_embed = []
+    to_update = []
+    for venue_id, venue, *_ in items:
+        chunk_hash, chunk_metadata_hash = compute_chunk_hashes(venue)
+        previous = stored.get(venue_id) or {}
+        if previous.get('chunkHash') != chunk_hash:
+            to_embed.append((venue_id, venue, chunk_hash, chunk_metadata_hash))
+        elif previous.get('chunkMetadataHash') != chunk_metadata_hash:
+            to_update.append((venue_id, venue, chunk_hash, chunk_metadata_hash))
+    return to_embed, to_update
+
+
+def embed_venue_chunks(openai_client, embedding_model: str,
+                       venues: List[Tuple[str, dict]]) -> Tuple[List[dict], List[str], List[str]]:
+    """
+    Embed the chunks of (venue ID, venue) items in one batched request.
+
+    Chunks are not kept in the embedding store; they are re-embedded whenever a
+    venue's chunk texts change.
+
+    Returns:
+        tuple: (chunk vectors, IDs of stale chunks to delete, IDs of venues with chunks that failed to embed)
+    """
+    texts = [chunk["text"] for _, venue in venues for chunk in venue.get('chunks', [])]
+    embeddings = create_embeddings(openai_client, embedding_model, texts) if texts else []
+
+    vectors = []
+    stale_ids = []
+    failed_ids = []
+    offset = 0
+    for venue_id, venue in venues:
+        count = len(venue.get('chunks', []))
+        venue_vectors = build_chunk_vectors(venue_id, venue, embeddings[offset:offset + count])
+        if len(venue_vectors) < count:
+            logger.error(f"Failed to embed {count - len(venue_vectors)} chunks of venue {venue_id}")
+            failed_ids.append(venue_id)
+        vectors.extend(venue_vectors)
+        stale_ids.extend(stale_chunk_ids(venue_id, count))
+        offset += count
+    return vectors, stale_ids, failed_ids
+
+
+def update_chunk_metadata(index, venue_id: str, venue: dict) -> None:
+    """Push a venue's changed metadata to its chunks; each chunk keeps its own text and type."""
+    metadata = chunk_metadata(venue)
+    for number in range(len(venue.get('chunks', []))):
+        update_metadata_in_pinecone(index, chunk_id(venue_id, number), metadata, profile=FULL)
+
+
+def sync_venue_chunks(chunk_index, openai_client, embedding_model: str, to_embed: List[tuple], to_update: List[tuple],
+                      chunk_size: int = 100) -> Tuple[List[Tuple[str, str, str]], List[str]]:
+    """
+    Write the chunks of classified venues to the chunk index.
+
+    Venues in ``to_embed`` get their chunks embedded and upserted and their stale
+    chunks deleted; venues in ``to_update`` only get their chunk metadata refreshed.
+    A venue counts as synced only when every step for it succeeded, so callers save
+    chunk hashes for synced venues only and failed ones are retried on the next run.
+
+    Args:
+        chunk_index: Pinecone chunk index handle
+        openai_client: OpenAI client
+        embedding_model: Embedding model name
+        to_embed: (venue ID, venue, chunk hash, chunk metadata hash) items from classify_chunk_items
+        to_update: Items whose chunk texts are unchanged but whose metadata changed
+        chunk_size: Vectors per upsert
+
+    Returns:
+        tuple: ((venue ID, chunk hash, chunk metadata hash) entries of synced venues, IDs of failed venues)
+    """
+    failed = set()
+    if to_embed:
+        try:
+            vectors, stale_ids, failed_embeddings = embed_venue_chunks(
+                openai_client, embedding_model, [(venue_id, venue) for venue_id, venue, _, _ in to_embed]
+            )
+            failed.update(failed_embeddings)
+            for start in range(0, len(vectors), chunk_size):
+                upsert_chunk_to_pinecone(chunk_index, vectors[start:start + chunk_size], profile=FULL)
+            # Chunk IDs venues used before their text got shorter; deletes take at most 1000 IDs
+            for start in range(0, len(stale_ids), 1000):
+                chunk_index.delete(ids=stale_ids[start:start + 1000])
+        except Exception as e:
+            logger.error(f"Failed to write the chunks of {len(to_embed)} venues: {e}")
+            failed.update(venue_id for venue_id, *_ in to_embed)
+
+    for venue_id, venue, _, _ in to_update:
+        try:
+            update_chunk_metadata(chunk_index, venue_id, venue)
+        except Exception as e:
+            logger.error(f"Failed to update chunk metadata of venue {venue_id}: {e}")
+            failed.add(venue_id)
+
+    synced = [(venue_id, chunk_hash, metadata_hash) for venue_id, _, chunk_hash, metadata_hash in to_embed + to_update
+              if venue_id not in failed]
+    return synced, sorted(failed)
+
+
+def aggregate_chunk_matches(results, top_k: int, method: str = "max", timings: Optional[dict] = None) -> VenueQueryResult:
+    """
+    Group chunk matches by venue and score each venue by its best chunk ("max") or
+    by the sum of its matched chunks ("sum").
+
+    The venue keeps the metadata of its best chunk, whose text becomes the venue
+    ``context``: the text the cross-encoder scores, also kept in cached results.
+
+    Args:
+        results: Chunk index response (anything with ``matches``)
+        top_k: Number of venues to return
+        method: "max" or "sum"
+        timings: Query timings to carry over; the aggregation time is added as ``aggregate_ms``
+    """
+    start = time.perf_counter()
+    scores: Dict[str, float] = {}
+    best: Dict[str, object] = {}
+    for match in (getattr(results, "matches", None) or []) if results is not None else []:
+        metadata = getattr(match, "metadata", None) or {}
+        venue_id = metadata.get("parentId") or match.id.split("#", 1)[0]
+        if venue_id not in best:
+            # Matches arrive best first, so the first chunk seen is the venue's best chunk
+            best[venue_id] = match
+            scores[venue_id] = match.score
+        elif method == "sum":
+            scores[venue_id] += match.score
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+    matches = []
+    for venue_id, score in ranked:
+        metadata = dict(getattr(best[venue_id], "metadata", None) or {})
+        metadata.pop("parentId", None)
+        metadata.pop("chunkType", None)
+        matches.append(VenueMatch(id=venue_id, score=score, metadata=metadata))
+
+    timings = dict(timings or {})
+    timings["aggregate_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return VenueQueryResult(matches=matches, timings=timings)
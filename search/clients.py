@@ -0,0 +1,409 @@
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional
+
+import httpx
+from openai import OpenAI, AsyncOpenAI
+from pinecone import Pinecone
+from pymongo import MongoClient, AsyncMongoClient, monitoring
+
+from utils.cache import EmbeddingCache, SearchResultCache
+from utils.rate_limit import rate_limiter_stats, close_rate_limiters, aclose_rate_limiters
+from utils.local_embeddings import LocalEmbeddingClient, AsyncLocalEmbeddingClient
+from search.local_index import ReloadingLocalIndex
+from search.sparse import BM25Encoder
+
+from utils.batch_processing import resolve_embedding_dimension
+from configs.settings import (
+    OPENAI_API_KEY,
+    OPENAI_EMBEDDING_MODEL,
+    EMBEDDING_BACKEND,
+    LOCAL_EMBEDDING_MODEL,
+    OPENAI_MAX_CONNECTIONS,
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+    PINECONE_API_KEY,
+    PINECONE_INDEX_NAME,
+    PINECONE_POOL_THREADS,
+    EMBEDDING_CACHE_ENABLED,
+    SEARCH_BACKEND,
+    HYBRID_SEARCH_ENABLED,
+    PINECONE_SPARSE_INDEX_NAME,
+    PINECONE_SPARSE_INDEX_HOST,
+    MULTI_VECTOR_ENABLED,
+    PINECONE_CHUNK_INDEX_NAME,
+    SEARCH_CACHE_ENABLED,
+    SEARCH_CACHE_REDIS_ENABLED,
+    MONGO_DB_URI,
+    MONGO_DATABASE_NAME,
+    MONGO_COLLECTION_NAME,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPoolMetrics(monitoring.ConnectionPoolListener):
+    """Track open and checked out MongoDB connections across all server pools."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open_connections = 0
+        self.in_use = 0
+        self.checkout_failures = 0
+        self.pools_cleared = 0
+
+    def _add(self, attribute: str, amount: int):
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + amount)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._add("pools_cleared", 1)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._add("open_connections", 1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._add("open_connections", -1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._add("checkout_failures", 1)
+
+    def connection_checked_out(self, event):
+        self._add("in_use", 1)
+
+    def connection_checked_in(self, event):
+        self._add("in_use", -1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "open_connections": self.open_connections,
+                "in_use": self.in_use,
+                "checkout_failures": self.checkout_failures,
+                "pools_cleared": self.pools_cleared,
+            }
+
+
+class ClientRegistry:
+    """
+    Process-wide MongoDB, Pinecone and OpenAI clients shared by every request.
+
+    The clients are created once (normally in the FastAPI lifespan) and keep their
+    connection pools alive for the lifetime of the process. Pinecone ``Index``
+    handles are cached per index name so host resolution happens only once.
+    Async clients are created lazily on first use so they bind to the running event loop.
+    With ``EMBEDDING_BACKEND=local`` the embedding clients are in-process
+    sentence-transformers adapters and the model is loaded (and warmed) here.
+    With ``SEARCH_BACKEND=local`` searches run against an in-process exact index
+    built from the on-disk embedding store instead of Pinecone.
+    """
+
+    def __init__(
+        self,
+        mongo_uri: str = None,
+        mongo_max_pool_size: int = MONGO_MAX_POOL_SIZE,
+        mongo_min_pool_size: int = MONGO_MIN_POOL_SIZE,
+        openai_max_connections: int = OPENAI_MAX_CONNECTIONS,
+        openai_max_keepalive_connections: int = OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+        pinecone_pool_threads: int = PINECONE_POOL_THREADS,
+    ):
+        self.index_name = PINECONE_INDEX_NAME
+        self.embedding_backend = EMBEDDING_BACKEND
+        self.embedding_model = LOCAL_EMBEDDING_MODEL if EMBEDDING_BACKEND == "local" else OPENAI_EMBEDDING_MODEL
+        self.mongo_uri = mongo_uri or MONGO_DB_URI
+        self.mongo_max_pool_size = mongo_max_pool_size
+        self.mongo_min_pool_size = mongo_min_pool_size
+        self.openai_max_connections = openai_max_connections
+        self.openai_max_keepalive_connections = openai_max_keepalive_connections
+        self.pinecone_pool_threads = pinecone_pool_threads
+
+        self.pool_metrics = ConnectionPoolMetrics()
+        self.mongo_client = MongoClient(
+            self.mongo_uri,
+            maxPoolSize=mongo_max_pool_size,
+            minPoolSize=mongo_min_pool_size,
+            event_listeners=[self.pool_metrics],
+        )
+
+        # Only the OpenAI backend makes HTTP calls; the local backend embeds in-process
+        self._http_client: Optional[httpx.Client] = None
+        if self.embedding_backend == "local":
+            self.openai_client = LocalEmbeddingClient()
+            self.embedding_dimension = self.openai_client.dimension
+        else:
+            self._http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=openai_max_connections,
+                    max_keepalive_connections=openai_max_keepalive_connections,
+                )
+            )
+            self.openai_client = OpenAI(api_key=OPENAI_API_KEY, http_client=self._http_client)
+            self.embedding_dimension = resolve_embedding_dimension(OPENAI_EMBEDDING_MODEL)
+        self.search_backend = SEARCH_BACKEND
+        self._local_index: Optional[ReloadingLocalIndex] = None
+        self.hybrid_enabled = HYBRID_SEARCH_ENABLED
+        self.sparse_index_name = PINECONE_SPARSE_INDEX_NAME
+        self._bm25_encoder: Optional[BM25Encoder] = None
+        self.multi_vector_enabled = MULTI_VECTOR_ENABLED
+        self.chunk_index_name = PINECONE_CHUNK_INDEX_NAME
+        self.pinecone_client = Pinecone(api_key=PINECONE_API_KEY, pool_threads=pinecone_pool_threads)
+
+        self.embedding_cache = EmbeddingCache() if EMBEDDING_CACHE_ENABLED else None
+        # Cached results are only validated against the index version stamp in Redis
+        self.search_cache = SearchResultCache(index_name=self.index_name) if SEARCH_CACHE_ENABLED and SEARCH_CACHE_REDIS_ENABLED else None
+        if SEARCH_CACHE_ENABLED and not SEARCH_CACHE_REDIS_ENABLED:
+            logger.warning("Search result cache disabled: it needs Redis (SEARCH_CACHE_REDIS_ENABLED) to detect re-indexing")
+
+        self._indexes: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+        self._async_mongo_client: Optional[AsyncMongoClient] = None
+        self._async_openai_client: Optional[AsyncOpenAI] = None
+        self._async_indexes: Dict[str, object] = {}
+        self._async_index_lock = asyncio.Lock()
+        logger.info(
+            f"Client registry created (mongo pool={mongo_max_pool_size}, "
+            f"openai connections={openai_max_connections}, pinecone threads={pinecone_pool_threads})"
+        )
+
+    def collection(self, database_name: str = None, collection_name: str = None):
+        """Return a collection handle backed by the shared MongoDB pool."""
+        database = self.mongo_client[database_name or MONGO_DATABASE_NAME]
+        return database[collection_name or MONGO_COLLECTION_NAME]
+
+    def index(self, index_name: str = None):
+        """Return a cached Pinecone ``Index`` handle."""
+        index_name = index_name or self.index_name
+        index = self._indexes.get(index_name)
+        if index is None:
+            with self._lock:
+                index = self._indexes.get(index_name)
+                if index is None:
+                    index = self.pinecone_client.Index(index_name, pool_threads=self.pinecone_pool_threads)
+                    self._indexes[index_name] = index
+                    logger.info(f"Cached Pinecone index handle: {index_name}")
+        return index
+
+    def sparse_index(self):
+        """Return the cached handle of the BM25 sparse index (by host when PINECONE_SPARSE_INDEX_HOST is set)."""
+        if not PINECONE_SPARSE_INDEX_HOST:
+            return self.index(self.sparse_index_name)
+        index = self._indexes.get(self.sparse_index_name)
+        if index is None:
+            with self._lock:
+                index = self._indexes.get(self.sparse_index_name)
+                if index is None:
+                    index = self.pinecone_client.Index(host=PINECONE_SPARSE_INDEX_HOST, pool_threads=self.pinecone_pool_threads)
+                    self._indexes[self.sparse_index_name] = index
+        return index
+
+    async def async_sparse_index(self):
+        """Return the cached asyncio handle of the BM25 sparse index."""
+        if not PINECONE_SPARSE_INDEX_HOST:
+            return await self.async_index(self.sparse_index_name)
+        index = self._async_indexes.get(self.sparse_index_name)
+        if index is None:
+            index = self.pinecone_client.IndexAsyncio(host=PINECONE_SPARSE_INDEX_HOST)
+            self._async_indexes[self.sparse_index_name] = index
+        return index
+
+    def chunk_index(self):
+        """Return the cached handle of the multi-vector chunk index."""
+        return self.index(self.chunk_index_name)
+
+    async def async_chunk_index(self):
+        """Return the cached asyncio handle of the multi-vector chunk index."""
+        return await self.async_index(self.chunk_index_name)
+
+    def bm25_encoder(self) -> BM25Encoder:
+        """Return the BM25 query encoder with the corpus statistics saved by the last ingestion."""
+        if self._bm25_encoder is None:
+            self._bm25_encoder = BM25Encoder.load()
+        return self._bm25_encoder
+
+    def local_index(self) -> ReloadingLocalIndex:
+        """Return the in-process vector index, loading it from the embedding store on first use."""
+        if self._local_index is None:
+            with self._lock:
+                if self._local_index is None:
+                    self._local_index = ReloadingLocalIndex(self.embedding_model, self.embedding_dimension)
+        return self._local_index
+
+    @property
+    def async_mongo_client(self) -> AsyncMongoClient:
+        """Return the shared async MongoDB client."""
+        if self._async_mongo_client is None:
+            self._async_mongo_client = AsyncMongoClient(
+                self.mongo_uri,
+                maxPoolSize=self.mongo_max_pool_size,
+                minPoolSize=self.mongo_min_pool_size,
+                event_listeners=[self.pool_metrics],
+            )
+        return self._async_mongo_client
+
+    @property
+    def async_openai_client(self) -> AsyncOpenAI:
+        """Return the shared async OpenAI client."""
+        if self._async_openai_client is None and self.embedding_backend == "local":
+            self._async_openai_client = AsyncLocalEmbeddingClient(self.openai_client)
+        if self._async_openai_client is None:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.openai_max_connections,
+                    max_keepalive_connections=self.openai_max_keepalive_connections,
+                )
+            )
+            self._async_openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=http_client)
+        return self._async_openai_client
+
+    def async_collection(self, database_name: str = None, collection_name: str = None):
+        """Return a collection handle backed by the shared async MongoDB pool."""
+        database = self.async_mongo_client[database_name or MONGO_DATABASE_NAME]
+        return database[collection_name or MONGO_COLLECTION_NAME]
+
+    async def async_index(self, index_name: str = None):
+        """Return a cached asyncio Pinecone index handle."""
+        index_name = index_name or self.index_name
+        index = self._async_indexes.get(index_name)
+        if index is None:
+            async with self._async_index_lock:
+                index = self._async_indexes.get(index_name)
+                if index is None:
+                    description = await asyncio.to_thread(self.pinecone_client.describe_index, index_name)
+                    index = self.pinecone_client.IndexAsyncio(host=description.host)
+                    self._async_indexes[index_name] = index
+                    logger.info(f"Cached async Pinecone index handle: {index_name}")
+        return index
+
+    def metrics(self) -> dict:
+        """Return pool sizes and current usage for the shared clients."""
+        return {
+            "mongo": {
+                "max_pool_size": self.mongo_max_pool_size,
+                **self.pool_metrics.snapshot(),
+            },
+            "openai": {
+                "embedding_backend": self.embedding_backend,
+                "embedding_model": self.embedding_model,
+                "max_connections": self.openai_max_connections,
+            },
+            "search_backend": self.search_backend,
+            "local_index_size": len(self._local_index) if self._local_index is not None else None,
+            "pinecone": {
+                "pool_threads": self.pinecone_pool_threads,
+                "cached_indexes": sorted(self._indexes),
+                "cached_async_indexes": sorted(self._async_indexes),
+            },
+            "embedding_cache": self.embedding_cache.stats() if self.embedding_cache else None,
+            "search_cache": self.search_cache.stats() if self.search_cache else None,
+            "rate_limiters": rate_limiter_stats(),
+        }
+
+    def close(self):
+        """Close every pooled connection held by the registry."""
+        for index_name, index in list(self._indexes.items()):
+            try:
+                close = getattr(index, "close", None)
+                if close:
+                    close()
+            except Exception as e:
+                logger.warning(f"Error closing Pinecone index {index_name}: {e}")
+        self._indexes.clear()
+
+        try:
+            self.openai_client.close()
+        except Exception as e:
+            logger.warning(f"Error closing OpenAI client: {e}")
+        if self._http_client is not None:
+            self._http_client.close()
+            self._http_client = None
+
+        if self.embedding_cache:
+            self.embedding_cache.close()
+        if self.search_cache:
+            self.search_cache.close()
+        close_rate_limiters()
+
+        self.mongo_client.close()
+        logger.info("Client registry closed")
+
+    async def aclose(self):
+        """Close the async clients, then every sync pooled connection."""
+        for index_name, index in list(self._async_indexes.items()):
+            try:
+                await index.close()
+            except Exception as e:
+                logger.warning(f"Error closing async Pinecone index {index_name}: {e}")
+        self._async_indexes.clear()
+
+        if self._async_openai_client is not None:
+            try:
+                await self._async_openai_client.close()
+            except Exception as e:
+                logger.warning(f"Error closing async OpenAI client: {e}")
+            self._async_openai_client = None
+
+        if self._async_mongo_client is not None:
+            await self._async_mongo_client.close()
+            self._async_mongo_client = None
+
+        if self.embedding_cache:
+            await self.embedding_cache.aclose()
+        if self.search_cache:
+            await self.search_cache.aclose()
+        await aclose_rate_limiters()
+
+        self.close()
+
+
+_registry: Optional[ClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def init_client_registry(**kwargs) -> ClientRegistry:
+    """Create the process-wide client registry if it does not exist yet."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ClientRegistry(**kwargs)
+        return _registry
+
+
+def get_client_registry() -> ClientRegistry:
+    """Return the process-wide client registry, creating it lazily outside the app (scripts, tests)."""
+    return _registry or init_client_registry()
+
+
+def close_client_registry():
+    """Close and drop the process-wide client registry."""
+    global _registry
+    with _registry_lock:
+        if _registry is not None:
+            _registry.close()
+            _registry = None
+
+
+async def aclose_client_registry():
+    """Close and drop the process-wide client registry from inside the event loop."""
+    global _registry
+    with _registry_lock:
+        registry, _registry = _registry, None
+    if registry is not None:
+        await registry.aclose()
@@ -1,18 +1,35 @@
 import os
 import sys
+import time
 
 # Add the parent directory to the Python path to allow imports from other modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import logging
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 from pinecone import Pinecone, ServerlessSpec
-from pymongo import MongoClient
-from pymongo.errors import PyMongoError
+from pymongo import MongoClient, ASCENDING
+from pymongo.errors import PyMongoError, CursorNotFound, AutoReconnect, NetworkTimeout
+from bson import ObjectId
+from bson.errors import InvalidId
 import logging
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from utils.safe_get import safe_get, safe_str, safe_int, safe_float, safe_bool, safe_list
-from utils.batch_processing import insert_data_in_chunks_into_pinecone, retry_with_exponential_backoff, create_embedding
+from utils.batch_processing import insert_data_in_chunks_into_pinecone, retry_with_exponential_backoff, create_embedding, acreate_embedding, create_embeddings, update_metadata_in_pinecone, upsert_chunk_to_pinecone, resolve_embedding_dimension
+from utils.pipeline import run_ingestion_pipeline, embed_venue_batch, upsert_from_embedding_store
+from utils.embedding_store import EmbeddingStore
+from utils.content_hash import VenueHashStore, compute_venue_hashes, classify_by_hashes
+from search.clients import get_client_registry
+from search.results import VenueMatch, VenueQueryResult
+from utils.cache import EmbeddingCache, bump_index_version
+from utils.local_embeddings import LocalEmbeddingClient
+from search.sparse import BM25Encoder, build_sparse_vectors
+from search.fusion import fuse_hybrid_results
+from search.chunks import build_venue_chunks, classify_chunk_items, sync_venue_chunks, venue_chunk_ids, aggregate_chunk_matches
+from utils.geo import geohash_cells
+from utils.metadata_profile import cacheable_metadata
 import re
 
 def parse_currency_to_int(currency_str):
@@ -33,18 +50,39 @@ def parse_currency_to_int(currency_str):
 
 from configs.settings import (
     OPENAI_API_KEY, 
+    OPENAI_EMBEDDING_MODEL,
+    EMBEDDING_DIMENSION,
+    EMBEDDING_BACKEND,
+    LOCAL_EMBEDDING_MODEL,
+    LOCAL_EMBEDDING_BATCH_SIZE,
     PINECONE_API_KEY, 
     PINECONE_INDEX_NAME, 
     PINECONE_ENVIRONMENT,
     PINECONE_CLOUD,
     MONGO_DB_URI,
     MONGO_DATABASE_NAME,
-    MONGO_COLLECTION_NAME
+    MONGO_COLLECTION_NAME,
+    PINECONE_SYNC_STATE_COLLECTION,
+    EMBEDDING_STORE_ENABLED,
+    HYBRID_SEARCH_ENABLED,
+    PINECONE_SPARSE_INDEX_NAME,
+    PINECONE_SPARSE_INDEX_HOST,
+    HYBRID_FUSION_METHOD,
+    HYBRID_DENSE_WEIGHT,
+    HYBRID_RRF_K,
+    HYBRID_CANDIDATE_MULTIPLIER,
+    MULTI_VECTOR_ENABLED,
+    PINECONE_CHUNK_INDEX_NAME,
+    CHUNK_AGGREGATION,
+    CHUNK_OVERFETCH_MULTIPLIER
 )
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Key of the change stream resume token in the sync state collection
+RESUME_TOKEN_KEY = "__resume_token__"
+
 
 def initialize_mongo_client(database_name: str = None, collection_name: str = None):
     """Create clients for MongoDB."""
@@ -65,15 +103,19 @@ def initialize_pinecone_client():
     return pinecone_client, pinecone_index_name, pinecone_cloud, pinecone_environment
 
 def initialize_openai_client():
+    """Create the embedding client selected by EMBEDDING_BACKEND ("openai" or "local")."""
+    if EMBEDDING_BACKEND == "local":
+        openai_client = LocalEmbeddingClient()
+        return openai_client, LOCAL_EMBEDDING_MODEL, openai_client.dimension, LOCAL_EMBEDDING_BATCH_SIZE
     openai_client = OpenAI(api_key=OPENAI_API_KEY)
-    embedding_model = "text-embedding-3-small"
-    embedding_dimension = 1536
+    embedding_model = OPENAI_EMBEDDING_MODEL
+    embedding_dimension = resolve_embedding_dimension(embedding_model)
     batch_size = 100
     return openai_client, embedding_model, embedding_dimension, batch_size
 
 
 @retry_with_exponential_backoff(max_retries=3, base_delay=2.0, max_delay=30.0)
-def create_pinecone_index(pinecone_client: Pinecone, index_name: str,region: str,  dimension: int = 1536, metric: str = "cosine", cloud: str = "aws"):
+def create_pinecone_index(pinecone_client: Pinecone, index_name: str,region: str,  dimension: int = EMBEDDING_DIMENSION, metric: str = "cosine", cloud: str = "aws"):
     """Create a Pinecone index with serverless specification."""
     try:
         if not pinecone_client.has_index(index_name):
@@ -91,6 +133,11 @@ def create_pinecone_index(pinecone_client: Pinecone, index_name: str,region: str
             index = pinecone_client.Index(index_name)
             return index
         else:
+            existing_dimension = pinecone_client.describe_index(index_name).dimension
+            if existing_dimension != dimension:
+                # Vectors of another size would be rejected on every upsert; use a new index name instead
+                raise ValueError(f"Pinecone index {index_name} has dimension {existing_dimension}, "
+                                 f"but embeddings are {dimension}-dimensional")
             logger.info(f"Using existing Pinecone index: {index_name}")
             index = pinecone_client.Index(index_name)
             return index
@@ -100,6 +147,25 @@ def create_pinecone_index(pinecone_client: Pinecone, index_name: str,region: str
         raise
 
 
+@retry_with_exponential_backoff(max_retries=3, base_delay=2.0, max_delay=30.0)
+def create_sparse_pinecone_index(pinecone_client: Pinecone, index_name: str, region: str, cloud: str = "aws"):
+    """Create (or connect to) the dotproduct sparse index holding BM25 vectors."""
+    if PINECONE_SPARSE_INDEX_HOST:
+        # Local or dedicated deployment (e.g. the sparse-index container in docker-compose)
+        return pinecone_client.Index(host=PINECONE_SPARSE_INDEX_HOST)
+    if not pinecone_client.has_index(index_name):
+        logger.info(f"Creating new sparse Pinecone index: {index_name}")
+        pinecone_client.create_index(
+            name=index_name,
+            metric="dotproduct",
+            vector_type="sparse",
+            spec=ServerlessSpec(cloud=cloud, region=region)
+        )
+    else:
+        logger.info(f"Using existing sparse Pinecone index: {index_name}")
+    return pinecone_client.Index(index_name)
+
+
 def extract_single_venue_fields(doc: dict):
     """Extract and process fields from a single MongoDB document for embedding."""
     try:
@@ -158,6 +224,7 @@ def extract_single_venue_fields(doc: dict):
             "isApproved": venue_info['isApproved'],
             "lat": venue_info['lat'],
             "lng": venue_info['lng'],
+            "geohashes": geohash_cells(venue_info['lat'], venue_info['lng']),
             "serviceRadius": venue_info['serviceRadius'],
             "leadTime": venue_info['leadTime'],
             "responseTime": venue_info['responseTime'],
@@ -178,6 +245,9 @@ def extract_single_venue_fields(doc: dict):
         if not venue_info['_id'] or not venue_info['businessName']:
             logger.warning(f"Incomplete doc: ID={venue_info['_id']}, Name={venue_info['businessName']}")
             return None
+
+        if MULTI_VECTOR_ENABLED:
+            venue_info['chunks'] = build_venue_chunks(doc, venue_info)
             
         return venue_info
 
@@ -186,19 +256,77 @@ def extract_single_venue_fields(doc: dict):
         return None
 
 
+# Fields read by extract_single_venue_fields; images, licenses and other heavy fields stay on the server
+VENUE_SOURCE_PROJECTION = {
+    field: 1 for field in (
+        'accountId', 'isApproved', 'rating', 'reviewCount', 'vendorType', 'serveEvents',
+        'businessName', 'businessDescription', 'businessEmail', 'businessPhone', 'contactPerson',
+        'line_one', 'line_two', 'city', 'state', 'zip', 'country', 'serviceRadius', 'leadTime',
+        'responseTime', 'serviceLanguages', 'accessibility', 'budgetMin', 'budgetMax', 'lat', 'lng'
+    )
+}
+if MULTI_VECTOR_ENABLED:
+    VENUE_SOURCE_PROJECTION.update({'fullDescription': 1, 'faqs': 1, 'testimonials': 1})
+
+
+def iter_venue_documents(
+    collection,
+    batch_size: int = 500,
+    start_after: str = None,
+    projection: dict = VENUE_SOURCE_PROJECTION,
+    max_resume_attempts: int = 5
+):
+    """
+    Stream raw venue documents from MongoDB in ``_id`` order.
+
+    The cursor fetches ``batch_size`` documents per round trip with a server-side
+    projection. If the cursor is lost (timeout, failover) it is reopened after the
+    last ``_id`` seen, so the scan resumes instead of restarting.
+
+    Args:
+        collection: MongoDB venues collection
+        batch_size: Documents fetched per cursor batch
+        start_after: Only yield venues whose ``_id`` is greater than this ID (resume point)
+        projection: Server-side projection applied to every document
+        max_resume_attempts: Consecutive cursor failures tolerated before giving up
+    """
+    last_id = ObjectId(start_after) if start_after else None
+    attempts = 0
+
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id else {}
+        cursor = collection.find(query, projection).sort("_id", ASCENDING).batch_size(batch_size)
+        try:
+            for doc in cursor:
+                last_id = doc["_id"]
+                attempts = 0
+                yield doc
+            return
+        except (CursorNotFound, AutoReconnect, NetworkTimeout) as e:
+            attempts += 1
+            if attempts > max_resume_attempts:
+                logger.error(f"Mongo cursor failed {attempts} times in a row, giving up after _id {last_id}")
+                raise
+            logger.warning(f"Mongo cursor lost ({e}), resuming after _id {last_id}")
+        finally:
+            cursor.close()
+
+
+def iter_venues_from_mongo(collection, batch_size: int = 500, start_after: str = None):
+    """Stream extracted venues (with 'context' and 'metadata') from MongoDB without materializing the collection."""
+    for doc in iter_venue_documents(collection, batch_size=batch_size, start_after=start_after):
+        venue_info = extract_single_venue_fields(doc)
+        if venue_info:
+            yield venue_info
+
+
 def extract_fields_from_mongo_db(mongo_client: MongoClient, database: str, collection: str):
     """Extract Venues information from MongoDB and creates the necessary fields for embedding."""
     try:
-        db = mongo_client[database]
-        coll = db[collection]
+        coll = mongo_client[database][collection]
         
-        documents = []
         logger.info("Starting document extraction from MongoDB...")
-        
-        for doc in coll.find():
-            venue_info = extract_single_venue_fields(doc)
-            if venue_info:
-                documents.append(venue_info)
+        documents = list(iter_venues_from_mongo(coll))
         
         logger.info(f"Extracted {len(documents)} valid venues")
         return documents
@@ -214,8 +342,8 @@ def insert_data_into_pinecone(pinecone_client: Pinecone, openai_client: OpenAI,
     index = pinecone_client.Index(index_name)
     vectors = []
 
-    for venue in venues_data:
-        embedding = create_embedding(openai_client, embedding_model, venue['context'])
+    embeddings = create_embeddings(openai_client, embedding_model, [venue['context'] for venue in venues_data])
+    for venue, embedding in zip(venues_data, embeddings):
         if embedding:
             vectors.append({
                 "id": venue["_id"],
@@ -231,7 +359,17 @@ def insert_data_into_pinecone(pinecone_client: Pinecone, openai_client: OpenAI,
 
 
 @retry_with_exponential_backoff(max_retries=3, base_delay=1.0, max_delay=30.0)
-def search_venues_in_pinecone(pinecone_client: Pinecone, index_name: str, query: str, top_k: int = 10, filters: dict = None):
+def search_venues_in_pinecone(
+    pinecone_client: Pinecone,
+    index_name: str,
+    query: str,
+    top_k: int = 10,
+    filters: dict = None,
+    openai_client: OpenAI = None,
+    embedding_model: str = None,
+    index=None,
+    embedding_cache: EmbeddingCache = None
+):
     """Search venues in Pinecone.
     Args:
         pinecone_client: Pinecone client
@@ -239,11 +377,18 @@ def search_venues_in_pinecone(pinecone_client: Pinecone, index_name: str, query:
         query: Search query
         top_k: Number of results to return
         filters: Filters to apply to the search
+        openai_client: Shared OpenAI client (a new one is created when omitted)
+        embedding_model: Embedding model to use with the shared OpenAI client
+        index: Cached Pinecone index handle (resolved from the client when omitted)
+        embedding_cache: Optional query embedding cache
     """
-    openai_client, embedding_model, embedding_dimension, batch_size = initialize_openai_client()
+    if openai_client is None:
+        openai_client, embedding_model, embedding_dimension, batch_size = initialize_openai_client()
+    embedding_model = embedding_model or OPENAI_EMBEDDING_MODEL
 
-    index = pinecone_client.Index(index_name)
-    query_vector = create_embedding(openai_client, embedding_model, query)
+    if index is None:
+        index = pinecone_client.Index(index_name)
+    query_vector = create_embedding(openai_client, embedding_model, query, cache=embedding_cache)
     
     if not query_vector:
         logger.error("Failed to create query vector")
@@ -258,6 +403,41 @@ def search_venues_in_pinecone(pinecone_client: Pinecone, index_name: str, query:
     return query_results
 
 
+@retry_with_exponential_backoff(max_retries=3, base_delay=1.0, max_delay=30.0)
+async def asearch_venues_in_pinecone(
+    index,
+    openai_client: AsyncOpenAI,
+    embedding_model: str,
+    query: str,
+    top_k: int = 10,
+    filters: dict = None,
+    embedding_cache: EmbeddingCache = None
+):
+    """Search venues in Pinecone without blocking the event loop.
+    Args:
+        index: Asyncio Pinecone index handle
+        openai_client: Async OpenAI client
+        embedding_model: Embedding model name
+        query: Search query
+        top_k: Number of results to return
+        filters: Filters to apply to the search
+        embedding_cache: Optional query embedding cache
+    """
+    query_vector = await acreate_embedding(openai_client, embedding_model, query, cache=embedding_cache)
+    
+    if not query_vector:
+        logger.error("Failed to create query vector")
+        return None
+    
+    query_results = await index.query(
+        vector=query_vector,
+        top_k=top_k,
+        include_metadata=True,
+        filter=filters
+    )
+    return query_results
+
+
 def delete_data_from_pinecone(pinecone_client: Pinecone, index_name: str, ids: List[str]):
     """Delete data from Pinecone."""
     index = pinecone_client.Index(index_name)
@@ -270,13 +450,291 @@ def update_data_in_pinecone(pinecone_client: Pinecone, index_name: str, ids: Lis
     index.upsert(vectors=data)
     logger.info(f"Updated {len(ids)} venue vectors in Pinecone")
 
+def load_resume_token(state_collection, index_name: str):
+    """Load the persisted change stream resume token for an index."""
+    doc = state_collection.find_one({"_id": f"{index_name}:{RESUME_TOKEN_KEY}"})
+    return doc.get("token") if doc else None
+
+
+def save_resume_token(state_collection, index_name: str, token):
+    """Persist the change stream resume token after a batch has been applied."""
+    state_collection.update_one(
+        {"_id": f"{index_name}:{RESUME_TOKEN_KEY}"},
+        {"$set": {"token": token, "updatedAt": time.time()}},
+        upsert=True
+    )
+
+
+def apply_venue_changes(
+    changes: Dict[str, Optional[dict]],
+    pinecone_client: Pinecone,
+    openai_client: OpenAI,
+    embedding_model: str,
+    index_name: str,
+    hash_store: VenueHashStore,
+    chunk_size: int = 100,
+    embedding_store: Optional[EmbeddingStore] = None,
+    sparse_index=None,
+    bm25_encoder: Optional[BM25Encoder] = None,
+    chunk_index=None
+):
+    """
+    Apply a batch of changed venues to Pinecone.
+
+    Args:
+        changes: Venue ID -> latest full document, or None when the venue was deleted
+        pinecone_client: Pinecone client
+        openai_client: OpenAI client
+        embedding_model: Embedding model name
+        index_name: Pinecone index name
+        hash_store: Content hashes used to re-embed only changed contexts
+        chunk_size: Pinecone upsert chunk size
+        embedding_store: On-disk store of computed vectors, reused and kept in sync when given
+        sparse_index: BM25 sparse index kept in sync with the dense index (requires ``bm25_encoder``)
+        bm25_encoder: BM25 encoder with the saved corpus statistics
+        chunk_index: Multi-vector chunk index kept in sync with the dense index
+
+    Every stage records the venues it could not apply instead of raising, so one
+    Pinecone or OpenAI error does not abort the rest of the batch. The hashes of
+    failed venues are not saved, so re-applying their change redoes all of it.
+
+    Returns:
+        Dict with the number of upserted, metadata-updated, unchanged and deleted venues,
+        and 'failed_ids': the venues whose change must be applied again
+    """
+    deleted_ids = [venue_id for venue_id, doc in changes.items() if doc is None]
+    items = []
+    for venue_id, doc in changes.items():
+        if doc is None:
+            continue
+        venue = extract_single_venue_fields(doc)
+        if venue:
+            items.append((venue_id, venue, *compute_venue_hashes(venue)))
+        else:
+            # A venue that no longer passes validation must not stay searchable
+            deleted_ids.append(venue_id)
+
+    stored = hash_store.get_many(venue_id for venue_id, *_ in items)
+    to_embed, to_update, unchanged = classify_by_hashes(items, stored)
+
+    vectors, hash_entries, _, _ = embed_venue_batch(openai_client, embedding_model, to_embed, embedding_store)
+    embedded = {vector["id"] for vector in vectors}
+    # Venues whose change was not fully applied; their hashes are not saved so the change is retried
+    failed_ids = {venue_id for venue_id, *_ in to_embed if venue_id not in embedded}
+
+    for chunk_start in range(0, len(vectors), chunk_size):
+        chunk = vectors[chunk_start:chunk_start + chunk_size]
+        try:
+            update_data_in_pinecone(pinecone_client, index_name, [vector["id"] for vector in chunk], chunk)
+            if sparse_index is not None:
+                upsert_chunk_to_pinecone(sparse_index, build_sparse_vectors(bm25_encoder, chunk))
+        except Exception as e:
+            logger.error(f"Failed to upsert {len(chunk)} changed venues: {e}")
+            failed_ids.update(vector["id"] for vector in chunk)
+
+    # Chunk state is hashed on its own: chunks of unchanged venues are synced too when they are missing
+    chunk_failed_ids = []
+    if chunk_index is not None:
+        chunks_to_embed, chunks_to_update = classify_chunk_items(items, stored)
+        synced, chunk_failed_ids = sync_venue_chunks(chunk_index, openai_client, embedding_model,
+                                                     chunks_to_embed, chunks_to_update, chunk_size)
+        hash_store.save_chunk_hashes(synced)
+
+    updated = []
+    deleted = 0
+    if to_update:
+        index = pinecone_client.Index(index_name)
+        for venue_id, venue, context_hash, metadata_hash in to_update:
+            try:
+                update_metadata_in_pinecone(index, venue_id, venue['metadata'])
+                if sparse_index is not None:
+                    update_metadata_in_pinecone(sparse_index, venue_id, venue['metadata'])
+            except Exception as e:
+                logger.error(f"Failed to update metadata for venue {venue_id}: {e}")
+                failed_ids.add(venue_id)
+                continue
+            hash_entries.append((venue_id, context_hash, metadata_hash))
+            updated.append((venue_id, venue['metadata']))
+        if embedding_store is not None:
+            embedding_store.update_metadata(updated)
+
+    if deleted_ids:
+        try:
+            delete_data_from_pinecone(pinecone_client, index_name, deleted_ids)
+            if sparse_index is not None:
+                sparse_index.delete(ids=deleted_ids)
+            if chunk_index is not None:
+                chunk_ids = [chunk_id for venue_id in deleted_ids for chunk_id in venue_chunk_ids(venue_id)]
+                for chunk_start in range(0, len(chunk_ids), 1000):
+                    chunk_index.delete(ids=chunk_ids[chunk_start:chunk_start + 1000])
+            hash_store.delete_many(deleted_ids)
+            if embedding_store is not None:
+                embedding_store.delete_many(deleted_ids)
+            deleted = len(deleted_ids)
+        except Exception as e:
+            logger.error(f"Failed to delete {len(deleted_ids)} venues: {e}")
+            failed_ids.update(deleted_ids)
+
+    hash_store.save_many([entry for entry in hash_entries if entry[0] not in failed_ids])
+    return {
+        "upserted": len(embedded - failed_ids),
+        "metadata_updates": len(updated),
+        "unchanged": unchanged,
+        "deleted": deleted,
+        "failed_ids": sorted(failed_ids.union(chunk_failed_ids))
+    }
+
+
+def watch_venue_changes(
+    collection,
+    state_collection,
+    pinecone_client: Pinecone,
+    openai_client: OpenAI,
+    embedding_model: str,
+    index_name: str,
+    batch_window: float = 2.0,
+    max_batch_size: int = 500,
+    max_retry_delay: float = 60.0,
+    start_at_operation_time=None,
+    embedding_store: Optional[EmbeddingStore] = None,
+    sparse_index=None,
+    bm25_encoder: Optional[BM25Encoder] = None,
+    chunk_index=None
+):
+    """
+    Keep Pinecone in sync with MongoDB by consuming the venues change stream.
+
+    Inserts, updates, replaces and deletes are collected for up to ``batch_window``
+    seconds (or ``max_batch_size`` venues), collapsed per venue, and applied in bulk.
+    The resume token is persisted only once every change up to it has been applied,
+    so a restart continues exactly where the previous consumer stopped. Venues that
+    failed are carried into the next batch and retried with a growing delay; until
+    they succeed the stored token stays before them and a restart replays them.
+
+    Args:
+        collection: MongoDB venues collection
+        state_collection: Collection holding content hashes and the resume token
+        pinecone_client: Pinecone client
+        openai_client: OpenAI client
+        embedding_model: Embedding model name
+        index_name: Pinecone index name
+        batch_window: Seconds to accumulate changes before applying them
+        max_batch_size: Maximum number of changed venues per batch
+        max_retry_delay: Upper bound in seconds of the delay between retries of failed venues
+        start_at_operation_time: Cluster time to start from when no resume token is stored
+        embedding_store: On-disk store of computed vectors, kept in sync with the applied changes
+        sparse_index: BM25 sparse index kept in sync with the dense index
+        bm25_encoder: BM25 encoder with the saved corpus statistics
+        chunk_index: Multi-vector chunk index kept in sync with the dense index
+    """
+    hash_store = VenueHashStore(state_collection, index_name)
+    resume_token = load_resume_token(state_collection, index_name)
+    watch_options = {"resume_after": resume_token} if resume_token else {"start_at_operation_time": start_at_operation_time}
+    change_filter = [{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}}]
+
+    logger.info(f"Watching {collection.name} for changes (resuming: {resume_token is not None})")
+    with collection.watch(change_filter, full_document="updateLookup",
+                          max_await_time_ms=int(batch_window * 500), **watch_options) as stream:
+        # Failed changes waiting to be retried; newer changes of the same venue replace them
+        pending: Dict[str, Optional[dict]] = {}
+        retry_delay = batch_window
+        while stream.alive:
+            changes: Dict[str, Optional[dict]] = dict(pending)
+            deadline = time.monotonic() + retry_delay if pending else None
+
+            while stream.alive:
+                change = stream.try_next()
+                if change is not None:
+                    venue_id = str(change["documentKey"]["_id"])
+                    # The looked-up document is None when the venue was deleted after the update
+                    changes[venue_id] = None if change["operationType"] == "delete" else change.get("fullDocument")
+                    deadline = deadline or time.monotonic() + batch_window
+                if changes and (len(changes) >= max_batch_size or time.monotonic() >= deadline):
+                    break
+
+            if not changes:
+                continue
+
+            result = apply_venue_changes(changes, pinecone_client, openai_client, embedding_model, index_name, hash_store,
+                                         embedding_store=embedding_store, sparse_index=sparse_index,
+                                         bm25_encoder=bm25_encoder, chunk_index=chunk_index)
+            pending = {venue_id: changes[venue_id] for venue_id in result["failed_ids"]}
+            if pending:
+                retry_delay = min(retry_delay * 2, max_retry_delay)
+                logger.warning(f"{len(pending)} venue changes failed, retrying in {retry_delay:.0f}s "
+                               f"(resume token held back): {result['failed_ids'][:10]}")
+            else:
+                retry_delay = batch_window
+                save_resume_token(state_collection, index_name, stream.resume_token)
+            bump_index_version(index_name)
+            logger.info(f"Applied {len(changes) - len(pending)} of {len(changes)} venue changes: {result}")
+
+
+def reconcile_embedding_store(collection, embedding_store: EmbeddingStore, pinecone_client: Pinecone, index_name: str,
+                              hash_store: Optional[VenueHashStore] = None) -> List[str]:
+    """
+    Drop venues from the embedding store that no longer exist in MongoDB.
+
+    Deletions only reach the store in watch mode, so without this a re-index from
+    the store would bring deleted venues back. They are also removed from the
+    target index and the hash store.
+
+    Returns:
+        IDs of the removed venues
+    """
+    venue_ids = {str(doc["_id"]) for doc in collection.find({}, {"_id": 1}).batch_size(10000)}
+    removed = embedding_store.prune(venue_ids)
+    if removed:
+        logger.info(f"Removing {len(removed)} venues deleted from MongoDB from the embedding store")
+        for chunk_start in range(0, len(removed), 1000):
+            delete_data_from_pinecone(pinecone_client, index_name, removed[chunk_start:chunk_start + 1000])
+        if hash_store is not None:
+            hash_store.delete_many(removed)
+    return removed
+
+
+def save_bm25_statistics(bm25_encoder: Optional[BM25Encoder]):
+    """Commit the corpus statistics gathered by a full ingestion run and persist them for query encoders."""
+    if bm25_encoder is None:
+        return
+    bm25_encoder.commit()
+    bm25_encoder.save()
+
+
+def log_ingestion_stats(stats: dict):
+    """Log the final statistics of an ingestion run."""
+    logger.info("=== FINAL RESULTS ===")
+    logger.info(f"Successfully processed {stats['newly_processed']} new venues")
+    logger.info(f"Total embeddings created: {stats['successful_embeddings']}")
+    logger.info(f"Total vectors upserted: {stats['successful_upserts']}")
+    if 'skipped_unchanged' in stats:
+        logger.info(f"Unchanged venues skipped: {stats['skipped_unchanged']}")
+        logger.info(f"Metadata-only updates: {stats['metadata_updates']}")
+    if stats.get('reused_embeddings'):
+        logger.info(f"Embeddings reused from the embedding store: {stats['reused_embeddings']}")
+    if 'venues_per_second' in stats:
+        logger.info(f"Throughput: {stats['venues_per_second']} venues/s over {stats['elapsed_seconds']}s")
+    
+    if stats['failed_embeddings'] > 0 or stats['failed_upserts'] > 0:
+        logger.warning(f"Failed embeddings: {stats['failed_embeddings']}")
+        logger.warning(f"Failed upserts: {stats['failed_upserts']}")
+
+
 def process_venues_from_mongodb_to_pinecone(
     database_name: str = None, 
     collection_name: str = None,
     chunk_size: int = 50,
     embedding_batch_size: int = 100,
     use_chunked_insert: bool = True,
-    is_watching: bool = False
+    is_watching: bool = False,
+    use_pipeline: bool = True,
+    embedding_workers: int = 2,
+    upsert_workers: int = 2,
+    read_batch_size: int = 500,
+    start_after: str = None,
+    incremental: bool = True,
+    force_reindex: bool = False,
+    from_embedding_store: bool = False
 ):
     """
     Complete pipeline to process venues from MongoDB and insert into Pinecone.
@@ -286,13 +744,26 @@ def process_venues_from_mongodb_to_pinecone(
         collection_name: MongoDB collection name
         chunk_size: Pinecone upsert chunk size
         embedding_batch_size: Embedding processing batch size
-        use_chunked_insert: Whether to use chunked insertion with retry logic
-        is_watching: Whether to watch for changes in MongoDB or directly insert data into Pinecone by fetching all data from MongoDB
+        use_chunked_insert: Whether to use chunked insertion with retry logic (when not using the pipeline)
+        is_watching: Whether to watch for changes in MongoDB or directly insert data into Pinecone by fetching all data from MongoDB.
+            Watching runs until interrupted; on the first run it performs an incremental sync before following the change stream
+        use_pipeline: Whether to stream venues through the concurrent ingestion pipeline
+        embedding_workers: Concurrent embedding requests in the pipeline
+        upsert_workers: Concurrent Pinecone upserts in the pipeline
+        read_batch_size: Documents fetched per MongoDB cursor batch
+        start_after: Resume the MongoDB scan after this venue ``_id``
+        incremental: Skip venues whose content hashes are unchanged since they were last indexed
+        force_reindex: Re-embed every venue and refresh the stored hashes
+        from_embedding_store: Rebuild the index from the on-disk embedding store instead of reading MongoDB
+            (no embedding API calls); useful after changing the index, metric or vector store
+
+    Returns:
+        Dict with processing statistics, or None when nothing was inserted
     """
     try:
         # Initialize clients
         logger.info("Initializing clients...")
-        mongo_client, database, collection = initialize_mongo_client()
+        mongo_client, database, collection = initialize_mongo_client(database_name, collection_name)
         pinecone_client, index_name, pinecone_cloud, pinecone_environment = initialize_pinecone_client()
         openai_client, embedding_model, embedding_dimension, batch_size = initialize_openai_client()
 
@@ -308,57 +779,482 @@ def process_venues_from_mongodb_to_pinecone(
         logger.info("Setting up Pinecone index...")
         index = create_pinecone_index(pinecone_client= pinecone_client, index_name=index_name, region=pinecone_environment, dimension=embedding_dimension, cloud=pinecone_cloud)
 
-        if is_watching:
-           pass
-        else:
-            # Directly insert data into Pinecone by fetching all data from MongoDB
-            logger.info("Directly inserting data into Pinecone by fetching all data from MongoDB...")
-            venues_data = extract_fields_from_mongo_db(mongo_client, database.name, collection.name)
-        
-        if not venues_data:
-            logger.warning("No venue data extracted from MongoDB")
-            return
-        
-        # Insert data into Pinecone
-        logger.info(f"Inserting {len(venues_data)} venues into Pinecone...")
-        
-        if use_chunked_insert:
-            # Use chunked insertion with retry logic and progress tracking
-            stats = insert_data_in_chunks_into_pinecone(
+        # Vectors computed by this model are kept on disk so a rebuild never pays for them again
+        embedding_store = EmbeddingStore(embedding_model, embedding_dimension) if EMBEDDING_STORE_ENABLED or from_embedding_store else None
+
+        # BM25 vectors for the sparse index of hybrid search
+        sparse_index = None
+        bm25_encoder = None
+        if HYBRID_SEARCH_ENABLED:
+            sparse_index = create_sparse_pinecone_index(pinecone_client, PINECONE_SPARSE_INDEX_NAME, region=pinecone_environment, cloud=pinecone_cloud)
+            bm25_encoder = BM25Encoder.load()
+
+        # Description/FAQ/testimonial chunk vectors for multi-vector search
+        chunk_index = None
+        if MULTI_VECTOR_ENABLED:
+            chunk_index = create_pinecone_index(pinecone_client, PINECONE_CHUNK_INDEX_NAME, region=pinecone_environment,
+                                                dimension=embedding_dimension, cloud=pinecone_cloud)
+
+        stats = None
+        if from_embedding_store:
+            hash_store = VenueHashStore(database[PINECONE_SYNC_STATE_COLLECTION], index_name)
+            reconcile_embedding_store(collection, embedding_store, pinecone_client, index_name, hash_store)
+            logger.info(f"Re-indexing {len(embedding_store)} venues from the embedding store...")
+            stats = upsert_from_embedding_store(
+                pinecone_client=pinecone_client,
+                index_name=index_name,
+                embedding_store=embedding_store,
+                chunk_size=chunk_size,
+                upsert_workers=upsert_workers,
+                hash_store=hash_store,
+                sparse_index=sparse_index,
+                bm25_encoder=bm25_encoder
+            )
+            logger.info(f"Re-index results: {stats}")
+            bump_index_version(index_name)
+            mongo_client.close()
+            return stats
+        elif is_watching:
+            state_collection = database[PINECONE_SYNC_STATE_COLLECTION]
+            start_at_operation_time = None
+            if load_resume_token(state_collection, index_name) is None:
+                # First run: capture the cluster time, then bring the index up to date before following the stream
+                start_at_operation_time = mongo_client.admin.command("ping").get("operationTime")
+                logger.info("No resume token stored, running an incremental sync before watching...")
+                stats = run_ingestion_pipeline(
+                    pinecone_client=pinecone_client,
+                    openai_client=openai_client,
+                    embedding_model=embedding_model,
+                    index_name=index_name,
+                    documents=iter_venue_documents(collection, batch_size=read_batch_size),
+                    extract_fn=extract_single_venue_fields,
+                    chunk_size=chunk_size,
+                    embedding_batch_size=embedding_batch_size,
+                    embedding_workers=embedding_workers,
+                    upsert_workers=upsert_workers,
+                    hash_store=VenueHashStore(state_collection, index_name),
+                    embedding_store=embedding_store,
+                    sparse_index=sparse_index,
+                    bm25_encoder=bm25_encoder,
+                    chunk_index=chunk_index
+                )
+                save_bm25_statistics(bm25_encoder)
+                log_ingestion_stats(stats)
+                bump_index_version(index_name)
+            try:
+                watch_venue_changes(
+                    collection=collection,
+                    state_collection=state_collection,
+                    pinecone_client=pinecone_client,
+                    openai_client=openai_client,
+                    embedding_model=embedding_model,
+                    index_name=index_name,
+                    start_at_operation_time=start_at_operation_time,
+                    embedding_store=embedding_store,
+                    sparse_index=sparse_index,
+                    bm25_encoder=bm25_encoder,
+                    chunk_index=chunk_index
+                )
+            except KeyboardInterrupt:
+                logger.info("Stopped watching for venue changes")
+            mongo_client.close()
+            return stats
+        elif use_pipeline:
+            # Stream documents from MongoDB through the read/extract/embed/upsert stages
+            logger.info("Streaming venues from MongoDB through the ingestion pipeline...")
+            stats = run_ingestion_pipeline(
                 pinecone_client=pinecone_client,
                 openai_client=openai_client,
                 embedding_model=embedding_model,
                 index_name=index_name,
-                venues_data=venues_data,
+                documents=iter_venue_documents(collection, batch_size=read_batch_size, start_after=start_after),
+                extract_fn=extract_single_venue_fields,
                 chunk_size=chunk_size,
-                embedding_batch_size=embedding_batch_size
+                embedding_batch_size=embedding_batch_size,
+                embedding_workers=embedding_workers,
+                upsert_workers=upsert_workers,
+                hash_store=VenueHashStore(database[PINECONE_SYNC_STATE_COLLECTION], index_name) if incremental else None,
+                force_reindex=force_reindex,
+                embedding_store=embedding_store,
+                sparse_index=sparse_index,
+                bm25_encoder=bm25_encoder,
+                chunk_index=chunk_index
             )
+            if start_after is None:
+                # Only a scan of the whole collection gives complete corpus statistics
+                save_bm25_statistics(bm25_encoder)
+        else:
+            # Directly insert data into Pinecone by fetching all data from MongoDB
+            logger.info("Directly inserting data into Pinecone by fetching all data from MongoDB...")
+            venues_data = extract_fields_from_mongo_db(mongo_client, database.name, collection.name)
+        
+            if not venues_data:
+                logger.warning("No venue data extracted from MongoDB")
+                return
             
-            logger.info("=== FINAL RESULTS ===")
-            logger.info(f"Successfully processed {stats['newly_processed']} new venues")
-            logger.info(f"Total embeddings created: {stats['successful_embeddings']}")
-            logger.info(f"Total vectors upserted: {stats['successful_upserts']}")
+            # Insert data into Pinecone
+            logger.info(f"Inserting {len(venues_data)} venues into Pinecone...")
             
-            if stats['failed_embeddings'] > 0 or stats['failed_upserts'] > 0:
-                logger.warning(f"Failed embeddings: {stats['failed_embeddings']}")
-                logger.warning(f"Failed upserts: {stats['failed_upserts']}")
-        else:
-            # Use original simple insertion
-            insert_data_into_pinecone(pinecone_client, openai_client, embedding_model, index_name, venues_data)
+            if use_chunked_insert:
+                # Use chunked insertion with retry logic and progress tracking
+                stats = insert_data_in_chunks_into_pinecone(
+                    pinecone_client=pinecone_client,
+                    openai_client=openai_client,
+                    embedding_model=embedding_model,
+                    index_name=index_name,
+                    venues_data=venues_data,
+                    chunk_size=chunk_size,
+                    embedding_batch_size=embedding_batch_size
+                )
+            else:
+                # Use original simple insertion
+                insert_data_into_pinecone(pinecone_client, openai_client, embedding_model, index_name, venues_data)
+
+        if stats:
+            log_ingestion_stats(stats)
+
+        # Invalidate cached search results computed against the previous index contents
+        bump_index_version(index_name)
         
         # Close MongoDB connection
         mongo_client.close()
         logger.info("MongoDB connection closed")
+        return stats
         
     except Exception as e:
         logger.error(f"Error in complete pipeline: {e}")
         raise
 
 
+def _cached_query_result(matches):
+    """Build a query result from cached (venue ID, score[, metadata]) entries."""
+    return VenueQueryResult(
+        matches=[VenueMatch(id=match[0], score=match[1], metadata=match[2] if len(match) > 2 else {}) for match in matches],
+        cached=True
+    )
+
+
+def _cacheable_matches(results):
+    """
+    Extract (venue ID, score, metadata) entries from a query result for the search cache.
+    Only the metadata the geo post-filter and self-contained rendering read is kept.
+    """
+    return [(match.id, match.score, cacheable_metadata(getattr(match, "metadata", None))) for match in results.matches]
+
+
+_hybrid_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _timed(timings: dict, key: str, func, *args, **kwargs):
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        timings[key] = round((time.perf_counter() - start) * 1000, 3)
+
+
+async def _atimed(timings: dict, key: str, coroutine):
+    start = time.perf_counter()
+    try:
+        return await coroutine
+    finally:
+        timings[key] = round((time.perf_counter() - start) * 1000, 3)
+
+
+def query_sparse_index(index, bm25_encoder: BM25Encoder, query: str, top_k: int = 10, filters: dict = None):
+    """Query the BM25 sparse index; None when the query has no indexable terms."""
+    sparse_vector = bm25_encoder.encode_query(query)
+    if not sparse_vector["indices"]:
+        return None
+    return index.query(sparse_vector=sparse_vector, top_k=top_k, include_metadata=True, filter=filters)
+
+
+async def aquery_sparse_index(index, bm25_encoder: BM25Encoder, query: str, top_k: int = 10, filters: dict = None):
+    """Async version of query_sparse_index."""
+    sparse_vector = bm25_encoder.encode_query(query)
+    if not sparse_vector["indices"]:
+        return None
+    return await index.query(sparse_vector=sparse_vector, top_k=top_k, include_metadata=True, filter=filters)
+
+
+def hybrid_search_venues(registry, query: str, top_k: int = 10, filters: dict = None):
+    """
+    Query the dense and the BM25 sparse index concurrently and fuse the two rankings.
+
+    Each index returns ``top_k * HYBRID_CANDIDATE_MULTIPLIER`` candidates; the fused
+    result carries ``dense_query_ms``, ``sparse_query_ms`` and ``query_ms`` (wall time
+    of both queries) separately from ``fusion_ms``. With multi-vector search enabled
+    the dense list is the per-venue aggregation of the chunk index.
+    """
+    global _hybrid_executor
+    if _hybrid_executor is None:
+        _hybrid_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hybrid-search")
+
+    candidates = top_k * HYBRID_CANDIDATE_MULTIPLIER
+    timings = {}
+    start = time.perf_counter()
+    if registry.multi_vector_enabled:
+        dense_future = _hybrid_executor.submit(
+            _timed, timings, "dense_query_ms", search_venues_by_chunks, registry, query, candidates, filters
+        )
+    else:
+        dense_future = _hybrid_executor.submit(
+            _timed, timings, "dense_query_ms", search_venues_in_pinecone,
+            pinecone_client=registry.pinecone_client,
+            index_name=registry.index_name,
+            query=query,
+            top_k=candidates,
+            filters=filters,
+            openai_client=registry.openai_client,
+            embedding_model=registry.embedding_model,
+            index=registry.index(),
+            embedding_cache=registry.embedding_cache
+        )
+    sparse_future = _hybrid_executor.submit(
+        _timed, timings, "sparse_query_ms", query_sparse_index,
+        registry.sparse_index(), registry.bm25_encoder(), query, candidates, filters
+    )
+    dense_results = dense_future.result()
+    try:
+        sparse_results = sparse_future.result()
+    except Exception as e:
+        # Keyword search is an enhancement; fall back to dense-only results
+        logger.warning(f"Sparse index query failed, using dense results only: {e}")
+        sparse_results = None
+    timings["query_ms"] = round((time.perf_counter() - start) * 1000, 3)
+
+    if dense_results is None and sparse_results is None:
+        return None
+    return fuse_hybrid_results(dense_results, sparse_results, top_k, method=HYBRID_FUSION_METHOD,
+                               dense_weight=HYBRID_DENSE_WEIGHT, rrf_k=HYBRID_RRF_K, timings=timings)
+
+
+async def ahybrid_search_venues(registry, query: str, top_k: int = 10, filters: dict = None):
+    """Async version of hybrid_search_venues; both index queries run concurrently on the event loop."""
+    candidates = top_k * HYBRID_CANDIDATE_MULTIPLIER
+    timings = {}
+    start = time.perf_counter()
+    if registry.multi_vector_enabled:
+        dense_query = asearch_venues_by_chunks(registry, query, candidates, filters)
+    else:
+        dense_query = asearch_venues_in_pinecone(
+            index=await registry.async_index(),
+            openai_client=registry.async_openai_client,
+            embedding_model=registry.embedding_model,
+            query=query,
+            top_k=candidates,
+            filters=filters,
+            embedding_cache=registry.embedding_cache
+        )
+    dense_results, sparse_results = await asyncio.gather(
+        _atimed(timings, "dense_query_ms", dense_query),
+        _atimed(timings, "sparse_query_ms", aquery_sparse_index(
+            await registry.async_sparse_index(), registry.bm25_encoder(), query, candidates, filters
+        )),
+        return_exceptions=True
+    )
+    timings["query_ms"] = round((time.perf_counter() - start) * 1000, 3)
+
+    if isinstance(dense_results, BaseException):
+        raise dense_results
+    if isinstance(sparse_results, BaseException):
+        logger.warning(f"Sparse index query failed, using dense results only: {sparse_results}")
+        sparse_results = None
+    if dense_results is None and sparse_results is None:
+        return None
+    return fuse_hybrid_results(dense_results, sparse_results, top_k, method=HYBRID_FUSION_METHOD,
+                               dense_weight=HYBRID_DENSE_WEIGHT, rrf_k=HYBRID_RRF_K, timings=timings)
+
+
+def search_venues_by_chunks(registry, query: str, top_k: int = 10, filters: dict = None):
+    """
+    Multi-vector search: query the chunk index and score each venue by its matching chunks.
+
+    ``top_k * CHUNK_OVERFETCH_MULTIPLIER`` chunks are fetched so that venues with several
+    strong chunks still leave room for ``top_k`` distinct venues after grouping.
+    """
+    timings = {}
+    results = _timed(
+        timings, "query_ms", search_venues_in_pinecone,
+        pinecone_client=registry.pinecone_client,
+        index_name=registry.chunk_index_name,
+        query=query,
+        top_k=top_k * CHUNK_OVERFETCH_MULTIPLIER,
+        filters=filters,
+        openai_client=registry.openai_client,
+        embedding_model=registry.embedding_model,
+        index=registry.chunk_index(),
+        embedding_cache=registry.embedding_cache
+    )
+    if results is None:
+        return None
+    return aggregate_chunk_matches(results, top_k, method=CHUNK_AGGREGATION, timings=timings)
+
+
+async def asearch_venues_by_chunks(registry, query: str, top_k: int = 10, filters: dict = None):
+    """Async version of search_venues_by_chunks."""
+    timings = {}
+    results = await _atimed(timings, "query_ms", asearch_venues_in_pinecone(
+        index=await registry.async_chunk_index(),
+        openai_client=registry.async_openai_client,
+        embedding_model=registry.embedding_model,
+        query=query,
+        top_k=top_k * CHUNK_OVERFETCH_MULTIPLIER,
+        filters=filters,
+        embedding_cache=registry.embedding_cache
+    ))
+    if results is None:
+        return None
+    return aggregate_chunk_matches(results, top_k, method=CHUNK_AGGREGATION, timings=timings)
+
+
+def search_venues_in_local_index(registry, query: str, top_k: int = 10, filters: dict = None):
+    """Search venues with the in-process exact index instead of Pinecone."""
+    query_vector = create_embedding(registry.openai_client, registry.embedding_model, query, cache=registry.embedding_cache)
+    if not query_vector:
+        logger.error("Failed to create query vector")
+        return None
+    return registry.local_index().query(query_vector, top_k=top_k, filter=filters)
+
+
+async def asearch_venues_in_local_index(registry, query: str, top_k: int = 10, filters: dict = None):
+    """Async version of search_venues_in_local_index; the matrix scan runs in a worker thread off the event loop."""
+    query_vector = await acreate_embedding(registry.async_openai_client, registry.embedding_model, query,
+                                           cache=registry.embedding_cache)
+    if not query_vector:
+        logger.error("Failed to create query vector")
+        return None
+    # The first call also loads the index from the store, which must not happen on the event loop either
+    return await asyncio.to_thread(lambda: registry.local_index().query(query_vector, top_k=top_k, filter=filters))
+
+
 def search_venues_in_rag(query: str, top_k: int = 10, filters: dict = None):
-    """Search venues in RAG."""
-    pinecone_client, index_name, _, _ = initialize_pinecone_client()
-    results = search_venues_in_pinecone(pinecone_client=pinecone_client, index_name=index_name, query=query, top_k=top_k, filters=filters)
+    """Search venues in RAG using the process-wide pooled clients.
+    Repeated searches are answered from the search result cache without embedding or querying Pinecone."""
+    registry = get_client_registry()
+    search_cache = registry.search_cache
+
+    if search_cache:
+        version, cached_matches = search_cache.get(query, filters, top_k)
+        if cached_matches is not None:
+            logger.info(f"Search cache hit for query: {query}")
+            return _cached_query_result(cached_matches)
+
+    if registry.search_backend == "local":
+        results = search_venues_in_local_index(registry, query, top_k, filters)
+    elif registry.hybrid_enabled:
+        results = hybrid_search_venues(registry, query, top_k, filters)
+    elif registry.multi_vector_enabled:
+        results = search_venues_by_chunks(registry, query, top_k, filters)
+    else:
+        results = search_venues_in_pinecone(
+            pinecone_client=registry.pinecone_client,
+            index_name=registry.index_name,
+            query=query,
+            top_k=top_k,
+            filters=filters,
+            openai_client=registry.openai_client,
+            embedding_model=registry.embedding_model,
+            index=registry.index(),
+            embedding_cache=registry.embedding_cache
+        )
+
+    if search_cache and results is not None:
+        search_cache.set(query, filters, top_k, version, _cacheable_matches(results))
+    return results
+
+def _to_object_ids(venue_ids: List[str]):
+    """Convert venue IDs to ObjectIds, returning (object_ids, invalid_ids)."""
+    object_ids = []
+    invalid_ids = []
+    for venue_id in venue_ids:
+        try:
+            object_ids.append(ObjectId(venue_id))
+        except (InvalidId, TypeError):
+            logger.warning(f"Invalid venue ID: {venue_id}")
+            invalid_ids.append(venue_id)
+    return object_ids, invalid_ids
+
+
+def _order_venue_documents(venue_ids: List[str], documents_by_id: dict, invalid_ids: List[str]):
+    """Order fetched documents like ``venue_ids`` and collect the IDs that were not found."""
+    documents = []
+    missing_ids = list(invalid_ids)
+    for venue_id in venue_ids:
+        doc = documents_by_id.get(venue_id)
+        if doc is not None:
+            documents.append(doc)
+        elif venue_id not in missing_ids:
+            missing_ids.append(venue_id)
+    return documents, missing_ids
+
+
+def fetch_venues_by_ids(collection, venue_ids: List[str], projection: dict = None):
+    """
+    Fetch venues for a list of IDs with a single $in query.
+
+    Args:
+        collection: MongoDB venues collection
+        venue_ids: Venue IDs in the order they should be returned (e.g. Pinecone score order)
+        projection: Optional MongoDB projection applied to the returned documents
+
+    Returns:
+        tuple: (documents in the order of ``venue_ids``, IDs that were invalid or not found)
+    """
+    object_ids, invalid_ids = _to_object_ids(venue_ids)
+
+    documents_by_id = {}
+    if object_ids:
+        for doc in collection.find({"_id": {"$in": object_ids}}, projection):
+            doc["_id"] = str(doc["_id"])
+            documents_by_id[doc["_id"]] = doc
+
+    return _order_venue_documents(venue_ids, documents_by_id, invalid_ids)
+
+
+async def afetch_venues_by_ids(collection, venue_ids: List[str], projection: dict = None):
+    """Async version of fetch_venues_by_ids for an async MongoDB collection."""
+    object_ids, invalid_ids = _to_object_ids(venue_ids)
+
+    documents_by_id = {}
+    if object_ids:
+        async for doc in collection.find({"_id": {"$in": object_ids}}, projection):
+            doc["_id"] = str(doc["_id"])
+            documents_by_id[doc["_id"]] = doc
+
+    return _order_venue_documents(venue_ids, documents_by_id, invalid_ids)
+
+
+async def asearch_venues_in_rag(query: str, top_k: int = 10, filters: dict = None):
+    """Search venues in RAG with the async pooled clients (or the local index when SEARCH_BACKEND=local)."""
+    registry = get_client_registry()
+    search_cache = registry.search_cache
+
+    if search_cache:
+        version, cached_matches = await search_cache.aget(query, filters, top_k)
+        if cached_matches is not None:
+            logger.info(f"Search cache hit for query: {query}")
+            return _cached_query_result(cached_matches)
+
+    if registry.search_backend == "local":
+        results = await asearch_venues_in_local_index(registry, query, top_k, filters)
+    elif registry.hybrid_enabled:
+        results = await ahybrid_search_venues(registry, query, top_k, filters)
+    elif registry.multi_vector_enabled:
+        results = await asearch_venues_by_chunks(registry, query, top_k, filters)
+    else:
+        results = await asearch_venues_in_pinecone(
+            index=await registry.async_index(),
+            openai_client=registry.async_openai_client,
+            embedding_model=registry.embedding_model,
+            query=query,
+            top_k=top_k,
+            filters=filters,
+            embedding_cache=registry.embedding_cache
+        )
+
+    if search_cache and results is not None:
+        await search_cache.aset(query, filters, top_k, version, _cacheable_matches(results))
     return results
 
 def search_venues_in_database(objId: str):
@@ -369,13 +1265,19 @@ def search_venues_in_database(objId: str):
 
 def main():
     try:
-        process_venues_from_mongodb_to_pinecone(
-            chunk_size=30,  
-            embedding_batch_size=50,  
+        stats = process_venues_from_mongodb_to_pinecone(
+            chunk_size=100,  
+            embedding_batch_size=500,  
             use_chunked_insert=True, 
-            is_watching=False
+            is_watching=False,
+            use_pipeline=True,
+            embedding_workers=4,
+            upsert_workers=4
         )
         logger.info("Venue processing completed using VenueEmbeddingsProcessor")
+        if stats and 'venues_per_second' in stats:
+            print(f"\n✅ Indexed {stats['newly_processed']} venues in {stats['elapsed_seconds']}s "
+                  f"({stats['venues_per_second']} venues/s)")
     except Exception as e:
         logger.error(f"Error in main: {e}")
         print("\n🔄 Don't worry! You can restart the script and it will resume from where it left off")
@@ -0,0 +1,113 @@
+import logging
+import json
+
+from configs.settings import OPENAI_MODEL, SEARCH_TOOL_MAX_TOKENS, SEARCH_TOOL_DESCRIPTION_CHARS
+from utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def _format_budget(venue: dict) -> str:
+    budget_min = venue.get("budgetMin")
+    budget_max = venue.get("budgetMax")
+    if not budget_min and not budget_max:
+        return ""
+    return f"budget {budget_min or '?'}-{budget_max or '?'}"
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    text = " ".join(str(text or "").split())
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + "…"
+
+
+def format_venue_line(rank: int, venue: dict, description_chars: int = SEARCH_TOOL_DESCRIPTION_CHARS) -> str:
+    """
+    Format one venue as a single dense line with only the fields the model needs
+    to compare and present venues. Empty fields are dropped.
+    """
+    location = ", ".join(part for part in (venue.get("city"), venue.get("state")) if part)
+    events = ", ".join(venue.get("serveEvents") or [])
+    rating = venue.get("rating")
+    review_count = venue.get("reviewCount")
+    accessibility = venue.get("accessibility")
+
+    parts = [
+        f"#{rank} {venue.get('businessName', 'Unknown venue')}",
+        f"id {venue.get('_id')}",
+        location,
+        f"{venue['distanceKm']} km away" if venue.get("distanceKm") is not None else "",
+        venue.get("line_one") or venue.get("address", ""),
+        f"events {events}" if events else "",
+        _format_budget(venue),
+        f"rating {rating} ({review_count} reviews)" if rating else "",
+        f"accessibility {accessibility}" if accessibility and accessibility != "not_specified" else "",
+        f"phone {venue.get('businessPhone')}" if venue.get("businessPhone") else "",
+        _truncate(venue.get("businessDescription"), description_chars),
+    ]
+    return " | ".join(part for part in parts if part)
+
+
+def _fit_tokens(text: str, max_tokens: int, model: str) -> str:
+    """Cut ``text`` at a word boundary until it uses at most ``max_tokens``."""
+    if max_tokens <= 0:
+        return ""
+    tokens = count_tokens(text, model)
+    while tokens > max_tokens and len(text) > 1:
+        text = _truncate(text, int(len(text) * max_tokens / tokens) - 1)
+        tokens = count_tokens(text, model)
+    return text if tokens <= max_tokens else ""
+
+
+def _omitted_line(count: int) -> str:
+    return f"(+{count} more venues omitted to fit the token budget)"
+
+
+def format_venues_for_llm(
+    query: str,
+    filters: dict | None,
+    venues: list,
+    max_tokens: int = SEARCH_TOOL_MAX_TOKENS,
+    model: str = OPENAI_MODEL
+) -> str:
+    """
+    Serialize search results for the tool message within a hard token budget.
+
+    Room for the trailing "venues omitted" line is reserved up front, and the query
+    and filters in the header are cut when they alone would not fit. Venues are then
+    added in rank order until the next line would exceed ``max_tokens`` (measured
+    with tiktoken for ``model``). Full documents stay in the tool artifact.
+    """
+    omitted_tokens = count_tokens(_omitted_line(len(venues)), model) + 1  # newline
+    header_budget = max_tokens - omitted_tokens
+
+    filters_text = json.dumps(filters or {}, ensure_ascii=False)
+    header = f"query: {query} | filters: {filters_text} | results: {len(venues)}"
+    if count_tokens(header, model) > header_budget:
+        room = header_budget - count_tokens(f"query:  | filters:  | results: {len(venues)}", model)
+        query = _fit_tokens(query, room // 2, model)
+        filters_text = _fit_tokens(filters_text, room - count_tokens(query, model), model)
+        header = f"query: {query} | filters: {filters_text} | results: {len(venues)}"
+    lines = [header]
+    used_tokens = count_tokens(header, model)
+
+    rendered = 0
+    for rank, venue in enumerate(venues, 1):
+        line = format_venue_line(rank, venue)
+        line_tokens = count_tokens(line, model) + 1  # newline
+        # The last venue needs no room for the omission line after it
+        reserved = omitted_tokens if rank < len(venues) else 0
+        if used_tokens + line_tokens + reserved > max_tokens:
+            break
+        lines.append(line)
+        used_tokens += line_tokens
+        rendered += 1
+
+    if rendered < len(venues):
+        omitted = _omitted_line(len(venues) - rendered)
+        lines.append(omitted)
+        used_tokens += count_tokens(omitted, model) + 1
+
+    logger.info(f"Formatted {rendered} of {len(venues)} venues in ~{used_tokens} tokens (budget {max_tokens})")
+    return "\n".join(lines)
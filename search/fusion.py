@@ -0,0 +1,75 @@
+import time
+from typing import Dict, List, Optional, Sequence
+
+from search.results import VenueMatch, VenueQueryResult
+
+
+def _matches(results) -> list:
+    return list(getattr(results, "matches", None) or []) if results is not None else []
+
+
+def reciprocal_rank_fusion(result_lists: Sequence, top_k: int, k: int = 60,
+                           weights: Optional[Sequence[float]] = None) -> List[VenueMatch]:
+    """
+    Fuse ranked result lists with (weighted) reciprocal rank fusion.
+
+    Each venue scores ``sum(weight / (k + rank))`` over the lists it appears in,
+    so only ranks matter and dense cosine scores and BM25 scores need no calibration.
+    """
+    weights = weights or [1.0] * len(result_lists)
+    scores: Dict[str, float] = {}
+    metadata: Dict[str, dict] = {}
+    for results, weight in zip(result_lists, weights):
+        for rank, match in enumerate(_matches(results), start=1):
+            scores[match.id] = scores.get(match.id, 0.0) + weight / (k + rank)
+            if match.id not in metadata and getattr(match, "metadata", None):
+                metadata[match.id] = match.metadata
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+    return [VenueMatch(id=venue_id, score=score, metadata=metadata.get(venue_id, {})) for venue_id, score in ranked]
+
+
+def weighted_score_fusion(dense_results, sparse_results, top_k: int, dense_weight: float = 0.5) -> List[VenueMatch]:
+    """
+    Fuse dense and sparse results by a convex combination of min-max normalized scores.
+    A venue missing from one list contributes 0 for that list.
+    """
+    fused: Dict[str, float] = {}
+    metadata: Dict[str, dict] = {}
+    for results, weight in ((dense_results, dense_weight), (sparse_results, 1.0 - dense_weight)):
+        matches = _matches(results)
+        if not matches:
+            continue
+        scores = [match.score for match in matches]
+        low, high = min(scores), max(scores)
+        span = (high - low) or 1.0
+        for match in matches:
+            fused[match.id] = fused.get(match.id, 0.0) + weight * (match.score - low) / span
+            if match.id not in metadata and getattr(match, "metadata", None):
+                metadata[match.id] = match.metadata
+    ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:top_k]
+    return [VenueMatch(id=venue_id, score=score, metadata=metadata.get(venue_id, {})) for venue_id, score in ranked]
+
+
+def fuse_hybrid_results(dense_results, sparse_results, top_k: int, method: str = "rrf", dense_weight: float = 0.5,
+                        rrf_k: int = 60, timings: Optional[dict] = None) -> VenueQueryResult:
+    """
+    Fuse dense and sparse query results into one ranked VenueQueryResult.
+
+    Args:
+        dense_results: Dense index response (anything with ``matches``), or None
+        sparse_results: Sparse index response, or None
+        top_k: Number of fused results to return
+        method: "rrf" (reciprocal rank fusion) or "weighted" (normalized score fusion)
+        dense_weight: Weight of the dense list (the sparse list gets ``1 - dense_weight``)
+        rrf_k: RRF rank constant
+        timings: Query timings to carry over; the fusion time is added as ``fusion_ms``
+    """
+    start = time.perf_counter()
+    if method == "weighted":
+        matches = weighted_score_fusion(dense_results, sparse_results, top_k, dense_weight)
+    else:
+        matches = reciprocal_rank_fusion([dense_results, sparse_results], top_k, k=rrf_k,
+                                         weights=[dense_weight, 1.0 - dense_weight])
+    timings = dict(timings or {})
+    timings["fusion_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return VenueQueryResult(matches=matches, timings=timings)
@@ -0,0 +1,275 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from search.results import VenueMatch, VenueQueryResult
+from utils.embedding_store import EmbeddingStore
+
+logger = logging.getLogger(__name__)
+
+_COMPARISONS = {
+    "$gt": np.greater,
+    "$gte": np.greater_equal,
+    "$lt": np.less,
+    "$lte": np.less_equal,
+}
+
+
+class LocalVectorIndex:
+    """
+    Exact in-process cosine search over an embedding matrix.
+
+    The score of every venue is one matrix-vector product over the (memory-mapped)
+    matrix divided by precomputed row norms; the top k of the rows allowed by the
+    filter are selected with ``np.argpartition``. Filters use the Pinecone syntax
+    the agent already sends (implicit equality, ``$eq``, ``$ne``, ``$gt``, ``$gte``,
+    ``$lt``, ``$lte``, ``$in``, ``$nin``, ``$exists``, ``$and``, ``$or``) and are
+    evaluated on columnar arrays: numeric fields become float arrays compared in
+    one vectorized operation, and equality masks for string, boolean and list
+    fields are built once per (field, value) and cached.
+    """
+
+    def __init__(self, ids: List[str], matrix: np.ndarray, metadata: List[dict], rows: Optional[np.ndarray] = None):
+        """
+        Args:
+            ids: Venue ID of each indexed vector
+            matrix: Vector matrix; may hold more rows than ``ids`` (e.g. superseded store rows)
+            metadata: Metadata of each indexed vector
+            rows: Row of ``matrix`` holding each venue's vector (default: the first len(ids) rows)
+        """
+        self.ids = np.asarray(ids, dtype=object)
+        self.metadata = metadata
+        self.rows = np.arange(len(ids)) if rows is None else np.asarray(rows, dtype=np.int64)
+        # Half precision matmul would upcast the whole matrix on every query; do it once
+        self.matrix = matrix if matrix.dtype == np.float32 else np.asarray(matrix, dtype=np.float32)
+        self.norms = np.linalg.norm(self.matrix[self.rows], axis=1) if len(self.rows) else np.empty(0, dtype=np.float32)
+        self.norms[self.norms == 0] = 1.0
+
+        self._numeric_columns: Dict[str, np.ndarray] = {}
+        self._value_masks: Dict[tuple, np.ndarray] = {}
+        self._present_masks: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_embedding_store(cls, store: EmbeddingStore) -> "LocalVectorIndex":
+        live = store.live_rows()
+        index = cls(
+            ids=[venue_id for venue_id, _, _ in live],
+            matrix=store.matrix(),
+            metadata=[metadata for _, _, metadata in live],
+            rows=np.asarray([row for _, row, _ in live], dtype=np.int64),
+        )
+        logger.info(f"Loaded local vector index with {len(index)} venues from {store.path}")
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _numeric_column(self, field: str) -> np.ndarray:
+        column = self._numeric_columns.get(field)
+        if column is None:
+            values = []
+            for metadata in self.metadata:
+                value = metadata.get(field)
+                values.append(float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else np.nan)
+            column = np.asarray(values, dtype=np.float64)
+            with self._lock:
+                self._numeric_columns[field] = column
+        return column
+
+    def _present_mask(self, field: str) -> np.ndarray:
+        mask = self._present_masks.get(field)
+        if mask is None:
+            mask = np.fromiter((metadata.get(field) is not None for metadata in self.metadata), dtype=bool, count=len(self))
+            with self._lock:
+                self._present_masks[field] = mask
+        return mask
+
+    def _equals_mask(self, field: str, value: Any) -> np.ndarray:
+        """Rows whose field equals ``value`` or, for list fields, contains it."""
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return self._numeric_column(field) == float(value)
+        key = (field, value)
+        mask = self._value_masks.get(key)
+        if mask is None:
+            mask = np.fromiter(
+                (value in field_value if isinstance(field_value, list) else field_value == value
+                 for field_value in (metadata.get(field) for metadata in self.metadata)),
+                dtype=bool, count=len(self)
+            )
+            with self._lock:
+                self._value_masks[key] = mask
+        return mask
+
+    def _in_mask(self, field: str, values: List[Any]) -> np.ndarray:
+        mask = np.zeros(len(self), dtype=bool)
+        for value in values:
+            mask |= self._equals_mask(field, value)
+        return mask
+
+    def _field_mask(self, field: str, condition: Any) -> np.ndarray:
+        if not isinstance(condition, dict):
+            return self._equals_mask(field, condition)
+
+        mask = np.ones(len(self), dtype=bool)
+        for operator, operand in condition.items():
+            if operator == "$eq":
+                mask &= self._equals_mask(field, operand)
+            elif operator == "$ne":
+                mask &= ~self._equals_mask(field, operand)
+            elif operator in _COMPARISONS:
+                column = self._numeric_column(field)
+                # NaN (missing or non-numeric) never satisfies a comparison
+                with np.errstate(invalid="ignore"):
+                    mask &= _COMPARISONS[operator](column, float(operand))
+            elif operator == "$in":
+                mask &= self._in_mask(field, operand)
+            elif operator == "$nin":
+                mask &= ~self._in_mask(field, operand)
+            elif operator == "$exists":
+                present = self._present_mask(field)
+                mask &= present if operand else ~present
+            else:
+                raise ValueError(f"Unsupported filter operator {operator} on field {field}")
+        return mask
+
+    def filter_mask(self, filters: Optional[dict]) -> Optional[np.ndarray]:
+        """Evaluate a Pinecone-style metadata filter into a boolean row mask (None = no filter)."""
+        if not filters:
+            return None
+        mask = np.ones(len(self), dtype=bool)
+        for key, condition in filters.items():
+            if key == "$and":
+                for clause in condition:
+                    clause_mask = self.filter_mask(clause)
+                    if clause_mask is not None:
+                        mask &= clause_mask
+            elif key == "$or":
+                any_mask = np.zeros(len(self), dtype=bool)
+                for clause in condition:
+                    clause_mask = self.filter_mask(clause)
+                    # An empty clause matches everything
+                    any_mask |= clause_mask if clause_mask is not None else True
+                mask &= any_mask
+            else:
+                mask &= self._field_mask(key, condition)
+        return mask
+
+    def scores(self, vector: List[float], candidates: Optional[np.ndarray] = None) -> np.ndarray:
+        """Cosine similarity of the query with every indexed venue, or only with ``candidates``."""
+        query = np.asarray(vector, dtype=np.float32)
+        query_norm = np.linalg.norm(query) or 1.0
+        if candidates is None:
+            return (self.matrix @ query)[self.rows] / (self.norms * query_norm)
+        return (self.matrix[self.rows[candidates]] @ query) / (self.norms[candidates] * query_norm)
+
+    def query(self, vector: List[float], top_k: int = 10, filter: Optional[dict] = None,
+              include_metadata: bool = True) -> VenueQueryResult:
+        """
+        Return the ``top_k`` most similar venues that match ``filter``.
+
+        Args:
+            vector: Query embedding
+            top_k: Number of results to return
+            filter: Pinecone-style metadata filter
+            include_metadata: Attach each venue's metadata to its match
+        """
+        start = time.perf_counter()
+        if len(self) == 0:
+            return VenueQueryResult(timings={"local_search_ms": 0.0})
+
+        mask = self.filter_mask(filter)
+        candidates = np.flatnonzero(mask) if mask is not None else np.arange(len(self))
+        if len(candidates) * 4 < len(self):
+            # Selective filter: gathering the few matching rows beats scanning the whole matrix
+            candidate_scores = self.scores(vector, candidates)
+        else:
+            candidate_scores = self.scores(vector)[candidates]
+
+        k = min(top_k, len(candidates))
+        if k < len(candidates):
+            top = np.argpartition(-candidate_scores, k - 1)[:k]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.argsort(-candidate_scores[top], kind="stable")]
+
+        matches = [
+            VenueMatch(
+                id=self.ids[candidates[i]],
+                score=float(candidate_scores[i]),
+                metadata=self.metadata[candidates[i]] if include_metadata else {},
+            )
+            for i in top
+        ]
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        return VenueQueryResult(matches=matches, timings={"local_search_ms": round(elapsed_ms, 3)})
+
+
+class ReloadingLocalIndex:
+    """
+    Local index backed by an embedding store directory, reloaded when ingestion
+    (usually another process) has appended to the store since it was loaded.
+    The check is one ``os.stat`` at most every ``check_interval`` seconds; the
+    rebuild runs in a background thread and the new index is swapped in when it
+    is ready, so queries keep using the previous index meanwhile.
+    """
+
+    def __init__(self, embedding_model: str, dimension: int, check_interval: float = 5.0):
+        self.embedding_model = embedding_model
+        self.dimension = dimension
+        self.check_interval = check_interval
+        self.rows_path = os.path.join(EmbeddingStore.store_path(embedding_model, dimension), "rows.jsonl")
+        self._index: Optional[LocalVectorIndex] = None
+        self._stamp = None
+        self._checked_at = 0.0
+        self._reload_lock = threading.Lock()
+        self.reload()
+
+    def _store_stamp(self):
+        try:
+            stat = os.stat(self.rows_path)
+            return stat.st_size, stat.st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def reload(self):
+        """Rebuild the index from the current store contents and swap it in (a single reference assignment)."""
+        stamp = self._store_stamp()
+        if stamp is None:
+            logger.warning(f"No embedding store at {self.rows_path}, the local vector index is empty")
+            index = LocalVectorIndex([], np.empty((0, self.dimension), dtype=np.float32), [])
+        else:
+            index = LocalVectorIndex.from_embedding_store(
+                EmbeddingStore(self.embedding_model, self.dimension, read_only=True)
+            )
+        self._index = index
+        self._stamp = stamp
+        self._checked_at = time.monotonic()
+
+    def _background_reload(self):
+        try:
+            self.reload()
+        except Exception as e:
+            logger.error(f"Failed to reload local vector index, keeping the previous one: {e}")
+        finally:
+            self._reload_lock.release()
+
+    def _refresh_if_changed(self):
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return
+        self._checked_at = time.monotonic()
+        if self._store_stamp() != self._stamp and self._reload_lock.acquire(blocking=False):
+            logger.info("Embedding store changed, reloading local vector index in the background")
+            threading.Thread(target=self._background_reload, name="local-index-reload", daemon=True).start()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def query(self, vector: List[float], top_k: int = 10, filter: Optional[dict] = None,
+              include_metadata: bool = True) -> VenueQueryResult:
+        self._refresh_if_changed()
+        return self._index.query(vector, top_k=top_k, filter=filter, include_metadata=include_metadata)
@@ -0,0 +1,281 @@
+import re
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from configs.settings import QUERY_BUDGET_TOLERANCE, GEO_DEFAULT_RADIUS_KM
+from utils.geo import PLACES, geo_filter, resolve_place, to_km
+
+logger = logging.getLogger(__name__)
+
+# Values of the ``serveEvents`` metadata field and the words that map to them
+EVENT_SYNONYMS: Dict[str, Tuple[str, ...]] = {
+    "wedding": ("wedding", "weddings", "reception", "bridal", "ceremony", "rehearsal dinner", "elopement", "engagement party"),
+    "corporate": ("corporate", "company", "office party", "holiday party", "conference", "offsite", "off-site",
+                  "team building", "business meeting", "product launch"),
+    "birthday": ("birthday", "bday", "b-day", "sweet 16", "sweet sixteen", "quinceanera", "quinceañera"),
+    "anniversary": ("anniversary",),
+    "graduation": ("graduation", "grad party"),
+}
+
+# New England states as stored in the ``state`` metadata field
+STATES: Dict[str, str] = {
+    "massachusetts": "MA",
+    "rhode island": "RI",
+    "new hampshire": "NH",
+    "maine": "ME",
+    "connecticut": "CT",
+    "vermont": "VT",
+}
+
+# Cities with venues in the index. Boston also covers the neighborhoods venues list as their city.
+# Names that are common words or other places ("Harvard", "Lincoln", "York", "Bedford", ...) are left out.
+CITIES: Dict[str, Tuple[str, ...]] = {
+    "boston": ("Boston", "South Boston", "East Boston", "Brighton", "Allston", "Charlestown", "Dorchester",
+               "Roxbury", "Jamaica Plain", "Chestnut Hill"),
+    "south boston": ("South Boston",),
+    "cambridge": ("Cambridge",),
+    "somerville": ("Somerville",),
+    "brookline": ("Brookline", "Chestnut Hill"),
+    "providence": ("Providence",),
+    "newport": ("Newport",),
+    "warwick": ("Warwick",),
+    "east greenwich": ("East Greenwich",),
+    "portsmouth": ("Portsmouth",),
+    "salem": ("Salem",),
+    "gloucester": ("Gloucester",),
+    "newburyport": ("Newburyport",),
+    "burlington": ("Burlington",),
+    "waltham": ("Waltham",),
+    "worcester": ("Worcester",),
+    "plymouth": ("Plymouth",),
+    "quincy": ("Quincy",),
+    "ipswich": ("Ipswich",),
+    "everett": ("Everett",),
+    "dedham": ("Dedham",),
+    "hingham": ("Hingham",),
+    "danvers": ("Danvers",),
+    "beverly": ("Beverly",),
+    "lowell": ("Lowell",),
+    "haverhill": ("Haverhill",),
+    "falmouth": ("Falmouth",),
+    "fall river": ("Fall River",),
+    "new bedford": ("New Bedford",),
+    "wellesley": ("Wellesley",),
+    "natick": ("Natick",),
+    "watertown": ("Watertown",),
+    "sturbridge": ("Sturbridge",),
+    "north andover": ("North Andover",),
+}
+
+_AMOUNT = r"\$?\s?(\d+(?:,\d{3})*(?:\.\d+)?)\s?(k|thousand|m|million)?\b"
+_MULTIPLIERS = {"k": 1_000, "thousand": 1_000, "m": 1_000_000, "million": 1_000_000}
+
+_RANGE_PATTERN = re.compile(rf"(?:between\s+|from\s+)?({_AMOUNT})\s*(?:-|–|to|and)\s*({_AMOUNT})")
+_AROUND_PATTERN = re.compile(rf"(?:around|about|approximately|approx\.?|roughly|~|close to)\s*({_AMOUNT})")
+_MAX_PATTERN = re.compile(rf"(?:under|below|less than|up to|upto|no more than|not more than|at most|max(?:imum)?(?:\s+of)?|within|<=?)\s*({_AMOUNT})")
+_MIN_PATTERN = re.compile(rf"(?:over|above|more than|at least|min(?:imum)?(?:\s+of)?|starting at|>=?)\s*({_AMOUNT})")
+_BUDGET_PATTERN = re.compile(rf"budget(?:\s+(?:is|of))?\s*:?\s*({_AMOUNT})|({_AMOUNT})\s+budget")
+
+
+def _phrase_pattern(phrases) -> re.Pattern:
+    # Longest phrases first so "south boston" wins over "boston" and "new bedford" over "bedford"
+    alternatives = sorted(phrases, key=len, reverse=True)
+    return re.compile(r"\b(" + "|".join(re.escape(phrase) for phrase in alternatives) + r")\b")
+
+
+_EVENT_LOOKUP = {synonym: event for event, synonyms in EVENT_SYNONYMS.items() for synonym in synonyms}
+_EVENT_PATTERN = _phrase_pattern(_EVENT_LOOKUP)
+_CITY_PATTERN = _phrase_pattern(CITIES)
+_STATE_ABBREVIATIONS = {abbreviation.lower(): abbreviation for abbreviation in STATES.values()}
+_STATE_PATTERN = _phrase_pattern(STATES)
+# Abbreviations are only trusted in their usual uppercase form ("Boston, MA"), "me"/"ct" are ordinary words
+_STATE_ABBREVIATION_PATTERN = re.compile(r"\b(" + "|".join(STATES.values()) + r")\b")
+_PLACE_ALTERNATIVES = "|".join(re.escape(place) for place in sorted(PLACES, key=len, reverse=True))
+_RADIUS_PATTERN = re.compile(
+    rf"within\s+(\d+(?:\.\d+)?)\s*(km|kilometers?|kilometres?|mi|miles?)\s+(?:of|from)\s+"
+    rf"(?:downtown\s+|central\s+)?({_PLACE_ALTERNATIVES})\b"
+)
+
+
+@dataclass
+class ParsedQuery:
+    """Structured constraints recognized in a free-text venue query."""
+    budget_min: Optional[int] = None
+    budget_max: Optional[int] = None
+    cities: List[str] = field(default_factory=list)
+    states: List[str] = field(default_factory=list)
+    events: List[str] = field(default_factory=list)
+    near: Optional[Tuple[float, float]] = None
+    radius_km: Optional[float] = None
+
+    def is_empty(self) -> bool:
+        return not (self.budget_min or self.budget_max or self.cities or self.states or self.events or self.near)
+
+    def set_search_area(self, place: str, radius_km: Optional[float] = None) -> bool:
+        """Restrict the search to ``radius_km`` around a place name or "lat,lng"; False when the place is unknown."""
+        coordinates = resolve_place(place)
+        if coordinates is None:
+            return False
+        self.near = coordinates
+        self.radius_km = radius_km or GEO_DEFAULT_RADIUS_KM
+        return True
+
+
+def _amount(number: str, unit: Optional[str], has_dollar: bool, default_unit: Optional[str] = None) -> Optional[int]:
+    """Dollar amount of a matched number; bare numbers ("150 guests") are not amounts."""
+    unit = unit or default_unit
+    if not unit and not has_dollar:
+        return None
+    value = float(number.replace(",", "")) * _MULTIPLIERS.get(unit, 1)
+    return int(value)
+
+
+def _match_amount(match: re.Match, group: int) -> Optional[int]:
+    # Every amount capture is (full amount, number, unit)
+    text = match.group(group)
+    if text is None:
+        return None
+    return _amount(match.group(group + 1), match.group(group + 2), "$" in text)
+
+
+def parse_budget(text: str) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Parse budget expressions into a (minimum, maximum) range in dollars.
+
+    "under $20k" -> (None, 20000), "at least $8,000" -> (8000, None),
+    "around $15,000" -> (12000, 18000), "$10-15k" -> (10000, 15000).
+    Amounts need a "$" or a k/thousand/m suffix, so guest counts and dates are ignored.
+    """
+    text = text.lower()
+
+    for match in _RANGE_PATTERN.finditer(text):
+        low_text, high_text = match.group(1), match.group(4)
+        high_unit = match.group(6)
+        high = _amount(match.group(5), high_unit, "$" in high_text)
+        # "$10-15k": the low end shares the unit of the high end
+        low = _amount(match.group(2), match.group(3), "$" in low_text, default_unit=high_unit)
+        if low is not None and high is not None and low < high:
+            return low, high
+
+    for match in _AROUND_PATTERN.finditer(text):
+        amount = _match_amount(match, 1)
+        if amount:
+            return int(amount * (1 - QUERY_BUDGET_TOLERANCE)), int(amount * (1 + QUERY_BUDGET_TOLERANCE))
+
+    # "within 20 km" or "over 100 guests" match the keywords but are not amounts; keep scanning
+    budget_max = next(filter(None, (_match_amount(match, 1) for match in _MAX_PATTERN.finditer(text))), None)
+    budget_min = next(filter(None, (_match_amount(match, 1) for match in _MIN_PATTERN.finditer(text))), None)
+    if budget_min is None and budget_max is None:
+        match = _BUDGET_PATTERN.search(text)
+        if match:
+            # A stated budget is the most the user wants to spend
+            budget_max = _match_amount(match, 1) or _match_amount(match, 4)
+    if budget_min is not None and budget_max is not None and budget_min > budget_max:
+        budget_min, budget_max = budget_max, budget_min
+    return budget_min, budget_max
+
+
+def parse_query(text: str) -> ParsedQuery:
+    """Recognize budget, location and event-type constraints in a venue search query."""
+    lowered = (text or "").lower()
+    budget_min, budget_max = parse_budget(lowered)
+
+    cities = []
+    for name in dict.fromkeys(match.group(1) for match in _CITY_PATTERN.finditer(lowered)):
+        cities.extend(city for city in CITIES[name] if city not in cities)
+
+    states = [STATES[name] for name in dict.fromkeys(match.group(1) for match in _STATE_PATTERN.finditer(lowered))]
+    for match in _STATE_ABBREVIATION_PATTERN.finditer(text or ""):
+        abbreviation = _STATE_ABBREVIATIONS[match.group(1).lower()]
+        if abbreviation not in states:
+            states.append(abbreviation)
+
+    events = list(dict.fromkeys(_EVENT_LOOKUP[match.group(1)] for match in _EVENT_PATTERN.finditer(lowered)))
+
+    parsed = ParsedQuery(budget_min=budget_min, budget_max=budget_max, cities=cities, states=states, events=events)
+    match = _RADIUS_PATTERN.search(lowered)
+    if match:
+        # "within 20 km of downtown Boston"
+        parsed.set_search_area(match.group(3), to_km(float(match.group(1)), match.group(2)))
+    return parsed
+
+
+def _eq_or_in(values: List[str]):
+    return values[0] if len(values) == 1 else {"$in": values}
+
+
+def compile_filters(parsed: ParsedQuery) -> dict:
+    """
+    Compile parsed constraints into a Pinecone metadata filter.
+
+    A venue matches a budget when its [budgetMin, budgetMax] range overlaps the
+    requested one: ``budgetMin <= maximum`` and ``budgetMax >= minimum``. A city
+    already pins the state, so ``state`` is only filtered when no city was found.
+    A search area replaces both with the geohash cells covering it, since nearby
+    venues may be in other towns. Guest count is not compiled because venues carry
+    no capacity metadata.
+    """
+    filters = {}
+    if parsed.budget_max:
+        filters["budgetMin"] = {"$lte": parsed.budget_max}
+    if parsed.budget_min:
+        filters["budgetMax"] = {"$gte": parsed.budget_min}
+    if parsed.near:
+        filters.update(geo_filter(parsed.near[0], parsed.near[1], parsed.radius_km))
+    elif parsed.cities:
+        filters["city"] = _eq_or_in(parsed.cities)
+    elif parsed.states:
+        filters["state"] = _eq_or_in(parsed.states)
+    if parsed.events:
+        filters["serveEvents"] = _eq_or_in(parsed.events)
+    return filters
+
+
+def merge_filters(compiled: Optional[dict], llm_filters: Optional[dict]) -> Optional[dict]:
+    """
+    Merge compiled filters with the filters the model passed explicitly.
+
+    The model's filters win for any field both set (it may have resolved something
+    the parser cannot); ``$and`` clauses from both are kept.
+    """
+    if not compiled:
+        return llm_filters or None
+    if not llm_filters:
+        return compiled
+    merged = dict(compiled)
+    for key, condition in llm_filters.items():
+        if key == "$and" and "$and" in merged:
+            merged["$and"] = list(merged["$and"]) + list(condition)
+        else:
+            merged[key] = condition
+    return merged
+
+
+def build_search_filters(
+    query: str,
+    llm_filters: Optional[dict] = None,
+    near: Optional[str] = None,
+    radius_km: Optional[float] = None,
+    parse: bool = True
+) -> Tuple[Optional[dict], dict, ParsedQuery]:
+    """
+    Parse a query and merge its compiled filters with the model's filters.
+
+    Args:
+        query: Free-text search query
+        llm_filters: Filters passed by the model, if any
+        near: Place name or "lat,lng" to search around; overrides a radius found in the query
+        radius_km: Search radius around ``near``
+        parse: Parse the query text; with False only ``near`` is compiled
+
+    Returns:
+        (merged filters, compiled filters, parsed query)
+    """
+    parsed = parse_query(query) if parse else ParsedQuery()
+    if near and not parsed.set_search_area(near, radius_km):
+        logger.warning(f"Ignoring geo search around unknown place {near}")
+    compiled = compile_filters(parsed)
+    if compiled:
+        logger.info(f"Compiled query filters: {compiled}")
+    return merge_filters(compiled, llm_filters), compiled, parsed
@@ -0,0 +1,112 @@
+import time
+import asyncio
+import logging
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from configs.settings import RERANK_MODEL, RERANK_DEVICE, RERANK_BATCH_SIZE, RERANK_MAX_LENGTH
+from search.results import VenueMatch
+from utils.metadata_profile import rerank_context
+
+logger = logging.getLogger(__name__)
+
+# The model is shared by all requests; torch already parallelizes one batch across cores
+_predict_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_cross_encoder(model_name: str = RERANK_MODEL, device: str = RERANK_DEVICE, max_length: int = RERANK_MAX_LENGTH):
+    """
+    Load a sentence-transformers cross-encoder once per process and keep it warm.
+
+    Args:
+        model_name: Hugging Face model name or local path
+        device: Torch device ("cpu", "cuda", ...)
+        max_length: Token limit of each (query, venue) pair; longer contexts are truncated
+    """
+    # Imported lazily so deployments without reranking do not pay for loading torch
+    from sentence_transformers import CrossEncoder
+
+    model = CrossEncoder(model_name, device=device, max_length=max_length)
+    # The first forward pass allocates buffers; do it now instead of on the first search
+    model.predict([("warm up", "warm up")], show_progress_bar=False)
+    logger.info(f"Loaded cross-encoder {model_name} on {device} (max_length={max_length})")
+    return model
+
+
+def venue_rerank_text(match, document: Optional[dict] = None) -> str:
+    """
+    Text a venue is scored on.
+
+    The embedded context (or, with multi-vector search, the best chunk) is used when
+    the match carries it; cached matches keep it cut to the same length, so a query
+    is reranked the same way on a cache hit and on a miss. Slim metadata profiles
+    drop the context, so the venue is then scored on its hydrated document.
+
+    Args:
+        match: Retrieved match
+        document: The venue's MongoDB document (or self-contained metadata)
+    """
+    context = rerank_context(getattr(match, "metadata", None))
+    if context:
+        return context
+    document = document or {}
+    location = ", ".join(part for part in (document.get("city"), document.get("state")) if part)
+    events = ", ".join(document.get("serveEvents") or [])
+    parts = (
+        document.get("businessName"),
+        document.get("businessDescription"),
+        f"Location: {location}." if location else None,
+        f"Events: {events}." if events else None,
+    )
+    return " ".join(part for part in parts if part)
+
+
+def rerank_matches(query: str, matches: list, top_k: int, batch_size: int = RERANK_BATCH_SIZE,
+                   model=None, documents: Optional[Dict[str, dict]] = None) -> Tuple[List[VenueMatch], dict]:
+    """
+    Re-score retrieved venues with a cross-encoder and keep the best ``top_k``.
+
+    All (query, venue text) pairs are scored in one ``predict`` call, batched by
+    ``batch_size``. Matches without any text keep their retrieval order after the
+    scored ones.
+
+    Args:
+        query: Search query
+        matches: Retrieved matches, in retrieval order
+        top_k: Number of matches to return
+        batch_size: Pairs per forward pass
+        model: Cross-encoder to use (default: the shared RERANK_MODEL)
+        documents: Hydrated venue documents by ID, scored for matches without a context
+
+    Returns:
+        tuple: (reranked matches, {"rerank_ms": ..., "rerank_candidates": ...})
+    """
+    start = time.perf_counter()
+    documents = documents or {}
+    texts = [venue_rerank_text(match, documents.get(match.id)) for match in matches]
+    scorable = [i for i, text in enumerate(texts) if text]
+    if not scorable:
+        return list(matches[:top_k]), {"rerank_ms": 0.0, "rerank_candidates": 0}
+
+    model = model or get_cross_encoder()
+    with _predict_lock:
+        scores = model.predict([(query, texts[i]) for i in scorable], batch_size=batch_size,
+                               show_progress_bar=False)
+
+    ranked = sorted(zip(scorable, scores), key=lambda item: float(item[1]), reverse=True)
+    reranked = [
+        VenueMatch(id=matches[i].id, score=float(score), metadata=getattr(matches[i], "metadata", None) or {})
+        for i, score in ranked
+    ]
+    scored = set(scorable)
+    reranked.extend(match for i, match in enumerate(matches) if i not in scored)
+    timings = {"rerank_ms": round((time.perf_counter() - start) * 1000, 3), "rerank_candidates": len(scorable)}
+    return reranked[:top_k], timings
+
+
+async def arerank_matches(query: str, matches: list, top_k: int, batch_size: int = RERANK_BATCH_SIZE,
+                          model=None, documents: Optional[Dict[str, dict]] = None) -> Tuple[List[VenueMatch], dict]:
+    """Async version of rerank_matches; inference runs in a worker thread off the event loop."""
+    return await asyncio.to_thread(rerank_matches, query, matches, top_k, batch_size, model, documents)
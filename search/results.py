@@ -0,0 +1,18 @@
+from dataclasses import dataclass, field
+from typing import List
+
+
+@dataclass
+class VenueMatch:
+    """A single search hit, shaped like a Pinecone match (id, score, metadata)."""
+    id: str
+    score: float
+    metadata: dict = field(default_factory=dict)
+
+
+@dataclass
+class VenueQueryResult:
+    """Search results produced without a Pinecone response object (cache hits, local search, fusion)."""
+    matches: List[VenueMatch] = field(default_factory=list)
+    cached: bool = False
+    timings: dict = field(default_factory=dict)
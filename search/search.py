@@ -1,23 +1,45 @@
 from pydantic import BaseModel, Field
 from langchain.tools import tool
 import logging
-import json
+import time
 
-from search.embeddings import search_venues_in_rag, initialize_mongo_client
-from bson import ObjectId
+from search.embeddings import asearch_venues_in_rag, afetch_venues_by_ids
+from search.clients import get_client_registry
+from search.formatting import format_venues_for_llm
+from search.query_parser import build_search_filters
+from search.rerank import arerank_matches
+from utils.geo import filter_matches_within
+from utils.metadata_profile import SELF_CONTAINED
+from configs.settings import (
+    QUERY_FILTERS_ENABLED,
+    GEO_OVERFETCH_MULTIPLIER,
+    RERANK_ENABLED,
+    RERANK_CANDIDATES,
+    PINECONE_METADATA_PROFILE,
+)
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Generated license numbers are never useful to the agent
+VENUE_PROJECTION = {"lic": 0, "bl": 0}
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 3)
+
+
 class SearchVenuesInput(BaseModel):
     query: str = Field(description="The query to search for venues")
-    filters: dict | None = Field(None, description="Optional filters to apply to the search (e.g., location, capacity)")
+    filters: dict | None = Field(None, description="Optional Pinecone metadata filters on city, state, serveEvents, budgetMin or budgetMax. Budget, location and event type stated in the query are applied automatically")
     top_k: int = Field(15, description="The number of venues to return. 15-20 is recommended")
+    near: str | None = Field(None, description="Optional place (e.g. 'downtown Boston', 'Providence') or 'lat,lng' to search around")
+    radius_km: float | None = Field(None, description="Search radius in km around `near` (default 25)")
     reason: str = Field("", description="The reason for the search")
    
 
 @tool(args_schema=SearchVenuesInput, name_or_callable="search_venues", response_format="content_and_artifact")
-async def search_venues(query: str, top_k: int = 25, filters: dict | None = None, reason: str = ""):
+async def search_venues(query: str, top_k: int = 25, filters: dict | None = None, near: str | None = None,
+                        radius_km: float | None = None, reason: str = ""):
     """
     Search for venues based on a query string, returning the top matching venues.
 
@@ -25,68 +47,117 @@ async def search_venues(query: str, top_k: int = 25, filters: dict | None = None
         query (str): The search query describing the desired venue or event.
         top_k (int, optional): The maximum number of venues to return. Defaults to 15.
         filters (dict, optional): Additional filters to apply to the search (e.g., location, capacity).
+        near (str, optional): Place name or "lat,lng" to restrict the search around.
+        radius_km (float, optional): Search radius around `near` in km.
         reason (str, optional): The reason for the search.
 
     Returns:
-        tuple: A tuple of (content, artifact) where content is a human-readable summary and artifact is the raw search results.
+        tuple: A tuple of (content, artifact) where content is a compact, token-budgeted summary for the model
+        and artifact is the full search results.
     """
-    # Get the raw search results
-    results = search_venues_in_rag(query=query, top_k=top_k, filters=filters)
-    # If search_vendors is async, await it; otherwise, just call it.
-    if callable(getattr(results, "__await__", None)):
-        results = await results
+    timings = {}
+    start = time.perf_counter()
+
+    # Turn budget, location, event type and search area into metadata filters
+    search_filters, compiled_filters, parsed = build_search_filters(
+        query, filters, near=near, radius_km=radius_km, parse=QUERY_FILTERS_ENABLED
+    )
+
+    # Geohash cells cover a square around the search circle; overfetch so the exact distance filter keeps top_k
+    fetch_k = top_k * GEO_OVERFETCH_MULTIPLIER if parsed.near else top_k
+    if RERANK_ENABLED:
+        # The cross-encoder picks top_k out of a larger candidate pool
+        fetch_k = max(fetch_k, RERANK_CANDIDATES)
+    timings["parse_ms"] = _elapsed_ms(start)
+
+    # Get the raw search results without blocking the event loop
+    stage_start = time.perf_counter()
+    results = await asearch_venues_in_rag(query=query, top_k=fetch_k, filters=search_filters)
+
+    if compiled_filters and not (results and results.matches):
+        # The parser may have read a constraint more strictly than meant; keep only what was passed explicitly
+        explicit_filters, _, parsed = build_search_filters(query, filters, near=near, radius_km=radius_km, parse=False)
+        if explicit_filters != search_filters:
+            logger.info(f"No venues matched compiled filters {compiled_filters}, retrying with explicit filters only")
+            search_filters = explicit_filters
+            results = await asearch_venues_in_rag(query=query, top_k=fetch_k, filters=search_filters)
+
+    timings["retrieval_ms"] = _elapsed_ms(stage_start)
+    timings.update(getattr(results, "timings", None) or {})
+
+    matches = list(results.matches) if results else []
+    distances = {}
+    if parsed.near:
+        matches, distances = filter_matches_within(matches, parsed.near[0], parsed.near[1], parsed.radius_km)
+        logger.info(f"{len(matches)} venues within {parsed.radius_km} km of {parsed.near}")
+    rerank = RERANK_ENABLED and len(matches) > 1
+    if not rerank:
+        matches = matches[:top_k]
 
     # with open("venues_data.txt", "w", encoding="utf-8") as f:
     #     f.write(str(results))
 
-    # Extract all venue IDs from the search results
+    stage_start = time.perf_counter()
+    if PINECONE_METADATA_PROFILE == SELF_CONTAINED:
+        # Vector metadata already carries every rendered field
+        all_venues = []
+        for result in matches:
+            venue_doc = {"_id": result.id, **(getattr(result, "metadata", None) or {})}
+            # The context is only kept for reranking
+            venue_doc.pop("context", None)
+            all_venues.append(venue_doc)
+        missing_ids = []
+    else:
+        # Hydrate all venues (every rerank candidate) from MongoDB in a single round trip
+        collection = get_client_registry().async_collection()
+        all_venues, missing_ids = await afetch_venues_by_ids(collection, [result.id for result in matches],
+                                                             projection=VENUE_PROJECTION)
+    timings["hydrate_ms"] = _elapsed_ms(stage_start)
+
+    if rerank:
+        # Candidates without an embedded context are scored on their hydrated document
+        documents = {venue_doc["_id"]: venue_doc for venue_doc in all_venues}
+        matches, rerank_timings = await arerank_matches(query, matches, top_k, documents=documents)
+        timings.update(rerank_timings)
+        all_venues = [documents[result.id] for result in matches if result.id in documents]
+
+    # Extract all venue IDs and scores from the search results (already in score order)
     venue_ids = []
-    for result in results.matches:
+    scores = {}
+    for result in matches:
         venue_ids.append(result.id)
+        scores[result.id] = result.score
     
     logger.info(f"Extracted {len(venue_ids)} venue IDs: {venue_ids}")
 
-    # Convert IDs to MongoDB ObjectId format and search in database
-    all_venues = []
-    mongo_client, database, collection = initialize_mongo_client()
-    
-    for venue_id in venue_ids:
-        try:
-            # Convert string ID to ObjectId
-            object_id = ObjectId(venue_id)
-            
-            # Search in MongoDB
-            venue_doc = collection.find_one({"_id": object_id})
-            
-            if venue_doc:
-                # Convert ObjectId back to string for JSON serialization
-                venue_doc["_id"] = str(venue_doc["_id"])
-                all_venues.append(venue_doc)
-                logger.info(f"Found venue in database: {venue_id}")
-            else:
-                logger.warning(f"Venue not found in database: {venue_id}")
-                
-        except Exception as e:
-            logger.error(f"Error processing venue ID {venue_id}: {str(e)}")
-            continue
-    
-    # Close MongoDB connection
-    mongo_client.close()
+    for venue_doc in all_venues:
+        venue_doc["score"] = scores.get(venue_doc["_id"])
+        if venue_doc["_id"] in distances:
+            venue_doc["distanceKm"] = distances[venue_doc["_id"]]
+
+    if missing_ids:
+        logger.warning(f"Venues not found in database: {missing_ids}")
     
-    logger.info(f"Retrieved {len(all_venues)} venues from database")
+    logger.info(f"Retrieved {len(all_venues)} venues")
     
     # Create JSON response
     response_data = {
         "query": query,
-        "filters": filters,
+        "filters": search_filters,
         "total_results": len(all_venues),
-        "venues": all_venues
+        "venues": all_venues,
+        "timings": timings
     }
     
     # Save the detailed venue data to a JSON file
     # with open("venue_search_response.json", "w", encoding="utf-8") as f:
     #     json.dump(response_data, f, ensure_ascii=False, indent=2)
     
-    logger.info("Venue search completed and saved to venue_search_response.json")
-    
-    return json.dumps(response_data, ensure_ascii=False, indent=2), response_data
\ No newline at end of file
+    stage_start = time.perf_counter()
+    content = format_venues_for_llm(query, search_filters, all_venues)
+    timings["format_ms"] = _elapsed_ms(stage_start)
+    timings["total_ms"] = _elapsed_ms(start)
+
+    logger.info(f"Venue search completed: {timings}")
+
+    return content, response_data
\ No newline at end of file
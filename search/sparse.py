@@ -0,0 +1,151 @@
+import os
+import re
+import json
+import math
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+import xxhash
+
+from configs.settings import BM25_PARAMS_PATH
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were will with
+we our you your they their them us i me my can all any also more most other some such than too very
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords or single characters."""
+    return [token for token in _TOKEN_PATTERN.findall((text or "").lower())
+            if len(token) > 1 and token not in STOPWORDS]
+
+
+def term_id(token: str) -> int:
+    """Stable 32-bit term ID (Pinecone sparse indices are uint32), identical across processes."""
+    return xxhash.xxh32_intdigest(token.encode("utf-8"))
+
+
+class BM25Encoder:
+    """
+    BM25 sparse encoder whose dot product between a document and a query vector
+    is the BM25 score.
+
+    Documents carry the saturated, length-normalized term frequency
+    ``tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))`` and queries carry
+    each term's IDF, so a dotproduct sparse index ranks by BM25 without knowing
+    the corpus. Corpus statistics (document count, average length, document
+    frequencies) are accumulated during ingestion and persisted to JSON so query
+    encoders in other processes use the same IDF.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, n_docs: int = 0, avgdl: float = 0.0,
+                 doc_freq: Optional[Dict[int, int]] = None):
+        self.k1 = k1
+        self.b = b
+        self.n_docs = n_docs
+        self.avgdl = avgdl
+        self.doc_freq: Dict[int, int] = doc_freq or {}
+        self._pending_docs = 0
+        self._pending_length = 0
+        self._pending_freq: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str = BM25_PARAMS_PATH) -> "BM25Encoder":
+        """Load persisted parameters, or return an empty encoder when none were saved yet."""
+        if not os.path.exists(path):
+            logger.info(f"No BM25 parameters at {path}, starting with empty corpus statistics")
+            return cls()
+        with open(path, "r") as f:
+            params = json.load(f)
+        encoder = cls(
+            k1=params["k1"],
+            b=params["b"],
+            n_docs=params["n_docs"],
+            avgdl=params["avgdl"],
+            doc_freq={int(term): freq for term, freq in params["doc_freq"].items()},
+        )
+        logger.info(f"Loaded BM25 parameters for {encoder.n_docs} documents from {path}")
+        return encoder
+
+    def add_document(self, text: str) -> None:
+        """Count a document towards the corpus statistics of the next ``commit``."""
+        tokens = tokenize(text)
+        with self._lock:
+            self._pending_docs += 1
+            self._pending_length += len(tokens)
+            self._pending_freq.update({term_id(token) for token in tokens})
+
+    def commit(self) -> None:
+        """Replace the corpus statistics with the documents added since the last commit."""
+        with self._lock:
+            if not self._pending_docs:
+                return
+            self.n_docs = self._pending_docs
+            self.avgdl = self._pending_length / self._pending_docs
+            self.doc_freq = dict(self._pending_freq)
+            self._pending_docs = 0
+            self._pending_length = 0
+            self._pending_freq = Counter()
+
+    def save(self, path: str = BM25_PARAMS_PATH) -> None:
+        """Persist the parameters atomically (temporary file + rename)."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "k1": self.k1,
+                "b": self.b,
+                "n_docs": self.n_docs,
+                "avgdl": self.avgdl,
+                "doc_freq": {str(term): freq for term, freq in self.doc_freq.items()},
+            }, f)
+        os.replace(tmp_path, path)
+        logger.info(f"Saved BM25 parameters for {self.n_docs} documents to {path}")
+
+    def _average_length(self) -> float:
+        if self.avgdl:
+            return self.avgdl
+        # First ingestion: fall back to the running average of the documents seen so far
+        with self._lock:
+            return self._pending_length / self._pending_docs if self._pending_docs else 1.0
+
+    def encode_document(self, text: str) -> Dict[str, list]:
+        counts = Counter(term_id(token) for token in tokenize(text))
+        length = sum(counts.values())
+        norm = self.k1 * (1 - self.b + self.b * length / self._average_length())
+        indices = list(counts)
+        return {
+            "indices": indices,
+            "values": [counts[term] * (self.k1 + 1) / (counts[term] + norm) for term in indices],
+        }
+
+    def idf(self, term: int) -> float:
+        doc_freq = self.doc_freq.get(term, 0)
+        return math.log(1 + (self.n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    def encode_query(self, text: str) -> Dict[str, list]:
+        terms = list(dict.fromkeys(term_id(token) for token in tokenize(text)))
+        return {"indices": terms, "values": [self.idf(term) for term in terms]}
+
+
+def build_sparse_vectors(encoder: BM25Encoder, vectors: List[dict]) -> List[dict]:
+    """
+    Build sparse index records for dense vectors carrying ``metadata['context']``.
+
+    The metadata is copied so filters work the same on both indexes; venues whose
+    context has no indexable terms are left out (Pinecone rejects empty sparse vectors).
+    """
+    sparse_vectors = []
+    for vector in vectors:
+        metadata = vector.get("metadata", {})
+        sparse_values = encoder.encode_document(metadata.get("context", ""))
+        if sparse_values["indices"]:
+            sparse_vectors.append({"id": vector["id"], "sparse_values": sparse_values, "metadata": metadata})
+    return sparse_vectors
@@ -1,15 +1,21 @@
 
-import os
 import time
-import json
+import asyncio
+import inspect
 import logging
 import random
 from functools import wraps
 from typing import List, Dict, Any, Optional
 from pinecone import Pinecone
-from openai import OpenAI
-from openai import RateLimitError, APIError, APIConnectionError, APITimeoutError
+from openai import OpenAI, AsyncOpenAI
+from openai import RateLimitError, APIError, APIConnectionError, APITimeoutError, BadRequestError, AuthenticationError
 import re
+from utils.cache import EmbeddingCache
+from utils.tokens import count_tokens
+from utils.progress_log import progress_log_for_index
+from utils.rate_limit import get_rate_limiter, estimate_upsert_bytes, INTERACTIVE, BACKGROUND
+from utils.metadata_profile import pinecone_metadata
+from configs.settings import EMBEDDING_DIMENSION, PINECONE_METADATA_PROFILE
 
 try:
     from pinecone.exceptions import PineconeException
@@ -23,6 +29,42 @@ except (ImportError, ModuleNotFoundError):
 
 logger = logging.getLogger(__name__)
 
+# OpenAI embeddings API limits
+MAX_EMBEDDING_INPUTS_PER_REQUEST = 2048
+MAX_EMBEDDING_TOKENS_PER_REQUEST = 300_000
+
+# Native dimension of OpenAI embedding models; only the text-embedding-3 family accepts ``dimensions``
+OPENAI_NATIVE_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
+
+def supports_dimensions(embedding_model: str) -> bool:
+    """Whether the model can return shortened embeddings through the ``dimensions`` parameter."""
+    return embedding_model.startswith("text-embedding-3")
+
+
+def request_dimensions(embedding_model: str, dimensions: Optional[int]) -> Optional[int]:
+    """The ``dimensions`` value to send for a model, or None when the model does not take it."""
+    return dimensions if dimensions and supports_dimensions(embedding_model) else None
+
+
+def _dimensions_kwargs(embedding_model: str, dimensions: Optional[int]) -> dict:
+    dimensions = request_dimensions(embedding_model, dimensions)
+    return {"dimensions": dimensions} if dimensions else {}
+
+
+def resolve_embedding_dimension(embedding_model: str, dimensions: int = EMBEDDING_DIMENSION) -> int:
+    """Dimension of the vectors ``embedding_model`` returns when asked for ``dimensions``."""
+    if supports_dimensions(embedding_model):
+        return dimensions
+    native = OPENAI_NATIVE_DIMENSIONS.get(embedding_model, 1536)
+    if dimensions != native:
+        logger.warning(f"{embedding_model} does not support shortened embeddings, using {native} dimensions")
+    return native
+
 
 def retry_with_exponential_backoff(
     max_retries: int = 10,
@@ -33,6 +75,7 @@ def retry_with_exponential_backoff(
 ):
     """
     Decorator for retrying functions with exponential backoff.
+    Coroutine functions are retried with ``asyncio.sleep`` so the event loop is never blocked.
     
     Args:
         max_retries: Maximum number of retry attempts
@@ -41,7 +84,54 @@ def retry_with_exponential_backoff(
         exponential_base: Base for exponential backoff calculation
         jitter: Whether to add random jitter to avoid thundering herd
     """
+    # Requests that were rejected as invalid will fail the same way on every attempt
+    non_retryable_errors = (BadRequestError, AuthenticationError)
+    retryable_errors = (RateLimitError, APIError, APIConnectionError, APITimeoutError,
+                        PineconeException, ConnectionError, TimeoutError)
+
+    def compute_delay(attempt: int) -> float:
+        # Calculate delay with exponential backoff
+        delay = min(base_delay * (exponential_base ** attempt), max_delay)
+        
+        # Add jitter to prevent thundering herd
+        if jitter:
+            delay = delay * (0.5 + random.random() * 0.5)
+        return delay
+
     def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                last_exception = None
+                
+                for attempt in range(max_retries + 1):
+                    try:
+                        return await func(*args, **kwargs)
+                    except non_retryable_errors as e:
+                        logger.error(f"Function {func.__name__} failed with non-retryable error: {e}")
+                        raise e
+                    except retryable_errors as e:
+                        last_exception = e
+                        
+                        if attempt == max_retries:
+                            logger.error(f"Function {func.__name__} failed after {max_retries} retries. Last error: {e}")
+                            raise last_exception
+                        
+                        delay = compute_delay(attempt)
+                        logger.warning(f"Function {func.__name__} failed on attempt {attempt + 1}/{max_retries + 1}. "
+                                     f"Retrying in {delay:.2f} seconds. Error: {e}")
+                        # Yield to the event loop instead of blocking it
+                        await asyncio.sleep(delay)
+                    except Exception as e:
+                        # For non-retryable exceptions, fail immediately
+                        logger.error(f"Function {func.__name__} failed with non-retryable error: {e}")
+                        raise e
+                
+                # This should never be reached, but just in case
+                raise last_exception
+            
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
             last_exception = None
@@ -49,21 +139,17 @@ def retry_with_exponential_backoff(
             for attempt in range(max_retries + 1):
                 try:
                     return func(*args, **kwargs)
-                except (RateLimitError, APIError, APIConnectionError, APITimeoutError, 
-                        PineconeException, ConnectionError, TimeoutError) as e:
+                except non_retryable_errors as e:
+                    logger.error(f"Function {func.__name__} failed with non-retryable error: {e}")
+                    raise e
+                except retryable_errors as e:
                     last_exception = e
                     
                     if attempt == max_retries:
                         logger.error(f"Function {func.__name__} failed after {max_retries} retries. Last error: {e}")
                         raise last_exception
                     
-                    # Calculate delay with exponential backoff
-                    delay = min(base_delay * (exponential_base ** attempt), max_delay)
-                    
-                    # Add jitter to prevent thundering herd
-                    if jitter:
-                        delay = delay * (0.5 + random.random() * 0.5)
-                    
+                    delay = compute_delay(attempt)
                     logger.warning(f"Function {func.__name__} failed on attempt {attempt + 1}/{max_retries + 1}. "
                                  f"Retrying in {delay:.2f} seconds. Error: {e}")
                     time.sleep(delay)
@@ -79,67 +165,195 @@ def retry_with_exponential_backoff(
     return decorator
 
 
+def embedding_rate_limiter(openai_client):
+    """Return the shared embedding rate limiter, or None for in-process backends that have no API quota."""
+    if getattr(openai_client, "is_local", False):
+        return None
+    return get_rate_limiter("openai-embeddings")
+
+
+def prepare_embedding_text(text: str) -> str:
+    """Clean and truncate text to fit OpenAI token limits."""
+    cleaned_text = re.sub(r'\s+', ' ', text.strip())
+    
+    # text-embedding-3-small has 8192 token limit
+    # Conservative estimate: 1 token ≈ 3 characters for mixed content
+    max_chars = 8192 * 2.5  # About 20,480 chars to be safe
+    
+    if len(cleaned_text) > max_chars:
+        logger.warning(f"Text too long ({len(cleaned_text)} chars), truncating to {max_chars} chars")
+        cleaned_text = cleaned_text[:int(max_chars)] + "..."
+    return cleaned_text
+
+
 @retry_with_exponential_backoff(max_retries=5, base_delay=1.0, max_delay=120.0)
-def create_embedding(openai_client: OpenAI, embedding_model: str, text: str) -> list[float]:
-    """Generate embedding vector for a given data with retry logic and token limit handling."""
+def create_embedding(openai_client: OpenAI, embedding_model: str, text: str, cache: Optional[EmbeddingCache] = None,
+                     priority: str = INTERACTIVE, dimensions: Optional[int] = EMBEDDING_DIMENSION) -> list[float]:
+    """Generate embedding vector for a given data with retry logic and token limit handling.
+    When an EmbeddingCache is given, cached vectors are returned without calling OpenAI."""
     try:
-        # Clean and truncate text to fit OpenAI token limits
-        cleaned_text = re.sub(r'\s+', ' ', text.strip())
-        
-        # text-embedding-3-small has 8192 token limit
-        # Conservative estimate: 1 token ≈ 3 characters for mixed content
-        max_chars = 8192 * 2.5  # About 20,480 chars to be safe
-        
-        if len(cleaned_text) > max_chars:
-            logger.warning(f"Text too long ({len(cleaned_text)} chars), truncating to {max_chars} chars")
-            cleaned_text = cleaned_text[:int(max_chars)] + "..."
-        
+        dimensions = request_dimensions(embedding_model, dimensions)
+        if cache is not None:
+            cached = cache.get(text, embedding_model, dimensions)
+            if cached is not None:
+                return cached
+
+        prepared = prepare_embedding_text(text)
+        limiter = embedding_rate_limiter(openai_client)
+        if limiter:
+            limiter.acquire(priority, requests=1, tokens=count_tokens(prepared, embedding_model))
         response = openai_client.embeddings.create(
             model=embedding_model,
-            input=cleaned_text
+            input=prepared,
+            **_dimensions_kwargs(embedding_model, dimensions)
         )
-        return response.data[0].embedding
+        embedding = response.data[0].embedding
+        if cache is not None:
+            cache.set(text, embedding_model, embedding, dimensions)
+        return embedding
     except Exception as e:
         logger.error(f"Embedding creation failed: {e}")
         return None
 
+
+@retry_with_exponential_backoff(max_retries=5, base_delay=1.0, max_delay=120.0)
+async def acreate_embedding(openai_client: AsyncOpenAI, embedding_model: str, text: str, cache: Optional[EmbeddingCache] = None,
+                            priority: str = INTERACTIVE, dimensions: Optional[int] = EMBEDDING_DIMENSION) -> list[float]:
+    """Async version of create_embedding for use on the request path."""
+    try:
+        dimensions = request_dimensions(embedding_model, dimensions)
+        if cache is not None:
+            cached = await cache.aget(text, embedding_model, dimensions)
+            if cached is not None:
+                return cached
+
+        prepared = prepare_embedding_text(text)
+        limiter = embedding_rate_limiter(openai_client)
+        if limiter:
+            await limiter.aacquire(priority, requests=1, tokens=count_tokens(prepared, embedding_model))
+        response = await openai_client.embeddings.create(
+            model=embedding_model,
+            input=prepared,
+            **_dimensions_kwargs(embedding_model, dimensions)
+        )
+        embedding = response.data[0].embedding
+        if cache is not None:
+            await cache.aset(text, embedding_model, embedding, dimensions)
+        return embedding
+    except Exception as e:
+        logger.error(f"Embedding creation failed: {e}")
+        return None
+
+def pack_embedding_batches(
+    texts: List[str],
+    embedding_model: str,
+    max_inputs: int = MAX_EMBEDDING_INPUTS_PER_REQUEST,
+    max_tokens: int = MAX_EMBEDDING_TOKENS_PER_REQUEST
+) -> List[List[int]]:
+    """Group text indices into requests that stay within the per-request input and token limits."""
+    batches = []
+    current_batch = []
+    current_tokens = 0
+
+    for i, text in enumerate(texts):
+        tokens = count_tokens(text, embedding_model)
+        if current_batch and (len(current_batch) >= max_inputs or current_tokens + tokens > max_tokens):
+            batches.append(current_batch)
+            current_batch = []
+            current_tokens = 0
+        current_batch.append(i)
+        current_tokens += tokens
+
+    if current_batch:
+        batches.append(current_batch)
+    return batches
+
+
+@retry_with_exponential_backoff(max_retries=5, base_delay=1.0, max_delay=120.0)
+def request_embeddings(openai_client: OpenAI, embedding_model: str, inputs: List[str],
+                       dimensions: Optional[int] = EMBEDDING_DIMENSION) -> List[List[float]]:
+    """Embed several inputs in one API call, returning vectors in input order."""
+    limiter = embedding_rate_limiter(openai_client)
+    if limiter:
+        limiter.acquire(BACKGROUND, requests=1, tokens=sum(count_tokens(text, embedding_model) for text in inputs))
+    response = openai_client.embeddings.create(
+        model=embedding_model,
+        input=inputs,
+        **_dimensions_kwargs(embedding_model, dimensions)
+    )
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+def embed_with_split(openai_client: OpenAI, embedding_model: str, inputs: List[str],
+                     dimensions: Optional[int] = EMBEDDING_DIMENSION) -> List[Optional[List[float]]]:
+    """
+    Embed a batch, splitting it in half whenever the API rejects it as invalid so that
+    a single bad input only costs its own vector (returned as None).
+    """
+    try:
+        return request_embeddings(openai_client, embedding_model, inputs, dimensions)
+    except BadRequestError as e:
+        if len(inputs) == 1:
+            logger.error(f"Embedding input rejected ({len(inputs[0])} chars): {e}")
+            return [None]
+        middle = len(inputs) // 2
+        logger.warning(f"Embedding batch of {len(inputs)} rejected, retrying as two batches: {e}")
+        return (embed_with_split(openai_client, embedding_model, inputs[:middle], dimensions) +
+                embed_with_split(openai_client, embedding_model, inputs[middle:], dimensions))
+    except Exception as e:
+        logger.error(f"Embedding batch of {len(inputs)} inputs failed: {e}")
+        return [None] * len(inputs)
+
+
+def create_embeddings(openai_client: OpenAI, embedding_model: str, texts: List[str],
+                      dimensions: Optional[int] = EMBEDDING_DIMENSION) -> List[Optional[List[float]]]:
+    """
+    Generate embeddings for many texts with as few API calls as possible.
+
+    Texts are packed into requests by token count (measured with tiktoken) up to the
+    API limits of 2048 inputs and 300k tokens per request. The result is aligned with
+    ``texts``; failed or empty inputs get None.
+    """
+    prepared = [prepare_embedding_text(text or '') for text in texts]
+    embeddings: List[Optional[List[float]]] = [None] * len(texts)
+    indices = [i for i, text in enumerate(prepared) if text]
+
+    for batch in pack_embedding_batches([prepared[i] for i in indices], embedding_model):
+        batch_indices = [indices[i] for i in batch]
+        vectors = embed_with_split(openai_client, embedding_model, [prepared[i] for i in batch_indices], dimensions)
+        for i, vector in zip(batch_indices, vectors):
+            embeddings[i] = vector
+
+    return embeddings
+
+
 @retry_with_exponential_backoff(max_retries=3, base_delay=2.0, max_delay=60.0)
-def upsert_chunk_to_pinecone(index, vectors_chunk: List[Dict[str, Any]]) -> None:
+def upsert_chunk_to_pinecone(index, vectors_chunk: List[Dict[str, Any]], profile: str = PINECONE_METADATA_PROFILE) -> None:
     """Upsert a chunk of vectors to Pinecone with retry logic."""
     if not vectors_chunk:
         logger.warning("No vectors to upsert in chunk")
         return
     
+    # Trim metadata to the configured profile; the caller's vectors are left untouched
+    vectors_chunk = [{**vector, "metadata": pinecone_metadata(vector.get("metadata"), profile)} for vector in vectors_chunk]
+
+    limiter = get_rate_limiter("pinecone-upserts")
+    if limiter:
+        limiter.acquire(BACKGROUND, requests=1, bytes=estimate_upsert_bytes(vectors_chunk))
+
     # This call will be retried on failure
     index.upsert(vectors=vectors_chunk)
     logger.info(f"Successfully upserted {len(vectors_chunk)} vectors to Pinecone")
 
 
-def save_progress(progress_data: dict, progress_file: str) -> None:
-    """Save progress data to file."""
-    try:
-        with open(progress_file, 'w') as f:
-            json.dump(progress_data, f, indent=2)
-        logger.debug(f"Progress saved: {len(progress_data.get('processed_ids', []))} venues processed")
-    except Exception as e:
-        logger.warning(f"Could not save progress: {e}")
-
-
-def load_progress(progress_file: str) -> set:
-    """Load progress data from file and return set of processed IDs."""
-    try:
-        if os.path.exists(progress_file):
-            with open(progress_file, 'r') as f:
-                progress_data = json.load(f)
-            processed_ids = set(progress_data.get('processed_ids', []))
-            logger.info(f"Loaded progress: {len(processed_ids)} venues already processed")
-            return processed_ids
-        else:
-            logger.info("No previous progress found, starting fresh")
-            return set()
-    except Exception as e:
-        logger.warning(f"Could not load progress, starting fresh: {e}")
-        return set()
+@retry_with_exponential_backoff(max_retries=3, base_delay=2.0, max_delay=60.0)
+def update_metadata_in_pinecone(index, venue_id: str, metadata: Dict[str, Any], profile: str = PINECONE_METADATA_PROFILE) -> None:
+    """Overwrite the metadata fields of an existing vector without touching its values."""
+    metadata = pinecone_metadata(metadata, profile)
+    limiter = get_rate_limiter("pinecone-upserts")
+    if limiter:
+        limiter.acquire(BACKGROUND, requests=1, bytes=estimate_upsert_bytes([{"id": venue_id, "metadata": metadata}]))
+    index.update(id=venue_id, set_metadata=metadata)
 
 
 def insert_data_in_chunks_into_pinecone(
@@ -150,7 +364,7 @@ def insert_data_in_chunks_into_pinecone(
     venues_data: list,
     chunk_size: int = 50,
     embedding_batch_size: int = 100,
-    delay_between_chunks: float = 0.1,
+    delay_between_chunks: float = 0.0,
     save_progress_enabled: bool = True,
     progress_file: Optional[str] = None
 ):
@@ -165,7 +379,8 @@ def insert_data_in_chunks_into_pinecone(
         venues_data: List of venue dictionaries with 'context' and 'metadata' fields
         chunk_size: Number of vectors to upsert in each Pinecone batch (default: 50)
         embedding_batch_size: Number of venues to process for embeddings in each batch (default: 100)
-        delay_between_chunks: Delay between Pinecone upsert chunks in seconds (default: 0.1)
+        delay_between_chunks: Extra delay between Pinecone upsert chunks in seconds (default: 0, the
+            shared rate limiter already paces embedding and upsert requests)
         save_progress_enabled: Whether to track and save progress for resumption (default: True)
         progress_file: Custom progress file name (default: auto-generated)
     
@@ -176,11 +391,11 @@ def insert_data_in_chunks_into_pinecone(
     try:
         # Initialize progress tracking
         processed_ids = set()
-        progress_file_name = progress_file or f"pinecone_insert_progress_{index_name}.json"
+        progress_log = progress_log_for_index(index_name, progress_file)
         
         # Load existing progress if enabled
         if save_progress_enabled:
-            processed_ids = load_progress(progress_file_name)
+            processed_ids = progress_log.load()
         
         # Get Pinecone index
         try:
@@ -238,40 +453,39 @@ def insert_data_in_chunks_into_pinecone(
             
             # Generate embeddings for current batch
             vectors_batch = []
+            embeddable_venues = []
             
             for venue in current_batch:
-                try:
-                    venue_id = str(venue.get('_id', venue.get('id', '')))
-                    context = venue.get('context', '')
-                    metadata = venue.get('metadata', {})
-                    
-                    if not venue_id:
-                        logger.warning("Skipping venue without ID")
-                        continue
-                    
-                    if not context.strip():
-                        logger.warning(f"Skipping venue {venue_id} without context")
-                        continue
-                    
-                    # Generate embedding with retry logic
-                    embedding = create_embedding(openai_client, embedding_model, context)
-                    
-                    if embedding:
-                        vectors_batch.append({
-                            "id": venue_id,
-                            "values": embedding,
-                            "metadata": metadata
-                        })
-                        stats['successful_embeddings'] += 1
-                        logger.debug(f"Generated embedding for venue {venue_id}")
-                    else:
-                        logger.error(f"Failed to generate embedding for venue {venue_id}")
-                        stats['failed_embeddings'] += 1
-                        
-                except Exception as e:
-                    logger.error(f"Error processing venue {venue.get('_id', 'unknown')}: {e}")
-                    stats['failed_embeddings'] += 1
+                venue_id = str(venue.get('_id', venue.get('id', '')))
+                context = venue.get('context', '')
+                
+                if not venue_id:
+                    logger.warning("Skipping venue without ID")
                     continue
+                
+                if not context.strip():
+                    logger.warning(f"Skipping venue {venue_id} without context")
+                    continue
+                
+                embeddable_venues.append((venue_id, venue))
+            
+            # One request per token-packed group instead of one per venue
+            embeddings = create_embeddings(
+                openai_client, embedding_model, [venue['context'] for _, venue in embeddable_venues]
+            )
+            
+            for (venue_id, venue), embedding in zip(embeddable_venues, embeddings):
+                if embedding:
+                    vectors_batch.append({
+                        "id": venue_id,
+                        "values": embedding,
+                        "metadata": venue.get('metadata', {})
+                    })
+                    stats['successful_embeddings'] += 1
+                    logger.debug(f"Generated embedding for venue {venue_id}")
+                else:
+                    logger.error(f"Failed to generate embedding for venue {venue_id}")
+                    stats['failed_embeddings'] += 1
             
             # Upsert vectors in chunks
             if vectors_batch:
@@ -287,8 +501,10 @@ def insert_data_in_chunks_into_pinecone(
                         stats['successful_upserts'] += len(vectors_chunk)
                         
                         # Track processed IDs for progress
-                        for vector in vectors_chunk:
-                            processed_ids.add(vector['id'])
+                        chunk_ids = [vector['id'] for vector in vectors_chunk]
+                        processed_ids.update(chunk_ids)
+                        if save_progress_enabled:
+                            progress_log.append(chunk_ids)
                         
                         logger.info(f"Upserted chunk {chunk_start//chunk_size + 1}: "
                                   f"{len(vectors_chunk)} vectors")
@@ -305,15 +521,6 @@ def insert_data_in_chunks_into_pinecone(
             # Update statistics
             stats['newly_processed'] = len(processed_ids) - already_processed
             
-            # Save progress periodically
-            if save_progress_enabled:
-                progress_data = {
-                    'processed_ids': list(processed_ids),
-                    'last_updated': time.time(),
-                    'stats': stats
-                }
-                save_progress(progress_data, progress_file_name)
-            
             # Log batch completion
             logger.info(f"Completed embedding batch {batch_start//embedding_batch_size + 1}. "
                        f"Progress: {len(processed_ids)}/{total_venues}")
@@ -330,28 +537,18 @@ def insert_data_in_chunks_into_pinecone(
         
         # Clean up progress file if everything was successful
         if save_progress_enabled and stats['failed_embeddings'] == 0 and stats['failed_upserts'] == 0:
-            try:
-                if os.path.exists(progress_file_name):
-                    os.remove(progress_file_name)
-                    logger.info("Progress file cleaned up after successful completion")
-            except Exception as e:
-                logger.warning(f"Could not clean up progress file: {e}")
+            progress_log.remove()
+        else:
+            progress_log.close()
         
         return stats
         
     except Exception as e:
         logger.error(f"Critical error in insert_data_in_chunks_into_pinecone: {e}")
         
-        # Save progress even on error
-        if save_progress_enabled and 'processed_ids' in locals():
-            progress_data = {
-                'processed_ids': list(processed_ids),
-                'last_updated': time.time(),
-                'error': str(e),
-                'stats': stats if 'stats' in locals() else {}
-            }
-            progress_file_name = progress_file or f"pinecone_insert_progress_{index_name}.json"
-            save_progress(progress_data, progress_file_name)
+        # Every upserted chunk is already in the progress log; just release the file
+        if 'progress_log' in locals():
+            progress_log.close()
             logger.info("Progress saved before exit due to error")
         
         raise
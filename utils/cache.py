@@ -0,0 +1,471 @@
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+import redis
+import redis.asyncio as aioredis
+
+from configs.settings import (
+    REDIS_HOST,
+    REDIS_PORT,
+    REDIS_PASSWORD,
+    REDIS_DB,
+    REDIS_SOCKET_TIMEOUT,
+    EMBEDDING_CACHE_MAX_ENTRIES,
+    EMBEDDING_CACHE_TTL_SECONDS,
+    EMBEDDING_CACHE_REDIS_ENABLED,
+    SEARCH_CACHE_MAX_ENTRIES,
+    SEARCH_CACHE_TTL_SECONDS,
+    SEARCH_CACHE_REDIS_ENABLED,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def create_redis_client(async_client: bool = False):
+    """Create a Redis client from the configured settings."""
+    client_class = aioredis.Redis if async_client else redis.Redis
+    return client_class(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        password=REDIS_PASSWORD,
+        db=REDIS_DB,
+        socket_timeout=REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+    )
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different queries share a cache key."""
+    return re.sub(r'\s+', ' ', text or '').strip().lower().rstrip('.?!')
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with a per-entry TTL."""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisTier:
+    """
+    Shared Redis cache tier with sync and async access.
+
+    Redis is an optimization, never a dependency: any Redis error is logged,
+    counted and turned into a cache miss, and the tier is skipped for
+    ``cooldown_seconds`` so an unreachable server does not add latency to every call.
+    """
+
+    def __init__(self, key_prefix: str, ttl_seconds: Optional[int] = None, cooldown_seconds: float = 30.0):
+        self.key_prefix = key_prefix
+        self.ttl_seconds = ttl_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.errors = 0
+        self._disabled_until = 0.0
+        self._client = None
+        self._async_client = None
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._disabled_until
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = create_redis_client()
+        return self._client
+
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            self._async_client = create_redis_client(async_client=True)
+        return self._async_client
+
+    def key(self, key: str) -> str:
+        return f"{self.key_prefix}:{key}"
+
+    def _on_error(self, error: Exception) -> None:
+        self.errors += 1
+        self._disabled_until = time.monotonic() + self.cooldown_seconds
+        logger.warning(f"Redis cache tier '{self.key_prefix}' unavailable, skipping for {self.cooldown_seconds}s: {error}")
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self.available:
+            return None
+        try:
+            return self.client.get(self.key(key))
+        except redis.RedisError as e:
+            self._on_error(e)
+            return None
+
+    def mget_raw(self, *keys: str) -> Optional[list]:
+        """Fetch several absolute (unprefixed) keys in one round trip; None when Redis is unavailable."""
+        if not self.available:
+            return None
+        try:
+            return self.client.mget(keys)
+        except redis.RedisError as e:
+            self._on_error(e)
+            return None
+
+    def set(self, key: str, value: bytes) -> None:
+        if not self.available:
+            return
+        try:
+            self.client.set(self.key(key), value, ex=self.ttl_seconds)
+        except redis.RedisError as e:
+            self._on_error(e)
+
+    async def aget(self, key: str) -> Optional[bytes]:
+        if not self.available:
+            return None
+        try:
+            return await self.async_client.get(self.key(key))
+        except redis.RedisError as e:
+            self._on_error(e)
+            return None
+
+    async def aset(self, key: str, value: bytes) -> None:
+        if not self.available:
+            return
+        try:
+            await self.async_client.set(self.key(key), value, ex=self.ttl_seconds)
+        except redis.RedisError as e:
+            self._on_error(e)
+
+    async def amget_raw(self, *keys: str) -> Optional[list]:
+        if not self.available:
+            return None
+        try:
+            return await self.async_client.mget(keys)
+        except redis.RedisError as e:
+            self._on_error(e)
+            return None
+
+    def run_script(self, script: str, keys: List[str], args: list) -> Any:
+        """Run a Lua script on absolute keys; None when Redis is unavailable."""
+        if not self.available:
+            return None
+        try:
+            return self.client.eval(script, len(keys), *keys, *args)
+        except redis.RedisError as e:
+            self._on_error(e)
+            return None
+
+    async def arun_script(self, script: str, keys: List[str], args: list) -> Any:
+        if not self.available:
+            return None
+        try:
+            return await self.async_client.eval(script, len(keys), *keys, *args)
+        except redis.RedisError as e:
+            self._on_error(e)
+            return None
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        self.close()
+
+
+class EmbeddingCache:
+    """
+    Two-tier query embedding cache: an in-process LRU in front of Redis.
+
+    Keys are a hash of the embedding model, the requested dimension and the normalized text. Redis stores
+    vectors as raw float32 bytes (4 bytes per dimension) with a TTL; the LRU is
+    bounded by ``max_entries`` and shares the same TTL.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = EMBEDDING_CACHE_TTL_SECONDS,
+        redis_enabled: bool = EMBEDDING_CACHE_REDIS_ENABLED,
+        key_prefix: str = "venue-agent:embedding",
+    ):
+        self.lru = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.redis = RedisTier(key_prefix, ttl_seconds=ttl_seconds) if redis_enabled else None
+        self._lock = threading.Lock()
+        self.lru_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(text: str, model: str, dimensions: Optional[int] = None) -> str:
+        # Shortened vectors are a different embedding than the full-size one for the same text
+        model_key = f"{model}@{dimensions}" if dimensions else model
+        return hashlib.sha1(f"{model_key}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def encode_vector(vector: List[float]) -> bytes:
+        return np.asarray(vector, dtype=np.float32).tobytes()
+
+    @staticmethod
+    def decode_vector(data: bytes) -> List[float]:
+        return np.frombuffer(data, dtype=np.float32).tolist()
+
+    def _count(self, attribute: str) -> None:
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + 1)
+
+    def get(self, text: str, model: str, dimensions: Optional[int] = None) -> Optional[List[float]]:
+        key = self.make_key(text, model, dimensions)
+        vector = self.lru.get(key)
+        if vector is not None:
+            self._count("lru_hits")
+            return vector
+
+        data = self.redis.get(key) if self.redis else None
+        if data:
+            vector = self.decode_vector(data)
+            self.lru.set(key, vector)
+            self._count("redis_hits")
+            return vector
+
+        self._count("misses")
+        return None
+
+    def set(self, text: str, model: str, vector: List[float], dimensions: Optional[int] = None) -> None:
+        key = self.make_key(text, model, dimensions)
+        self.lru.set(key, vector)
+        if self.redis:
+            self.redis.set(key, self.encode_vector(vector))
+
+    async def aget(self, text: str, model: str, dimensions: Optional[int] = None) -> Optional[List[float]]:
+        key = self.make_key(text, model, dimensions)
+        vector = self.lru.get(key)
+        if vector is not None:
+            self._count("lru_hits")
+            return vector
+
+        data = await self.redis.aget(key) if self.redis else None
+        if data:
+            vector = self.decode_vector(data)
+            self.lru.set(key, vector)
+            self._count("redis_hits")
+            return vector
+
+        self._count("misses")
+        return None
+
+    async def aset(self, text: str, model: str, vector: List[float], dimensions: Optional[int] = None) -> None:
+        key = self.make_key(text, model, dimensions)
+        self.lru.set(key, vector)
+        if self.redis:
+            await self.redis.aset(key, self.encode_vector(vector))
+
+    def stats(self) -> dict:
+        """Return hit/miss counters for both tiers."""
+        lookups = self.lru_hits + self.redis_hits + self.misses
+        return {
+            "lru_hits": self.lru_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.lru_hits + self.redis_hits) / lookups, 4) if lookups else 0.0,
+            "lru_entries": len(self.lru),
+            "redis_errors": self.redis.errors if self.redis else 0,
+        }
+
+    def close(self) -> None:
+        if self.redis:
+            self.redis.close()
+
+    async def aclose(self) -> None:
+        if self.redis:
+            await self.redis.aclose()
+
+
+_local_index_versions: dict = {}
+
+
+def index_version_key(index_name: str) -> str:
+    return f"venue-agent:index-version:{index_name}"
+
+
+def bump_index_version(index_name: str) -> int:
+    """
+    Advance the version stamp of an index after its contents changed.
+
+    Search results cached under an older stamp are never served again. The
+    stamp lives in Redis so every worker process sees the bump; without Redis
+    the search cache is bypassed, as no process could see the bump.
+    """
+    _local_index_versions[index_name] = _local_index_versions.get(index_name, 0) + 1
+    try:
+        client = create_redis_client()
+        try:
+            version = int(client.incr(index_version_key(index_name)))
+        finally:
+            client.close()
+        logger.info(f"Index version for {index_name} bumped to {version}")
+        return version
+    except redis.RedisError as e:
+        logger.error(f"Could not bump index version for {index_name} in Redis, cached searches in other processes may be stale until TTL: {e}")
+        return _local_index_versions[index_name]
+
+
+# (venue ID, score, trimmed metadata); entries written before metadata was cached have two items
+CachedMatch = Tuple[str, float, dict]
+
+
+class SearchResultCache:
+    """
+    Cache of ordered (venue ID, score, metadata) search results per normalized (query, filters, top_k).
+
+    Every entry records the index version stamp it was computed against and is
+    only served while that stamp is current. The stamp and the entry are read in
+    a single MGET round trip. The stamp is bumped by the ingestion process, so
+    when Redis is disabled or unreachable there is no shared stamp to check and
+    the cache is bypassed rather than risk serving results from before a re-index.
+    """
+
+    def __init__(
+        self,
+        index_name: str,
+        max_entries: int = SEARCH_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = SEARCH_CACHE_TTL_SECONDS,
+        redis_enabled: bool = SEARCH_CACHE_REDIS_ENABLED,
+        key_prefix: str = "venue-agent:search",
+    ):
+        self.index_name = index_name
+        self.version_key = index_version_key(index_name)
+        self.lru = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.redis = RedisTier(f"{key_prefix}:{index_name}", ttl_seconds=ttl_seconds) if redis_enabled else None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.unversioned = 0
+
+    @staticmethod
+    def make_key(query: str, filters: Optional[dict], top_k: int) -> str:
+        payload = json.dumps(
+            {"query": normalize_text(query), "filters": filters or {}, "top_k": top_k},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def _count(self, attribute: str) -> None:
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + 1)
+
+    def _resolve(self, key: str, raw: Optional[list]) -> Tuple[Optional[int], Optional[List[CachedMatch]]]:
+        """Pick the current version and a matching entry from the LRU or the MGET reply."""
+        if raw is None:
+            # No shared version stamp: a re-index by another process would go unnoticed
+            self._count("unversioned")
+            return None, None
+        version, redis_entry = int(raw[0] or 0), raw[1]
+
+        entry = self.lru.get(key)
+        if entry is not None and entry[0] == version:
+            return version, entry[1]
+
+        if redis_entry:
+            data = json.loads(redis_entry)
+            if data["version"] == version:
+                matches = [tuple(match) for match in data["matches"]]
+                self.lru.set(key, (version, matches))
+                return version, matches
+
+        if entry is not None or redis_entry:
+            self._count("stale")
+        return version, None
+
+    def _encode(self, version: int, matches: List[CachedMatch]) -> bytes:
+        return json.dumps({"version": version, "matches": matches}).encode("utf-8")
+
+    def get(self, query: str, filters: Optional[dict], top_k: int) -> Tuple[Optional[int], Optional[List[CachedMatch]]]:
+        """Return (current index version or None when it cannot be read, cached matches or None)."""
+        key = self.make_key(query, filters, top_k)
+        raw = self.redis.mget_raw(self.version_key, self.redis.key(key)) if self.redis else None
+        version, matches = self._resolve(key, raw)
+        self._count("hits" if matches is not None else "misses")
+        return version, matches
+
+    def set(self, query: str, filters: Optional[dict], top_k: int, version: Optional[int], matches: List[CachedMatch]) -> None:
+        """Store matches computed against ``version`` (as returned by ``get``); nothing is stored without a version."""
+        if version is None:
+            return
+        key = self.make_key(query, filters, top_k)
+        self.lru.set(key, (version, matches))
+        if self.redis:
+            self.redis.set(key, self._encode(version, matches))
+
+    async def aget(self, query: str, filters: Optional[dict], top_k: int) -> Tuple[Optional[int], Optional[List[CachedMatch]]]:
+        key = self.make_key(query, filters, top_k)
+        raw = await self.redis.amget_raw(self.version_key, self.redis.key(key)) if self.redis else None
+        version, matches = self._resolve(key, raw)
+        self._count("hits" if matches is not None else "misses")
+        return version, matches
+
+    async def aset(self, query: str, filters: Optional[dict], top_k: int, version: Optional[int], matches: List[CachedMatch]) -> None:
+        if version is None:
+            return
+        key = self.make_key(query, filters, top_k)
+        self.lru.set(key, (version, matches))
+        if self.redis:
+            await self.redis.aset(key, self._encode(version, matches))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "unversioned": self.unversioned,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "lru_entries": len(self.lru),
+            "redis_errors": self.redis.errors if self.redis else 0,
+        }
+
+    def close(self) -> None:
+        if self.redis:
+            self.redis.close()
+
+    async def aclose(self) -> None:
+        if self.redis:
+            await self.redis.aclose()
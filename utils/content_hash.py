@@ -0,0 +1,121 @@
+import json
+import time
+import hashlib
+import logging
+from typing import Dict, Iterable, List, Tuple
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+
+def hash_content(value) -> str:
+    """Stable hash of a string or JSON-serializable value."""
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:32]
+
+
+def compute_venue_hashes(venue: dict) -> Tuple[str, str]:
+    """Return (context hash, metadata hash) for an extracted venue."""
+    return hash_content(venue.get('context', '')), hash_content(venue.get('metadata', {}))
+
+
+def classify_by_hashes(items: List[tuple], stored: Dict[str, dict]):
+    """
+    Split (venue ID, venue, context hash, metadata hash) items against stored hashes.
+
+    Returns:
+        tuple: (items to embed, items needing only a metadata update, number unchanged)
+    """
+    to_embed = []
+    to_update = []
+    unchanged = 0
+    for item in items:
+        venue_id, _, context_hash, metadata_hash = item
+        previous = stored.get(venue_id)
+        if previous is None or previous.get('contextHash') != context_hash:
+            to_embed.append(item)
+        elif previous.get('metadataHash') != metadata_hash:
+            to_update.append(item)
+        else:
+            unchanged += 1
+    return to_embed, to_update, unchanged
+
+
+class VenueHashStore:
+    """
+    Content hashes of the venues indexed in a Pinecone index, stored in MongoDB.
+
+    One document per (index, venue) records the hash of the embedded ``context`` and
+    of the metadata, so re-indexing can skip unchanged venues and send metadata-only
+    changes as Pinecone metadata updates without re-embedding. With multi-vector
+    indexing the same document also records the state of the venue's chunks, which
+    is saved separately once the chunk index has been written.
+    """
+
+    def __init__(self, collection, index_name: str):
+        self.collection = collection
+        self.index_name = index_name
+
+    def _key(self, venue_id: str) -> str:
+        return f"{self.index_name}:{venue_id}"
+
+    def get_many(self, venue_ids: Iterable[str]) -> Dict[str, dict]:
+        """Return stored hashes keyed by venue ID for the venues that have been indexed."""
+        keys = [self._key(venue_id) for venue_id in venue_ids]
+        if not keys:
+            return {}
+        return {
+            doc['venueId']: doc
+            for doc in self.collection.find({"_id": {"$in": keys}},
+                                            {"venueId": 1, "contextHash": 1, "metadataHash": 1, "chunkHash": 1, "chunkMetadataHash": 1})
+        }
+
+    def save_many(self, entries: List[Tuple[str, str, str]]) -> None:
+        """Record (venue ID, context hash, metadata hash) for venues that were written to Pinecone."""
+        if not entries:
+            return
+        now = time.time()
+        operations = [
+            UpdateOne(
+                {"_id": self._key(venue_id)},
+                {"$set": {
+                    "index": self.index_name,
+                    "venueId": venue_id,
+                    "contextHash": context_hash,
+                    "metadataHash": metadata_hash,
+                    "updatedAt": now
+                }},
+                upsert=True
+            )
+            for venue_id, context_hash, metadata_hash in entries
+        ]
+        self.collection.bulk_write(operations, ordered=False)
+
+    def save_chunk_hashes(self, entries: List[Tuple[str, str, str]]) -> None:
+        """Record (venue ID, chunk text hash, chunk metadata hash) for venues whose chunks were written."""
+        if not entries:
+            return
+        now = time.time()
+        operations = [
+            UpdateOne(
+                {"_id": self._key(venue_id)},
+                {"$set": {
+                    "index": self.index_name,
+                    "venueId": venue_id,
+                    "chunkHash": chunk_hash,
+                    "chunkMetadataHash": chunk_metadata_hash,
+                    "chunksUpdatedAt": now
+                }},
+                upsert=True
+            )
+            for venue_id, chunk_hash, chunk_metadata_hash in entries
+        ]
+        self.collection.bulk_write(operations, ordered=False)
+
+    def delete_many(self, venue_ids: Iterable[str]) -> None:
+        """Forget venues that were removed from the index."""
+        keys = [self._key(venue_id) for venue_id in venue_ids]
+        if keys:
+            self.collection.delete_many({"_id": {"$in": keys}})
@@ -0,0 +1,217 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from configs.settings import EMBEDDING_STORE_DIR, EMBEDDING_STORE_DTYPE
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingStore:
+    """
+    Append-only on-disk store of every embedding computed during ingestion.
+
+    Vectors are appended as rows of a raw float32/float16 matrix (``vectors.bin``)
+    that is read back through ``np.memmap``, so lookups and re-index scans never
+    load the whole file. A JSON-lines sidecar (``rows.jsonl``) maps each row to
+    its venue ID and context hash and keeps the latest metadata of every venue.
+    Stores are separated per embedding model and dimension, so a vector is only
+    reused for the exact (model, context hash) it was computed for.
+
+    The sidecar line is the commit record: a row whose line was never written
+    (crash between the two appends) is truncated away on the next open. A store
+    directory must have a single writer process at a time.
+    """
+
+    def __init__(self, embedding_model: str, dimension: int, directory: str = EMBEDDING_STORE_DIR,
+                 dtype: str = EMBEDDING_STORE_DTYPE, read_only: bool = False):
+        """
+        Args:
+            embedding_model: Embedding model the vectors were computed with
+            dimension: Vector dimension
+            directory: Root directory of the embedding stores
+            dtype: On-disk dtype, "float32" or "float16" (half the size, ~3 significant digits)
+            read_only: Open without repairing torn writes, for readers running next to an ingestion process
+        """
+        self.embedding_model = embedding_model
+        self.dimension = dimension
+        self.dtype = np.dtype(dtype)
+        self.read_only = read_only
+        self.path = self.store_path(embedding_model, dimension, directory, dtype)
+        self.vectors_path = os.path.join(self.path, "vectors.bin")
+        self.rows_path = os.path.join(self.path, "rows.jsonl")
+        self.row_bytes = self.dimension * self.dtype.itemsize
+
+        self._rows = 0
+        self._by_hash: Dict[str, int] = {}
+        self._by_id: Dict[str, Tuple[int, str, dict]] = {}
+        self._matrix = None
+        self._lock = threading.Lock()
+
+        if not read_only:
+            os.makedirs(self.path, exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def store_path(embedding_model: str, dimension: int, directory: str = EMBEDDING_STORE_DIR,
+                   dtype: str = EMBEDDING_STORE_DTYPE) -> str:
+        """Directory of the store holding ``embedding_model`` vectors of ``dimension``."""
+        model_slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', embedding_model)
+        return os.path.join(directory, f"{model_slug}-{dimension}-{np.dtype(dtype).name}")
+
+    def _load(self):
+        committed_rows = 0
+        valid_bytes = 0
+        if os.path.exists(self.rows_path):
+            with open(self.rows_path, 'rb') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        logger.warning(f"Ignoring partially written record at the end of {self.rows_path}")
+                        break
+                    valid_bytes += len(line)
+                    self._apply(record)
+                    if 'row' in record:
+                        committed_rows = max(committed_rows, record['row'] + 1)
+            if valid_bytes < os.path.getsize(self.rows_path) and not self.read_only:
+                with open(self.rows_path, 'rb+') as f:
+                    f.truncate(valid_bytes)
+
+        # Drop vectors appended after the last committed sidecar record
+        vector_bytes = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        if vector_bytes > committed_rows * self.row_bytes and not self.read_only:
+            with open(self.vectors_path, 'rb+') as f:
+                f.truncate(committed_rows * self.row_bytes)
+        self._rows = committed_rows
+        logger.info(f"Opened embedding store {self.path}: {self._rows} vectors, {len(self._by_id)} venues")
+
+    def _apply(self, record: dict):
+        venue_id = record.get('id')
+        if record.get('deleted'):
+            self._by_id.pop(venue_id, None)
+            return
+        if 'row' in record:
+            self._by_hash[record['hash']] = record['row']
+            self._by_id[venue_id] = (record['row'], record['hash'], record.get('metadata', {}))
+        elif venue_id in self._by_id:
+            row, context_hash, _ = self._by_id[venue_id]
+            self._by_id[venue_id] = (row, context_hash, record.get('metadata', {}))
+
+    def _append_records(self, records: List[dict]):
+        with open(self.rows_path, 'a') as f:
+            for record in records:
+                f.write(json.dumps(record, separators=(',', ':'), default=str) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        for record in records:
+            self._apply(record)
+
+    def matrix(self) -> np.ndarray:
+        """Read-only memory-mapped view of every stored vector (rows x dimension)."""
+        with self._lock:
+            if self._rows == 0:
+                return np.empty((0, self.dimension), dtype=self.dtype)
+            if self._matrix is None or self._matrix.shape[0] != self._rows:
+                self._matrix = np.memmap(self.vectors_path, dtype=self.dtype, mode='r', shape=(self._rows, self.dimension))
+            return self._matrix
+
+    def get_many(self, context_hashes: Iterable[str]) -> Dict[str, List[float]]:
+        """Return the stored vectors for the given context hashes that have been embedded before."""
+        rows = {context_hash: self._by_hash[context_hash] for context_hash in context_hashes if context_hash in self._by_hash}
+        if not rows:
+            return {}
+        vectors = self.matrix()[list(rows.values())].astype(np.float32)
+        return {context_hash: vector.tolist() for context_hash, vector in zip(rows, vectors)}
+
+    def add_many(self, entries: List[Tuple[str, str, List[float], dict]]):
+        """
+        Persist newly computed vectors.
+
+        Args:
+            entries: (venue ID, context hash, vector, metadata) tuples
+        """
+        if not entries:
+            return
+        vectors = np.asarray([vector for _, _, vector, _ in entries], dtype=self.dtype)
+        if vectors.shape[1] != self.dimension:
+            raise ValueError(f"Expected {self.dimension}-dimensional vectors, got {vectors.shape[1]}")
+        with self._lock:
+            with open(self.vectors_path, 'ab') as f:
+                f.write(vectors.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            first_row = self._rows
+            self._rows += len(entries)
+            now = time.time()
+            self._append_records([
+                {'row': first_row + i, 'id': venue_id, 'hash': context_hash, 'metadata': metadata, 't': now}
+                for i, (venue_id, context_hash, _, metadata) in enumerate(entries)
+            ])
+
+    def link_many(self, entries: List[Tuple[str, str, dict]]):
+        """Point venues at vectors already stored under their context hash (venue ID, context hash, metadata)."""
+        records = [
+            {'row': self._by_hash[context_hash], 'id': venue_id, 'hash': context_hash, 'metadata': metadata}
+            for venue_id, context_hash, metadata in entries
+            if context_hash in self._by_hash and self._by_id.get(venue_id, (None, None, None))[1:] != (context_hash, metadata)
+        ]
+        if records:
+            with self._lock:
+                self._append_records(records)
+
+    def update_metadata(self, entries: List[Tuple[str, dict]]):
+        """Record metadata-only changes (venue ID, metadata) for stored venues."""
+        records = [{'id': venue_id, 'metadata': metadata} for venue_id, metadata in entries if venue_id in self._by_id]
+        if records:
+            with self._lock:
+                self._append_records(records)
+
+    def delete_many(self, venue_ids: Iterable[str]):
+        """Forget deleted venues; their rows stay in the matrix but are no longer re-indexed."""
+        records = [{'id': venue_id, 'deleted': True} for venue_id in venue_ids if venue_id in self._by_id]
+        if records:
+            with self._lock:
+                self._append_records(records)
+
+    def prune(self, keep_ids: Iterable[str]) -> List[str]:
+        """Forget every stored venue not in ``keep_ids`` (e.g. deleted from MongoDB while not watching); returns their IDs."""
+        keep_ids = set(keep_ids)
+        removed = [venue_id for venue_id in self._by_id if venue_id not in keep_ids]
+        self.delete_many(removed)
+        return removed
+
+    def iter_vectors(self, batch_size: int = 100) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield Pinecone-ready vector batches for every live venue, in on-disk row order.
+
+        Rows are read straight from the memory map one batch at a time, so a full
+        re-index never holds more than ``batch_size`` vectors in memory.
+        """
+        matrix = self.matrix()
+        live = self.live_rows()
+        for start in range(0, len(live), batch_size):
+            batch = live[start:start + batch_size]
+            values = matrix[[row for _, row, _ in batch]].astype(np.float32)
+            yield [
+                {"id": venue_id, "values": vector.tolist(), "metadata": metadata}
+                for (venue_id, _, metadata), vector in zip(batch, values)
+            ]
+
+    def live_rows(self) -> List[Tuple[str, int, dict]]:
+        """Return (venue ID, row, metadata) for every live venue in on-disk row order."""
+        return sorted(((venue_id, row, metadata) for venue_id, (row, _, metadata) in self._by_id.items()),
+                      key=lambda item: item[1])
+
+    def venue_hashes(self, venue_ids: Iterable[str]) -> Dict[str, str]:
+        """Return the stored context hash of each known venue."""
+        return {venue_id: self._by_id[venue_id][1] for venue_id in venue_ids if venue_id in self._by_id}
+
+    def __len__(self) -> int:
+        return len(self._by_id)
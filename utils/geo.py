@@ -0,0 +1,210 @@
+import re
+import math
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from configs.settings import GEOHASH_PRECISIONS, GEO_MAX_COVERING_CELLS
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_MILE = 1.609344
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Approximate centers of the places the agent is asked about, keyed by lowercase name
+PLACES: Dict[str, Tuple[float, float]] = {
+    "boston": (42.3601, -71.0589),
+    "south boston": (42.3381, -71.0476),
+    "east boston": (42.3702, -71.0389),
+    "brighton": (42.3484, -71.1548),
+    "allston": (42.3539, -71.1337),
+    "charlestown": (42.3782, -71.0602),
+    "dorchester": (42.3016, -71.0676),
+    "roxbury": (42.3152, -71.0914),
+    "jamaica plain": (42.3097, -71.1151),
+    "chestnut hill": (42.3306, -71.1662),
+    "cambridge": (42.3736, -71.1097),
+    "somerville": (42.3876, -71.0995),
+    "brookline": (42.3318, -71.1212),
+    "providence": (41.8240, -71.4128),
+    "newport": (41.4901, -71.3128),
+    "warwick": (41.7001, -71.4162),
+    "east greenwich": (41.6604, -71.4559),
+    "portsmouth": (43.0718, -70.7626),
+    "salem": (42.5195, -70.8967),
+    "gloucester": (42.6159, -70.6620),
+    "newburyport": (42.8126, -70.8773),
+    "burlington": (42.5048, -71.1956),
+    "waltham": (42.3765, -71.2356),
+    "worcester": (42.2626, -71.8023),
+    "plymouth": (41.9584, -70.6673),
+    "quincy": (42.2529, -71.0023),
+    "ipswich": (42.6792, -70.8412),
+    "everett": (42.4084, -71.0537),
+    "dedham": (42.2418, -71.1662),
+    "hingham": (42.2418, -70.8898),
+    "danvers": (42.5750, -70.9301),
+    "beverly": (42.5584, -70.8800),
+    "lowell": (42.6334, -71.3162),
+    "haverhill": (42.7762, -71.0773),
+    "falmouth": (41.5515, -70.6148),
+    "fall river": (41.7015, -71.1550),
+    "new bedford": (41.6362, -70.9342),
+    "wellesley": (42.2965, -71.2924),
+    "natick": (42.2834, -71.3495),
+    "watertown": (42.3709, -71.1828),
+    "sturbridge": (42.1084, -72.0787),
+    "north andover": (42.6987, -71.1351),
+}
+
+_COORDINATES_PATTERN = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$")
+_PLACE_PREFIX_PATTERN = re.compile(r"^(?:downtown|central|greater|the)\s+")
+
+
+def encode_geohash(lat: float, lng: float, precision: int = 5) -> str:
+    """Encode a coordinate as a base32 geohash of ``precision`` characters."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value, value_range = (lng, lng_range) if even else (lat, lat_range)
+        middle = (value_range[0] + value_range[1]) / 2
+        if value >= middle:
+            bits = (bits << 1) | 1
+            value_range[0] = middle
+        else:
+            bits <<= 1
+            value_range[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def cell_size_degrees(precision: int) -> Tuple[float, float]:
+    """(latitude, longitude) extent in degrees of a geohash cell of ``precision`` characters."""
+    total_bits = 5 * precision
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def geohash_cells(lat: Optional[float], lng: Optional[float], precisions: Sequence[int] = GEOHASH_PRECISIONS) -> List[str]:
+    """
+    Geohash cells containing a venue, one per precision, stored as list metadata.
+
+    A list field lets one ``$in`` filter match cells of any precision. Venues
+    without coordinates (missing or 0,0) get no cells.
+    """
+    if lat is None or lng is None or (not lat and not lng):
+        return []
+    finest = encode_geohash(lat, lng, max(precisions))
+    return [finest[:precision] for precision in sorted(precisions)]
+
+
+def covering_cells(lat: float, lng: float, radius_km: float, precisions: Sequence[int] = GEOHASH_PRECISIONS,
+                   max_cells: int = GEO_MAX_COVERING_CELLS) -> List[str]:
+    """
+    Geohash cells covering the bounding box of a circle.
+
+    The finest stored precision whose covering stays within ``max_cells`` is used,
+    so small radii get a tight prefilter and large ones a short ``$in`` list. The
+    covering is a superset of the circle; the haversine post-filter makes it exact.
+    """
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    lng_delta = min(math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)), 180.0)
+    south, north = max(lat - lat_delta, -90.0), min(lat + lat_delta, 90.0)
+    west, east = lng - lng_delta, lng + lng_delta
+
+    cells: List[str] = []
+    for precision in sorted(precisions, reverse=True):
+        cell_lat, cell_lng = cell_size_degrees(precision)
+        rows = math.floor(north / cell_lat) - math.floor(south / cell_lat) + 1
+        columns = math.floor(east / cell_lng) - math.floor(west / cell_lng) + 1
+        if rows * columns > max_cells and precision != min(precisions):
+            continue
+        cells = []
+        # Step from the center of the south-west cell so every covered cell is visited exactly once
+        start_lat = (math.floor(south / cell_lat) + 0.5) * cell_lat
+        start_lng = (math.floor(west / cell_lng) + 0.5) * cell_lng
+        for row in range(rows):
+            cell_center_lat = min(start_lat + row * cell_lat, 90.0 - cell_lat / 2)
+            for column in range(columns):
+                cell_center_lng = (start_lng + column * cell_lng + 180.0) % 360.0 - 180.0
+                cells.append(encode_geohash(cell_center_lat, cell_center_lng, precision))
+        break
+    return list(dict.fromkeys(cells))
+
+
+def geo_filter(lat: float, lng: float, radius_km: float) -> dict:
+    """Pinecone metadata filter keeping venues in the cells covering the search circle."""
+    return {"geohashes": {"$in": covering_cells(lat, lng, radius_km)}}
+
+
+def haversine_km(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Great-circle distance in km from one point to arrays of points."""
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def filter_matches_within(matches: list, lat: float, lng: float, radius_km: float) -> Tuple[list, Dict[str, float]]:
+    """
+    Keep the matches whose metadata coordinates lie within ``radius_km`` of (lat, lng).
+
+    Distances for all candidates are computed in one vectorized pass; matches
+    without coordinates are dropped. Rank order is preserved.
+
+    Returns:
+        tuple: (kept matches, distance in km by venue ID)
+    """
+    if not matches:
+        return [], {}
+    lats = np.array([_coordinate(match, "lat") for match in matches], dtype=np.float64)
+    lngs = np.array([_coordinate(match, "lng") for match in matches], dtype=np.float64)
+    distances = haversine_km(lat, lng, lats, lngs)
+    keep = (distances <= radius_km) & ~np.isnan(distances)
+    kept = [match for match, inside in zip(matches, keep) if inside]
+    return kept, {match.id: round(float(distance), 1) for match, distance, inside in zip(matches, distances, keep) if inside}
+
+
+def _coordinate(match, field: str) -> float:
+    metadata = getattr(match, "metadata", None) or {}
+    value = metadata.get(field)
+    if not isinstance(value, (int, float)) or (not metadata.get("lat") and not metadata.get("lng")):
+        return np.nan
+    return float(value)
+
+
+def resolve_place(place: str) -> Optional[Tuple[float, float]]:
+    """
+    Resolve a place name ("downtown Boston", "Salem, MA") or a "lat,lng" string to coordinates.
+    Returns None for places not in the gazetteer.
+    """
+    if not place:
+        return None
+    match = _COORDINATES_PATTERN.match(place)
+    if match:
+        return float(match.group(1)), float(match.group(2))
+    name = place.lower().split(",")[0].strip()
+    name = _PLACE_PREFIX_PATTERN.sub("", name)
+    coordinates = PLACES.get(name)
+    if coordinates is None:
+        logger.warning(f"Unknown place for geo search: {place}")
+    return coordinates
+
+
+def to_km(distance: float, unit: str) -> float:
+    """Convert a distance in km or miles ("mi", "mile", "miles") to km."""
+    return distance * KM_PER_MILE if unit.lower().startswith("mi") else distance
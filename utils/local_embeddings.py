@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Union
+
+import numpy as np
+
+from configs.settings import (
+    LOCAL_EMBEDDING_MODEL,
+    LOCAL_EMBEDDING_DEVICE,
+    LOCAL_EMBEDDING_BATCH_SIZE,
+    LOCAL_EMBEDDING_THREADS,
+    LOCAL_EMBEDDING_QUANTIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LocalEmbedding:
+    index: int
+    embedding: List[float]
+    object: str = "embedding"
+
+
+@dataclass
+class LocalEmbeddingResponse:
+    data: List[LocalEmbedding]
+    model: str
+    object: str = "list"
+
+
+@lru_cache(maxsize=None)
+def get_local_embedding_model(
+    model_name: str = LOCAL_EMBEDDING_MODEL,
+    device: str = LOCAL_EMBEDDING_DEVICE,
+    num_threads: int = LOCAL_EMBEDDING_THREADS,
+    quantize: bool = LOCAL_EMBEDDING_QUANTIZE,
+):
+    """
+    Load a sentence-transformers model once per process and keep it warm.
+
+    Args:
+        model_name: Hugging Face model name or local path
+        device: Torch device ("cpu", "cuda", ...)
+        num_threads: Torch intra-op threads for CPU inference (0 keeps the torch default)
+        quantize: Apply int8 dynamic quantization to the Linear layers (CPU only)
+    """
+    # Imported lazily so the OpenAI backend does not pay for loading torch
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if num_threads:
+        torch.set_num_threads(num_threads)
+
+    model = SentenceTransformer(model_name, device=device)
+    model.eval()
+    if quantize:
+        if device != "cpu":
+            logger.warning(f"int8 dynamic quantization is CPU only, ignoring it on {device}")
+        else:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    # The first forward pass allocates buffers; do it now instead of on the first query
+    model.encode(["warm up"], convert_to_numpy=True)
+    logger.info(f"Loaded local embedding model {model_name} on {device} "
+                f"(dimension={model.get_sentence_embedding_dimension()}, quantized={quantize})")
+    return model
+
+
+class _LocalEmbeddings:
+    def __init__(self, client: "LocalEmbeddingClient"):
+        self._client = client
+
+    def create(self, input: Union[str, List[str]], model: Optional[str] = None, dimensions: Optional[int] = None, **kwargs):
+        return self._client.embed(input, model=model, dimensions=dimensions)
+
+
+class LocalEmbeddingClient:
+    """
+    In-process embedding backend exposing the ``client.embeddings.create`` surface
+    used with the OpenAI client, so ``create_embedding``/``create_embeddings`` work
+    unchanged. Inputs are encoded in batches of ``batch_size`` on the warm model;
+    vectors are L2-normalized to match OpenAI embeddings under cosine similarity.
+    """
+
+    is_local = True
+
+    def __init__(
+        self,
+        model_name: str = LOCAL_EMBEDDING_MODEL,
+        device: str = LOCAL_EMBEDDING_DEVICE,
+        batch_size: int = LOCAL_EMBEDDING_BATCH_SIZE,
+        num_threads: int = LOCAL_EMBEDDING_THREADS,
+        quantize: bool = LOCAL_EMBEDDING_QUANTIZE,
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.model = get_local_embedding_model(model_name, device, num_threads, quantize)
+        self.embeddings = _LocalEmbeddings(self)
+        # Torch already parallelizes each batch across cores; serializing calls avoids oversubscription
+        self._lock = threading.Lock()
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def embed(self, input: Union[str, List[str]], model: Optional[str] = None, dimensions: Optional[int] = None) -> LocalEmbeddingResponse:
+        texts = [input] if isinstance(input, str) else list(input)
+        with self._lock:
+            vectors = self.model.encode(
+                texts,
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            )
+        if dimensions and dimensions < vectors.shape[1]:
+            vectors = vectors[:, :dimensions]
+            vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return LocalEmbeddingResponse(
+            data=[LocalEmbedding(index=i, embedding=vector.tolist()) for i, vector in enumerate(vectors)],
+            model=model or self.model_name,
+        )
+
+    def close(self):
+        pass
+
+
+class _AsyncLocalEmbeddings:
+    def __init__(self, client: "AsyncLocalEmbeddingClient"):
+        self._client = client
+
+    async def create(self, input: Union[str, List[str]], model: Optional[str] = None, dimensions: Optional[int] = None, **kwargs):
+        return await asyncio.to_thread(self._client.sync_client.embed, input, model, dimensions)
+
+
+class AsyncLocalEmbeddingClient:
+    """Async facade over a LocalEmbeddingClient; inference runs in a worker thread off the event loop."""
+
+    is_local = True
+
+    def __init__(self, sync_client: Optional[LocalEmbeddingClient] = None):
+        self.sync_client = sync_client or LocalEmbeddingClient()
+        self.embeddings = _AsyncLocalEmbeddings(self)
+
+    @property
+    def dimension(self) -> int:
+        return self.sync_client.dimension
+
+    async def close(self):
+        pass
@@ -0,0 +1,73 @@
+from typing import Any, Dict, Optional
+
+from configs.settings import PINECONE_METADATA_PROFILE, PINECONE_METADATA_DESCRIPTION_CHARS, RERANK_CONTEXT_CHARS
+
+FULL = "full"
+FILTER_ONLY = "filter-only"
+SELF_CONTAINED = "self-contained"
+
+# Fields search filters on: query filters, geo prefilter and haversine post-filter
+FILTER_FIELDS = (
+    "city", "state", "serveEvents", "vendorType", "isApproved",
+    "budgetMin", "budgetMax", "rating", "lat", "lng", "geohashes",
+)
+
+# Extra fields format_venue_line needs to render a venue without reading MongoDB
+DISPLAY_FIELDS = ("businessName", "businessDescription", "businessPhone", "address", "reviewCount", "accessibility")
+
+PROFILE_FIELDS = {
+    FILTER_ONLY: FILTER_FIELDS,
+    SELF_CONTAINED: FILTER_FIELDS + DISPLAY_FIELDS,
+}
+
+
+def _compact(field: str, value: Any) -> Any:
+    if field == "rating":
+        return round(float(value), 1)
+    if field in ("lat", "lng"):
+        # 5 decimals is ~1 m, plenty for radius search
+        return round(float(value), 5)
+    if field in ("budgetMin", "budgetMax", "reviewCount"):
+        return int(value)
+    if field == "businessDescription" and len(value) > PINECONE_METADATA_DESCRIPTION_CHARS:
+        return value[:PINECONE_METADATA_DESCRIPTION_CHARS].rsplit(" ", 1)[0]
+    return value
+
+
+def pinecone_metadata(metadata: Optional[Dict[str, Any]], profile: str = PINECONE_METADATA_PROFILE) -> Dict[str, Any]:
+    """
+    Reduce venue metadata to the fields of a metadata profile before it is sent to Pinecone.
+
+    "full" sends the metadata unchanged. "filter-only" keeps only the fields
+    search filters on, and "self-contained" adds what is needed to render
+    results without hydrating from MongoDB. Both slim profiles drop the
+    embedded context and empty values, and store numbers in compact form.
+    The embedding store and content hashes always keep the full metadata.
+    """
+    fields = PROFILE_FIELDS.get(profile)
+    if fields is None or not metadata:
+        return metadata or {}
+    return {
+        field: _compact(field, metadata[field])
+        for field in fields
+        if metadata.get(field) not in (None, "", [])
+    }
+
+
+def rerank_context(metadata: Optional[Dict[str, Any]]) -> str:
+    """The embedded context (or best chunk text) of a match, cut to what the cross-encoder scores."""
+    return ((metadata or {}).get("context") or "")[:RERANK_CONTEXT_CHARS]
+
+
+def cacheable_metadata(metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Metadata kept with cached search results: what the post-retrieval stages read.
+
+    The context is kept only as far as reranking reads it, so a cached match is
+    scored on the same text as a fresh one.
+    """
+    cached = pinecone_metadata(metadata, SELF_CONTAINED)
+    context = rerank_context(metadata)
+    if context:
+        cached["context"] = context
+    return cached
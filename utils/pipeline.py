@@ -0,0 +1,461 @@
+import time
+import queue
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from pinecone import Pinecone
+from openai import OpenAI
+
+from utils.batch_processing import create_embeddings, upsert_chunk_to_pinecone, update_metadata_in_pinecone
+from utils.content_hash import VenueHashStore, compute_venue_hashes, classify_by_hashes, hash_content
+from utils.progress_log import progress_log_for_index
+from utils.embedding_store import EmbeddingStore
+from search.sparse import BM25Encoder, build_sparse_vectors
+from search.chunks import classify_chunk_items, sync_venue_chunks
+
+logger = logging.getLogger(__name__)
+
+# Sentinel telling a stage worker that its upstream stage has finished
+_STOP = object()
+
+
+class _Stage:
+    """
+    A pool of worker threads reading from one bounded queue and writing to the next.
+
+    When the last worker of a stage exits it puts one stop sentinel per downstream
+    worker, so shutdown propagates through the pipeline in order.
+    """
+
+    def __init__(self, name: str, handler: Callable, workers: int, input_queue: Optional[queue.Queue],
+                 output_queue: Optional[queue.Queue], errors: List[BaseException],
+                 on_worker_exit: Optional[Callable] = None):
+        self.name = name
+        self.handler = handler
+        self.on_worker_exit = on_worker_exit
+        self.workers = max(1, workers)
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.downstream_workers = 0
+        self.errors = errors
+        self._running = self.workers
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def _worker(self):
+        try:
+            if self.input_queue is None:
+                self.handler(None)
+            else:
+                while True:
+                    item = self.input_queue.get()
+                    if item is _STOP:
+                        break
+                    self.handler(item)
+            if self.on_worker_exit:
+                self.on_worker_exit()
+        except BaseException as e:
+            logger.error(f"Pipeline stage '{self.name}' failed: {e}")
+            self.errors.append(e)
+            # Keep draining so upstream stages blocked on a full queue can finish
+            if self.input_queue is not None:
+                while self.input_queue.get() is not _STOP:
+                    pass
+        finally:
+            with self._lock:
+                self._running -= 1
+                last_worker = self._running == 0
+            if last_worker and self.output_queue is not None:
+                for _ in range(self.downstream_workers):
+                    self.output_queue.put(_STOP)
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"ingest-{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+
+def embed_venue_batch(openai_client: OpenAI, embedding_model: str, batch: List[tuple],
+                      embedding_store: Optional[EmbeddingStore] = None):
+    """
+    Turn (venue ID, venue, context hash, metadata hash) items into Pinecone vectors.
+
+    Vectors already in the embedding store for the same context hash are reused;
+    only the rest are sent to the embedding API, and are then persisted to the store.
+
+    Returns:
+        tuple: (vectors, hash entries of the embedded venues, number reused from the store, number failed)
+    """
+    stored = embedding_store.get_many(context_hash for _, _, context_hash, _ in batch) if embedding_store is not None else {}
+    # Venues sharing a context are embedded once
+    missing = {}
+    for item in batch:
+        if item[2] not in stored:
+            missing.setdefault(item[2], item)
+    embeddings = create_embeddings(openai_client, embedding_model, [venue['context'] for _, venue, _, _ in missing.values()])
+    computed = {context_hash: embedding for context_hash, embedding in zip(missing, embeddings) if embedding}
+
+    if embedding_store is not None:
+        embedding_store.add_many([(venue_id, context_hash, computed[context_hash], venue.get('metadata', {}))
+                                  for venue_id, venue, context_hash, _ in missing.values() if context_hash in computed])
+        embedding_store.link_many([(venue_id, context_hash, venue.get('metadata', {}))
+                                   for venue_id, venue, context_hash, _ in batch])
+
+    vectors = []
+    hash_entries = []
+    failed = 0
+    for venue_id, venue, context_hash, metadata_hash in batch:
+        embedding = stored.get(context_hash) or computed.get(context_hash)
+        if embedding:
+            vectors.append({"id": venue_id, "values": embedding, "metadata": venue.get('metadata', {})})
+            hash_entries.append((venue_id, context_hash, metadata_hash))
+        else:
+            logger.error(f"Failed to generate embedding for venue {venue_id}")
+            failed += 1
+    return vectors, hash_entries, sum(1 for item in batch if item[2] in stored), failed
+
+
+def run_ingestion_pipeline(
+    pinecone_client: Pinecone,
+    openai_client: OpenAI,
+    embedding_model: str,
+    index_name: str,
+    documents: Iterable[Dict[str, Any]],
+    extract_fn: Optional[Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]] = None,
+    chunk_size: int = 50,
+    embedding_batch_size: int = 100,
+    extract_workers: int = 1,
+    embedding_workers: int = 2,
+    upsert_workers: int = 2,
+    queue_size: int = 8,
+    delay_between_chunks: float = 0.0,
+    save_progress_enabled: bool = True,
+    progress_file: Optional[str] = None,
+    hash_store: Optional[VenueHashStore] = None,
+    force_reindex: bool = False,
+    embedding_store: Optional[EmbeddingStore] = None,
+    sparse_index=None,
+    bm25_encoder: Optional[BM25Encoder] = None,
+    chunk_index=None
+):
+    """
+    Insert venue embeddings into Pinecone with a concurrent producer/consumer pipeline.
+
+    Stages (each with its own thread pool, connected by bounded queues for backpressure):
+        read    -> iterates ``documents`` (e.g. a MongoDB cursor)
+        extract -> applies ``extract_fn`` and groups venues into embedding batches
+        embed   -> one batched embedding request per batch, split into upsert chunks
+                   (with a ``chunk_index``, venue chunks are also embedded and written here)
+        upsert  -> upserts chunks into Pinecone and appends their IDs to the progress log
+
+    With a ``hash_store`` the extract stage compares each venue's context and metadata
+    hashes with the ones recorded at its last indexing: unchanged venues are skipped,
+    metadata-only changes go straight to the upsert stage as Pinecone metadata updates,
+    and only new or edited contexts are embedded.
+
+    Args:
+        pinecone_client: Initialized Pinecone client
+        openai_client: Initialized OpenAI client
+        embedding_model: OpenAI embedding model to use
+        index_name: Name of the Pinecone index
+        documents: Iterable of raw documents, or of already extracted venues when ``extract_fn`` is None
+        extract_fn: Converts a raw document into a venue with 'context' and 'metadata' (None to skip it)
+        chunk_size: Number of vectors to upsert in each Pinecone batch
+        embedding_batch_size: Number of venues embedded per batch
+        extract_workers: Threads in the extract stage
+        embedding_workers: Concurrent embedding requests
+        upsert_workers: Concurrent Pinecone upserts
+        queue_size: Capacity of each queue between stages
+        delay_between_chunks: Optional delay after each upsert in seconds
+        save_progress_enabled: Whether to track and save progress for resumption
+        progress_file: Custom progress log file name (default: auto-generated)
+        hash_store: Content hashes of already indexed venues for incremental re-indexing
+        force_reindex: Re-embed every venue even when its stored hashes match
+        embedding_store: On-disk store of computed vectors; contexts embedded before are not sent to the API again
+        sparse_index: BM25 sparse index handle written next to the dense index (requires ``bm25_encoder``)
+        bm25_encoder: BM25 encoder; every extracted venue is added to its pending corpus statistics, which
+            the caller commits and saves after a complete run
+        chunk_index: Multi-vector index receiving the description/FAQ/testimonial chunks of each venue; chunk
+            state is hashed separately, so chunks are synced (and failures retried) independently of the venue vector
+
+    Returns:
+        Dict with the same statistics as insert_data_in_chunks_into_pinecone plus
+        'skipped_unchanged', 'metadata_updates', 'reused_embeddings', 'elapsed_seconds' and 'venues_per_second'.
+    """
+    start_time = time.monotonic()
+    progress_log = progress_log_for_index(index_name, progress_file)
+    processed_ids = progress_log.load() if save_progress_enabled else set()
+    already_processed = len(processed_ids)
+
+    index = pinecone_client.Index(index_name)
+    logger.info(f"Connected to Pinecone index: {index_name}")
+
+    stats = {
+        'total_venues': 0,
+        'already_processed': already_processed,
+        'newly_processed': 0,
+        'successful_embeddings': 0,
+        'successful_upserts': 0,
+        'failed_embeddings': 0,
+        'failed_upserts': 0,
+        'skipped_unchanged': 0,
+        'metadata_updates': 0,
+        'reused_embeddings': 0,
+        'chunk_syncs': 0,
+        'failed_chunk_syncs': 0
+    }
+    stats_lock = threading.Lock()
+    errors: List[BaseException] = []
+
+    def add_stats(**increments):
+        with stats_lock:
+            for key, value in increments.items():
+                stats[key] += value
+
+    documents_queue = queue.Queue(maxsize=queue_size * embedding_batch_size)
+    batches_queue = queue.Queue(maxsize=queue_size)
+    chunks_queue = queue.Queue(maxsize=queue_size)
+
+    def read(_):
+        for doc in documents:
+            documents_queue.put(doc)
+
+    def extract(doc):
+        venue = extract_fn(doc) if extract_fn else doc
+        if not venue:
+            return
+        venue_id = str(venue.get('_id', venue.get('id', '')))
+        if not venue_id:
+            logger.warning("Skipping venue without ID")
+            return
+        add_stats(total_venues=1)
+        if bm25_encoder is not None:
+            bm25_encoder.add_document(venue.get('context', ''))
+        if venue_id in processed_ids:
+            return
+        if not venue.get('context', '').strip():
+            logger.warning(f"Skipping venue {venue_id} without context")
+            return
+
+        buffer = extract_buffers.setdefault(threading.get_ident(), [])
+        buffer.append((venue_id, venue))
+        if len(buffer) >= embedding_batch_size:
+            dispatch_batch(list(buffer))
+            buffer.clear()
+
+    extract_buffers: Dict[int, list] = {}
+
+    def flush_extract_buffer():
+        buffer = extract_buffers.pop(threading.get_ident(), None)
+        if buffer:
+            dispatch_batch(buffer)
+
+    def dispatch_batch(batch):
+        """Attach content hashes and route each venue to embedding, a metadata update or nowhere."""
+        batch = [(venue_id, venue, *compute_venue_hashes(venue)) for venue_id, venue in batch]
+        stored = {} if force_reindex or hash_store is None else hash_store.get_many(venue_id for venue_id, *_ in batch)
+        if chunk_index is not None:
+            chunks_to_embed, chunks_to_update = classify_chunk_items(batch, stored)
+            if chunks_to_embed or chunks_to_update:
+                batches_queue.put(("chunks", chunks_to_embed, chunks_to_update))
+        if hash_store is None:
+            batches_queue.put(batch)
+            return
+
+        to_embed, to_update, unchanged = classify_by_hashes(batch, stored)
+        add_stats(skipped_unchanged=unchanged)
+
+        if to_embed:
+            batches_queue.put(to_embed)
+        for chunk_start in range(0, len(to_update), chunk_size):
+            chunks_queue.put(("update", to_update[chunk_start:chunk_start + chunk_size]))
+
+    def sync_chunks(to_embed, to_update):
+        """Embed and write chunks in the embed stage; hashes are saved only for fully synced venues."""
+        synced, failed = sync_venue_chunks(chunk_index, openai_client, embedding_model, to_embed, to_update, chunk_size)
+        if hash_store is not None:
+            hash_store.save_chunk_hashes(synced)
+        add_stats(chunk_syncs=len(synced), failed_chunk_syncs=len(failed))
+
+    def embed(batch):
+        if isinstance(batch, tuple):
+            sync_chunks(batch[1], batch[2])
+            return
+        vectors, hash_entries, reused, failed = embed_venue_batch(openai_client, embedding_model, batch, embedding_store)
+        add_stats(successful_embeddings=len(vectors) - reused, reused_embeddings=reused, failed_embeddings=failed)
+
+        for chunk_start in range(0, len(vectors), chunk_size):
+            chunk_end = chunk_start + chunk_size
+            chunks_queue.put(("upsert", vectors[chunk_start:chunk_end], hash_entries[chunk_start:chunk_end]))
+
+    def update_metadata(items):
+        hash_entries = []
+        for venue_id, venue, context_hash, metadata_hash in items:
+            try:
+                update_metadata_in_pinecone(index, venue_id, venue.get('metadata', {}))
+                if sparse_index is not None:
+                    update_metadata_in_pinecone(sparse_index, venue_id, venue.get('metadata', {}))
+                hash_entries.append((venue_id, context_hash, metadata_hash))
+            except Exception as e:
+                logger.error(f"Failed to update metadata for venue {venue_id}: {e}")
+                add_stats(failed_upserts=1)
+        if embedding_store is not None:
+            embedding_store.update_metadata([(venue_id, venue.get('metadata', {})) for venue_id, venue, _, _ in items])
+        hash_store.save_many(hash_entries)
+        add_stats(metadata_updates=len(hash_entries))
+
+    def upsert(item):
+        if item[0] == "update":
+            update_metadata(item[1])
+            return
+
+        _, vectors_chunk, hash_entries = item
+        try:
+            upsert_chunk_to_pinecone(index, vectors_chunk)
+            if sparse_index is not None:
+                upsert_chunk_to_pinecone(sparse_index, build_sparse_vectors(bm25_encoder, vectors_chunk))
+        except Exception as e:
+            logger.error(f"Failed to upsert chunk of {len(vectors_chunk)} vectors: {e}")
+            add_stats(failed_upserts=len(vectors_chunk))
+            return
+
+        if hash_store is not None:
+            hash_store.save_many(hash_entries)
+
+        chunk_ids = [vector['id'] for vector in vectors_chunk]
+        if save_progress_enabled:
+            progress_log.append(chunk_ids)
+
+        with stats_lock:
+            stats['successful_upserts'] += len(vectors_chunk)
+            processed_ids.update(chunk_ids)
+            stats['newly_processed'] = len(processed_ids) - already_processed
+            logger.info(f"Progress: {stats['newly_processed']} venues upserted "
+                        f"({stats['total_venues']} read)")
+
+        if delay_between_chunks > 0:
+            time.sleep(delay_between_chunks)
+
+    read_stage = _Stage("read", read, 1, None, documents_queue, errors)
+    extract_stage = _Stage("extract", extract, extract_workers, documents_queue, batches_queue, errors,
+                           on_worker_exit=flush_extract_buffer)
+    embed_stage = _Stage("embed", embed, embedding_workers, batches_queue, chunks_queue, errors)
+    upsert_stage = _Stage("upsert", upsert, upsert_workers, chunks_queue, None, errors)
+
+    read_stage.downstream_workers = extract_stage.workers
+    extract_stage.downstream_workers = embed_stage.workers
+    embed_stage.downstream_workers = upsert_stage.workers
+
+    stages = [read_stage, extract_stage, embed_stage, upsert_stage]
+    for stage in stages:
+        stage.start()
+    for stage in stages:
+        stage.join()
+
+    elapsed = time.monotonic() - start_time
+    stats['elapsed_seconds'] = round(elapsed, 2)
+    stats['venues_per_second'] = round(stats['newly_processed'] / elapsed, 2) if elapsed > 0 else 0.0
+
+    if errors:
+        # Every upserted chunk is already in the progress log; just release the file
+        progress_log.close()
+        logger.info("Progress saved before exit due to error")
+        raise errors[0]
+
+    logger.info("=== PIPELINE COMPLETE ===")
+    for key, value in stats.items():
+        logger.info(f"{key}: {value}")
+
+    # Clean up progress file if everything was successful
+    if save_progress_enabled and stats['failed_embeddings'] == 0 and stats['failed_upserts'] == 0:
+        progress_log.remove()
+    else:
+        progress_log.close()
+
+    return stats
+
+
+def upsert_from_embedding_store(
+    pinecone_client: Pinecone,
+    index_name: str,
+    embedding_store: EmbeddingStore,
+    chunk_size: int = 100,
+    upsert_workers: int = 4,
+    queue_size: int = 8,
+    hash_store: Optional[VenueHashStore] = None,
+    sparse_index=None,
+    bm25_encoder: Optional[BM25Encoder] = None
+):
+    """
+    Rebuild a Pinecone index from the on-disk embedding store without calling the embedding API.
+
+    Batches are read from the memory-mapped store by one thread and upserted by
+    ``upsert_workers`` threads through a bounded queue, so memory stays at
+    ``queue_size`` chunks however large the store is.
+
+    Args:
+        pinecone_client: Initialized Pinecone client
+        index_name: Name of the Pinecone index to fill
+        embedding_store: Store holding the vectors and latest metadata of every venue
+        chunk_size: Number of vectors per upsert
+        upsert_workers: Concurrent Pinecone upserts
+        queue_size: Capacity of the queue between the reader and the upserters
+        hash_store: Content hashes to record for the target index, so later runs stay incremental
+        sparse_index: BM25 sparse index to rebuild as well, from the stored contexts (requires ``bm25_encoder``)
+        bm25_encoder: BM25 encoder with the saved corpus statistics
+
+    Returns:
+        Dict with 'total_vectors', 'successful_upserts', 'failed_upserts', 'elapsed_seconds' and 'vectors_per_second'
+    """
+    start_time = time.monotonic()
+    index = pinecone_client.Index(index_name)
+    stats = {'total_vectors': 0, 'successful_upserts': 0, 'failed_upserts': 0}
+    stats_lock = threading.Lock()
+    errors: List[BaseException] = []
+    chunks_queue = queue.Queue(maxsize=queue_size)
+
+    def read(_):
+        for chunk in embedding_store.iter_vectors(chunk_size):
+            with stats_lock:
+                stats['total_vectors'] += len(chunk)
+            chunks_queue.put(chunk)
+
+    def upsert(chunk):
+        try:
+            upsert_chunk_to_pinecone(index, chunk)
+            if sparse_index is not None:
+                upsert_chunk_to_pinecone(sparse_index, build_sparse_vectors(bm25_encoder, chunk))
+        except Exception as e:
+            logger.error(f"Failed to upsert chunk of {len(chunk)} vectors: {e}")
+            with stats_lock:
+                stats['failed_upserts'] += len(chunk)
+            return
+        if hash_store is not None:
+            context_hashes = embedding_store.venue_hashes(vector['id'] for vector in chunk)
+            hash_store.save_many([(vector['id'], context_hashes[vector['id']], hash_content(vector['metadata']))
+                                  for vector in chunk if vector['id'] in context_hashes])
+        with stats_lock:
+            stats['successful_upserts'] += len(chunk)
+            logger.info(f"Re-index progress: {stats['successful_upserts']}/{len(embedding_store)} vectors upserted")
+
+    read_stage = _Stage("store-read", read, 1, None, chunks_queue, errors)
+    upsert_stage = _Stage("store-upsert", upsert, upsert_workers, chunks_queue, None, errors)
+    read_stage.downstream_workers = upsert_stage.workers
+    for stage in (read_stage, upsert_stage):
+        stage.start()
+    for stage in (read_stage, upsert_stage):
+        stage.join()
+
+    elapsed = time.monotonic() - start_time
+    stats['elapsed_seconds'] = round(elapsed, 2)
+    stats['vectors_per_second'] = round(stats['successful_upserts'] / elapsed, 2) if elapsed > 0 else 0.0
+    if errors:
+        raise errors[0]
+    logger.info(f"Re-indexed {stats['successful_upserts']} vectors from {embedding_store.path} into {index_name}")
+    return stats
@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import logging
+import threading
+from typing import Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressLog:
+    """
+    Append-only, crash-safe record of venue IDs already written to Pinecone.
+
+    Every commit appends one JSON line holding only that batch's IDs and fsyncs it,
+    so the cost per batch is O(batch) instead of rewriting the full ID list. A crash
+    mid-write can at worst leave a truncated last line, which is cut off on the next
+    load; any other undecodable line is skipped without losing the records after it.
+    Once the log holds ``compact_every`` records it is rewritten as
+    a single record through a temporary file and an atomic ``os.replace``.
+    """
+
+    def __init__(self, path: str, legacy_json_path: Optional[str] = None, compact_every: int = 1000):
+        """
+        Args:
+            path: Line log file path
+            legacy_json_path: Old whole-file JSON progress file to import on first load
+            compact_every: Number of appended records after which the log is compacted
+        """
+        self.path = path
+        self.legacy_json_path = legacy_json_path
+        self.compact_every = compact_every
+        self.processed_ids: Set[str] = set()
+        self._records = 0
+        self._file = None
+        self._lock = threading.Lock()
+
+    def load(self) -> Set[str]:
+        """Read the log (and any legacy JSON progress file) and return the processed IDs."""
+        with self._lock:
+            self.processed_ids = set()
+            self._records = 0
+            self._load_legacy()
+
+            if os.path.exists(self.path):
+                complete_bytes = 0
+                tail = None
+                skipped = 0
+                with open(self.path, 'rb') as f:
+                    for line in f:
+                        if not line.endswith(b'\n'):
+                            tail = line
+                            break
+                        complete_bytes += len(line)
+                        if self._read_record(line):
+                            continue
+                        skipped += 1
+                if skipped:
+                    logger.warning(f"Skipped {skipped} undecodable records in {self.path}")
+                if tail is not None:
+                    with open(self.path, 'rb+') as f:
+                        if self._read_record(tail):
+                            # A complete record that only misses its newline
+                            f.seek(0, os.SEEK_END)
+                            f.write(b'\n')
+                        else:
+                            logger.warning(f"Dropping partially written record at the end of {self.path}")
+                            f.truncate(complete_bytes)
+
+            if self.processed_ids:
+                logger.info(f"Loaded progress: {len(self.processed_ids)} venues already processed")
+            else:
+                logger.info("No previous progress found, starting fresh")
+            return set(self.processed_ids)
+
+    def _read_record(self, line: bytes) -> bool:
+        """Add the IDs of one log line; False when the line cannot be decoded."""
+        try:
+            record = json.loads(line)
+            ids = record.get('ids', [])
+        except (ValueError, AttributeError):
+            return False
+        self._records += 1
+        self.processed_ids.update(ids)
+        return True
+
+    def _load_legacy(self):
+        if not self.legacy_json_path or not os.path.exists(self.legacy_json_path):
+            return
+        try:
+            with open(self.legacy_json_path, 'r') as f:
+                self.processed_ids.update(json.load(f).get('processed_ids', []))
+            logger.info(f"Imported {len(self.processed_ids)} processed IDs from {self.legacy_json_path}")
+        except Exception as e:
+            logger.warning(f"Could not read legacy progress file {self.legacy_json_path}: {e}")
+
+    def append(self, ids: Iterable[str]):
+        """Durably record a batch of processed venue IDs."""
+        with self._lock:
+            ids = [venue_id for venue_id in ids if venue_id not in self.processed_ids]
+            if not ids:
+                return
+            try:
+                self._write_record({'ids': ids, 't': time.time()})
+                self.processed_ids.update(ids)
+                if self._records >= self.compact_every:
+                    self._compact()
+            except Exception as e:
+                logger.warning(f"Could not save progress: {e}")
+
+    def _write_record(self, record: dict):
+        if self._file is None:
+            self._file = open(self.path, 'a')
+            if self._file.tell() and not self._ends_with_newline():
+                # Never glue a record onto an unterminated last line (the log was not loaded first)
+                self._file.write('\n')
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._records += 1
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def _compact(self):
+        """Rewrite the log as a single record and drop the imported legacy file."""
+        self.close()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps({'ids': sorted(self.processed_ids), 't': time.time()}, separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._fsync_directory()
+        self._records = 1
+        if self.legacy_json_path and os.path.exists(self.legacy_json_path):
+            os.remove(self.legacy_json_path)
+        logger.debug(f"Compacted progress log: {len(self.processed_ids)} venues")
+
+    def _fsync_directory(self):
+        try:
+            fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        except OSError:
+            # Directories cannot be opened for fsync on some platforms (e.g. Windows)
+            return
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        """Delete the log and any legacy progress file after a fully successful run."""
+        with self._lock:
+            self.close()
+            for path in (self.path, self.legacy_json_path):
+                try:
+                    if path and os.path.exists(path):
+                        os.remove(path)
+                except Exception as e:
+                    logger.warning(f"Could not clean up progress file {path}: {e}")
+            logger.info("Progress file cleaned up after successful completion")
+
+
+def progress_log_for_index(index_name: str, progress_file: Optional[str] = None) -> ProgressLog:
+    """Return the progress log of an index, importing the old JSON progress file if one is left over."""
+    return ProgressLog(
+        progress_file or f"pinecone_insert_progress_{index_name}.log",
+        legacy_json_path=f"pinecone_insert_progress_{index_name}.json"
+    )
@@ -0,0 +1,282 @@
+import json
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from utils.cache import RedisTier
+
+from configs.settings import (
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_REDIS_ENABLED,
+    RATE_LIMIT_INTERACTIVE_RESERVE,
+    OPENAI_EMBEDDING_RPM,
+    OPENAI_EMBEDDING_TPM,
+    PINECONE_UPSERT_RPM,
+    PINECONE_UPSERT_MB_PER_MINUTE,
+)
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+# Refill and take from every bucket of a limiter atomically, using the Redis clock.
+# ARGV[1] is 1 when the reserve applies (background callers), followed by
+# (rate per ms, capacity, reserve, amount) for each key. Returns the wait in ms (0 = acquired).
+_TOKEN_BUCKET_SCRIPT = """
+local now = redis.call('TIME')
+local now_ms = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local apply_reserve = tonumber(ARGV[1]) == 1
+local levels = {}
+local wait = 0
+for i = 1, #KEYS do
+    local base = 1 + (i - 1) * 4
+    local rate = tonumber(ARGV[base + 1])
+    local capacity = tonumber(ARGV[base + 2])
+    local reserve = tonumber(ARGV[base + 3])
+    local amount = tonumber(ARGV[base + 4])
+    local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now_ms
+    tokens = math.min(capacity, tokens + math.max(0, now_ms - ts) * rate)
+    levels[i] = tokens
+    local needed = amount
+    if apply_reserve then
+        needed = needed + reserve
+    end
+    if tokens < needed then
+        wait = math.max(wait, (needed - tokens) / rate)
+    end
+end
+for i = 1, #KEYS do
+    local base = 1 + (i - 1) * 4
+    local tokens = levels[i]
+    if wait == 0 then
+        tokens = tokens - tonumber(ARGV[base + 4])
+    end
+    redis.call('HSET', KEYS[i], 'tokens', tostring(tokens), 'ts', now_ms)
+    redis.call('PEXPIRE', KEYS[i], math.ceil(tonumber(ARGV[base + 2]) / tonumber(ARGV[base + 1])) + 1000)
+end
+return math.ceil(wait)
+"""
+
+
+class TokenBucket:
+    """Thread-safe in-process token bucket refilled continuously at ``rate_per_second``."""
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_second)
+        self.updated_at = now
+
+
+class RateLimiter:
+    """
+    Proactive limiter over one or more per-minute budgets (e.g. requests and tokens).
+
+    Each budget is a token bucket holding at most one minute of capacity. ``acquire``
+    blocks (``aacquire`` awaits) until every budget can cover the call, then takes
+    from all of them at once. With Redis enabled the buckets live in Redis and are
+    shared by every worker process; if Redis is unreachable the limiter falls back
+    to per-process buckets until it comes back.
+
+    A fraction of every budget is held back for interactive callers: background
+    work (ingestion) may only draw a bucket down to the reserve, so live searches
+    are never starved by indexing.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        budgets_per_minute: Dict[str, float],
+        interactive_reserve: float = RATE_LIMIT_INTERACTIVE_RESERVE,
+        redis_enabled: bool = RATE_LIMIT_REDIS_ENABLED,
+    ):
+        """
+        Args:
+            name: Limiter name, used in Redis keys and logs
+            budgets_per_minute: Budget name -> capacity per minute (e.g. {"requests": 3000, "tokens": 1_000_000})
+            interactive_reserve: Fraction of each budget that background callers cannot use
+            redis_enabled: Share the buckets across processes through Redis
+        """
+        self.name = name
+        self.budgets = {budget: float(limit) for budget, limit in budgets_per_minute.items() if limit and limit > 0}
+        self.interactive_reserve = interactive_reserve
+        self.redis = RedisTier(f"venue-agent:ratelimit:{{{name}}}") if redis_enabled else None
+        self._buckets = {budget: TokenBucket(limit / 60.0, limit) for budget, limit in self.budgets.items()}
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.waited_seconds = 0.0
+
+    def _amounts(self, amounts: Dict[str, float]) -> Dict[str, float]:
+        # A single call larger than a whole budget could never be admitted; cap it at the capacity
+        return {budget: min(float(amounts.get(budget, 0)), limit) for budget, limit in self.budgets.items()}
+
+    def _reserve(self, budget: str, amount: float, priority: str) -> float:
+        if priority == INTERACTIVE:
+            return 0.0
+        # Never hold back more than what leaves room for this call
+        return min(self.budgets[budget] * self.interactive_reserve, self.budgets[budget] - amount)
+
+    def _try_local(self, amounts: Dict[str, float], priority: str) -> float:
+        """Take ``amounts`` from the local buckets, or return the seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            for budget, amount in amounts.items():
+                bucket = self._buckets[budget]
+                bucket.refill(now)
+                needed = amount + self._reserve(budget, amount, priority)
+                if bucket.tokens < needed:
+                    wait = max(wait, (needed - bucket.tokens) / bucket.rate_per_second)
+            if wait == 0.0:
+                for budget, amount in amounts.items():
+                    self._buckets[budget].tokens -= amount
+            return wait
+
+    def _script_args(self, amounts: Dict[str, float], priority: str):
+        keys: List[str] = []
+        args: List[Any] = [0 if priority == INTERACTIVE else 1]
+        for budget, amount in amounts.items():
+            keys.append(self.redis.key(budget))
+            args.extend([self.budgets[budget] / 60000.0, self.budgets[budget],
+                         self._reserve(budget, amount, BACKGROUND), amount])
+        return keys, args
+
+    def _try(self, amounts: Dict[str, float], priority: str) -> float:
+        if self.redis is not None:
+            wait_ms = self.redis.run_script(_TOKEN_BUCKET_SCRIPT, *self._script_args(amounts, priority))
+            if wait_ms is not None:
+                return int(wait_ms) / 1000.0
+        return self._try_local(amounts, priority)
+
+    async def _atry(self, amounts: Dict[str, float], priority: str) -> float:
+        if self.redis is not None:
+            wait_ms = await self.redis.arun_script(_TOKEN_BUCKET_SCRIPT, *self._script_args(amounts, priority))
+            if wait_ms is not None:
+                return int(wait_ms) / 1000.0
+        return self._try_local(amounts, priority)
+
+    def _record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.waits += 1
+            self.waited_seconds += seconds
+
+    def acquire(self, priority: str = BACKGROUND, **amounts: float) -> float:
+        """
+        Block until the budgets can cover ``amounts`` and take them.
+
+        Args:
+            priority: INTERACTIVE (may use the reserve) or BACKGROUND
+            **amounts: Amount per budget, e.g. requests=1, tokens=812
+
+        Returns:
+            Seconds spent waiting
+        """
+        amounts = self._amounts(amounts)
+        waited = 0.0
+        while True:
+            wait = self._try(amounts, priority)
+            if wait <= 0:
+                break
+            time.sleep(wait)
+            waited += wait
+        if waited:
+            self._record_wait(waited)
+            logger.debug(f"Rate limiter '{self.name}' delayed a {priority} call by {waited:.2f}s")
+        return waited
+
+    async def aacquire(self, priority: str = BACKGROUND, **amounts: float) -> float:
+        """Async version of acquire that yields to the event loop while waiting."""
+        amounts = self._amounts(amounts)
+        waited = 0.0
+        while True:
+            wait = await self._atry(amounts, priority)
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+            waited += wait
+        if waited:
+            self._record_wait(waited)
+            logger.debug(f"Rate limiter '{self.name}' delayed a {priority} call by {waited:.2f}s")
+        return waited
+
+    def stats(self) -> dict:
+        return {
+            "budgets_per_minute": dict(self.budgets),
+            "waits": self.waits,
+            "waited_seconds": round(self.waited_seconds, 2),
+            "redis_errors": self.redis.errors if self.redis else 0,
+        }
+
+    def close(self) -> None:
+        if self.redis:
+            self.redis.close()
+
+    async def aclose(self) -> None:
+        if self.redis:
+            await self.redis.aclose()
+
+
+def estimate_upsert_bytes(vectors: List[Dict[str, Any]]) -> int:
+    """Approximate the request size of an upsert: 4 bytes per dimension plus the JSON metadata."""
+    return sum(
+        len(str(vector.get("id", ""))) + 4 * len(vector.get("values", []))
+        + len(json.dumps(vector.get("metadata", {}), default=str))
+        for vector in vectors
+    )
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _limiter_budgets(name: str) -> Dict[str, float]:
+    if name == "openai-embeddings":
+        return {"requests": OPENAI_EMBEDDING_RPM, "tokens": OPENAI_EMBEDDING_TPM}
+    if name == "pinecone-upserts":
+        return {"requests": PINECONE_UPSERT_RPM, "bytes": PINECONE_UPSERT_MB_PER_MINUTE * 1024 * 1024}
+    raise ValueError(f"Unknown rate limiter: {name}")
+
+
+def get_rate_limiter(name: str) -> Optional[RateLimiter]:
+    """Return the process-wide limiter for ``name`` ('openai-embeddings' or 'pinecone-upserts'), or None when disabled."""
+    if not RATE_LIMIT_ENABLED:
+        return None
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                limiter = RateLimiter(name, _limiter_budgets(name))
+                _limiters[name] = limiter
+    return limiter
+
+
+def rate_limiter_stats() -> dict:
+    return {name: limiter.stats() for name, limiter in _limiters.items()}
+
+
+def close_rate_limiters() -> None:
+    """Close the Redis connections of every limiter and drop them; later calls create fresh limiters."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+        _limiters.clear()
+    for limiter in limiters:
+        limiter.close()
+
+
+async def aclose_rate_limiters() -> None:
+    """Async version of close_rate_limiters that also closes the async Redis clients."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+        _limiters.clear()
+    for limiter in limiters:
+        await limiter.aclose()
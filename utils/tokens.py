@@ -0,0 +1,31 @@
+import logging
+from functools import lru_cache
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio used when no tiktoken encoding can be loaded (e.g. offline)
+CHARS_PER_TOKEN_ESTIMATE = 4
+
+
+@lru_cache(maxsize=8)
+def get_encoding(model: str):
+    """Return the tiktoken encoding for a model (o200k_base for unknown models), or None if it cannot be loaded."""
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            logger.debug(f"No tiktoken encoding registered for {model}, using o200k_base")
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning(f"Could not load tiktoken encoding for {model}, estimating token counts: {e}")
+        return None
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Count the tokens ``text`` uses for ``model``."""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return len(text or "") // CHARS_PER_TOKEN_ESTIMATE + 1
+    return len(encoding.encode(text or "", disallowed_special=()))